@@ -0,0 +1,153 @@
+"""
+Admission Control for the Future-Self Recommendation API
+Bounds the engine work in flight so that latency stays bounded under overload.
+Requests beyond the limit are not queued behind slow ones: they are degraded (served
+only from precomputed or cached answers) or shed with a 503/429. The limit adapts to
+observed latency: it is cut multiplicatively when the recent p99 exceeds the target
+and grows back one slot at a time while latency is comfortably below it.
+"""
+
+import threading
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+ADMIT = 'admit'
+DEGRADE = 'degrade'
+
+# Fraction of the target p99 below which the limit may grow again
+HEADROOM = 0.8
+
+# Multiplicative decrease applied when the p99 exceeds the target
+BACKOFF = 0.75
+
+
+class AdmissionController:
+    """
+    Adaptive in-flight limit for engine calls.
+
+    acquire() is called before scoring and release() once the call finished,
+    whatever its outcome. Latency is measured by the caller from admission to
+    completion, so time spent waiting for a worker thread counts as well.
+    """
+
+    def __init__(self, max_in_flight: int = 32, target_p99_ms: float = 250.0,
+                 min_in_flight: int = 1, window: int = 200, adjust_every: int = 20):
+        """
+        Args:
+            max_in_flight: Upper bound (and starting value) of the adaptive limit
+            target_p99_ms: Latency the limit is tuned to keep p99 below
+            min_in_flight: Lower bound of the adaptive limit
+            window: Number of recent latencies the p99 is computed over
+            adjust_every: Completions between limit adjustments
+
+        Raises:
+            ValueError: If the bounds or target are not positive or inconsistent
+        """
+        if min_in_flight < 1 or max_in_flight < min_in_flight:
+            raise ValueError("Expected 1 <= min_in_flight <= max_in_flight")
+        if target_p99_ms <= 0 or window < 1 or adjust_every < 1:
+            raise ValueError("target_p99_ms, window and adjust_every must be positive")
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min_in_flight
+        self.target_p99_ms = target_p99_ms
+        self.adjust_every = adjust_every
+        self.limit = max_in_flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._latencies = deque(maxlen=window)
+        self._since_adjust = 0
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.degraded = 0
+        self.shed = 0
+        self.limit_decreases = 0
+        self.limit_increases = 0
+
+    def acquire(self) -> str:
+        """
+        Decides how a request is served.
+
+        Returns:
+            ADMIT when a slot was taken (release() must follow), DEGRADE when the
+            limit is reached and the request may only use precomputed answers
+        """
+        with self._lock:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                self.admitted += 1
+                return ADMIT
+            self.degraded += 1
+            return DEGRADE
+
+    def record_shed(self):
+        """Counts a degraded request that had no precomputed answer and was rejected."""
+        with self._lock:
+            self.shed += 1
+
+    def release(self, latency_ms: float):
+        """
+        Frees a slot taken by acquire() and feeds the latency into the limit.
+
+        Args:
+            latency_ms: Time from admission to completion
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self._latencies.append(latency_ms)
+            self._since_adjust += 1
+            if self._since_adjust >= self.adjust_every:
+                self._since_adjust = 0
+                self._adjust()
+
+    def _adjust(self):
+        """Moves the limit towards the target latency (called with the lock held)."""
+        p99 = float(np.percentile(self._latencies, 99))
+        if p99 > self.target_p99_ms and self.limit > self.min_in_flight:
+            self.limit = max(self.min_in_flight, int(self.limit * BACKOFF))
+            self.limit_decreases += 1
+            # Latencies observed under the old limit would trigger further cuts
+            self._latencies.clear()
+        elif p99 < self.target_p99_ms * HEADROOM and self.limit < self.max_in_flight:
+            self.limit += 1
+            self.limit_increases += 1
+
+    def retry_after(self) -> int:
+        """
+        Suggests how long a shed client should wait.
+
+        Returns:
+            Seconds for the Retry-After header (at least 1)
+        """
+        with self._lock:
+            if not self._latencies:
+                return 1
+            return max(1, int(np.ceil(np.percentile(self._latencies, 99) / 1000)))
+
+    def stats(self) -> Dict:
+        """
+        Returns the current limit, load and counters.
+
+        Returns:
+            Dictionary with limit bounds, in-flight counts, recent latency
+            percentiles and admitted/degraded/shed counters
+        """
+        with self._lock:
+            latencies = np.asarray(self._latencies) if self._latencies else None
+            return {
+                'limit': self.limit,
+                'min_in_flight': self.min_in_flight,
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'target_p99_ms': self.target_p99_ms,
+                'p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+                'p99_ms': float(np.percentile(latencies, 99)) if latencies is not None else None,
+                'admitted': self.admitted,
+                'degraded': self.degraded,
+                'shed': self.shed,
+                'limit_decreases': self.limit_decreases,
+                'limit_increases': self.limit_increases
+            }
@@ -0,0 +1,362 @@
+"""
+Goal Analytics for the Future-Self Recommendation System
+Request handlers put one event per answered goal on a bounded in-memory queue and
+return immediately; a background thread batch-writes the events to a JSONL file or a
+SQLite database. An offline command aggregates the log.
+
+Usage:
+    python analytics.py analytics.jsonl --top 20
+    python analytics.py analytics.db --top 20
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+ANALYTICS_BACKENDS = ('jsonl', 'sqlite')
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+
+def backend_for_path(path: str) -> str:
+    """
+    Infers the storage backend from a file name.
+
+    Args:
+        path: Log file path
+
+    Returns:
+        'sqlite' for .db/.sqlite/.sqlite3 files, 'jsonl' otherwise
+    """
+    return 'sqlite' if Path(path).suffix.lower() in ('.db', '.sqlite', '.sqlite3') else 'jsonl'
+
+
+def make_event(result: Dict, endpoint: str, latency_ms: Optional[float] = None,
+               user_id: Optional[str] = None) -> Dict:
+    """
+    Builds an analytics event from a recommendation result.
+
+    Args:
+        result: Result dictionary returned by the engine
+        endpoint: Name of the endpoint that served it
+        latency_ms: Time spent producing the result
+        user_id: Optional user identifier
+
+    Returns:
+        Event dictionary with the goal, goal vector and returned item IDs
+    """
+    return {
+        'ts': time.time(),
+        'endpoint': endpoint,
+        'goal': result.get('user_goal'),
+        'goal_vector': result['goal_vector'],
+        'items': [rec['content_id'] for rec in result['recommendations']],
+        'user_id': user_id,
+        'latency_ms': latency_ms
+    }
+
+
+class AnalyticsSink:
+    """
+    Bounded, non-blocking event sink with a background batch writer.
+
+    log() never touches the disk: it appends to an in-memory queue of at most
+    ``max_queue`` events. When the queue is full the overflow policy decides:
+    'drop_newest' discards the incoming event, 'drop_oldest' discards the oldest
+    queued one, and 'block' waits up to ``block_timeout`` seconds for room (then
+    drops). Every outcome is counted.
+    """
+
+    def __init__(self, path: str, backend: Optional[str] = None, max_queue: int = 10_000,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 policy: str = 'drop_newest', block_timeout: float = 0.05):
+        """
+        Args:
+            path: JSONL file or SQLite database receiving the events
+            backend: 'jsonl' or 'sqlite' (inferred from the extension when omitted)
+            max_queue: Maximum number of events waiting to be written
+            batch_size: Maximum events written per batch
+            flush_interval: Seconds a partial batch may wait before it is written
+            policy: Overflow policy, one of OVERFLOW_POLICIES
+            block_timeout: Longest wait for queue room under the 'block' policy
+
+        Raises:
+            ValueError: If the backend or policy is unknown
+        """
+        backend = backend or backend_for_path(path)
+        if backend not in ANALYTICS_BACKENDS:
+            raise ValueError(f"Unknown analytics backend '{backend}', expected one of {list(ANALYTICS_BACKENDS)}")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}', expected one of {list(OVERFLOW_POLICIES)}")
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.backend = backend
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.counters = {
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'write_errors': 0,
+            'max_depth': 0
+        }
+
+        self._writer = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+        self._writer.start()
+
+    def log(self, event: Dict) -> bool:
+        """
+        Queues an event without blocking on I/O.
+
+        Args:
+            event: JSON-serializable event dictionary
+
+        Returns:
+            True if the event was queued, False if it was dropped
+        """
+        with self._condition:
+            if self._closed:
+                self.counters['dropped'] += 1
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self.counters['dropped'] += 1
+                elif self.policy == 'block':
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    if len(self._queue) >= self.max_queue or self._closed:
+                        self.counters['dropped'] += 1
+                        return False
+                else:
+                    self.counters['dropped'] += 1
+                    return False
+            self._queue.append(event)
+            self.counters['enqueued'] += 1
+            self.counters['max_depth'] = max(self.counters['max_depth'], len(self._queue))
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def _take_batch(self) -> List[Dict]:
+        """Waits for a full batch, the flush interval or close, then drains up to one batch."""
+        with self._condition:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._queue) < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            # Wake producers waiting for room under the 'block' policy
+            self._condition.notify_all()
+            return batch
+
+    def _run(self):
+        """Writer thread loop."""
+        connection = self._open_sqlite() if self.backend == 'sqlite' else None
+        try:
+            while True:
+                batch = self._take_batch()
+                if batch:
+                    self._write(batch, connection)
+                with self._condition:
+                    if self._closed and not self._queue:
+                        break
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _open_sqlite(self) -> sqlite3.Connection:
+        """Opens the database owned by the writer thread."""
+        connection = sqlite3.connect(str(self.path))
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " ts REAL, endpoint TEXT, goal TEXT, goal_vector TEXT, items TEXT,"
+            " user_id TEXT, latency_ms REAL)"
+        )
+        connection.commit()
+        return connection
+
+    def _write(self, batch: List[Dict], connection: Optional[sqlite3.Connection]):
+        """Writes one batch, counting failures instead of raising into the thread."""
+        try:
+            if connection is not None:
+                connection.executemany(
+                    "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (event.get('ts'), event.get('endpoint'), event.get('goal'),
+                         json.dumps(event.get('goal_vector')), json.dumps(event.get('items')),
+                         event.get('user_id'), event.get('latency_ms'))
+                        for event in batch
+                    ]
+                )
+                connection.commit()
+            else:
+                lines = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in batch)
+                with open(self.path, 'a', encoding='utf-8') as fp:
+                    fp.write(lines)
+        except (OSError, sqlite3.Error, TypeError, ValueError):
+            with self._condition:
+                self.counters['write_errors'] += 1
+                self.counters['dropped'] += len(batch)
+            return
+        with self._condition:
+            self.counters['written'] += len(batch)
+            self.counters['batches'] += 1
+
+    def stats(self) -> Dict:
+        """
+        Returns sink counters.
+
+        Returns:
+            Dictionary with enqueued/dropped/written counts, batches, write errors,
+            current and maximum queue depth
+        """
+        with self._condition:
+            return {
+                **self.counters,
+                'queue_depth': len(self._queue),
+                'backend': self.backend,
+                'policy': self.policy
+            }
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stops accepting events and writes everything still queued.
+
+        Args:
+            timeout: Longest wait for the writer to drain the queue
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join(timeout)
+
+
+def read_events(path: str) -> Iterator[Dict]:
+    """
+    Streams events back from a JSONL log or SQLite database.
+
+    Args:
+        path: Log written by AnalyticsSink
+
+    Yields:
+        Event dictionaries (malformed JSONL lines are skipped)
+    """
+    if backend_for_path(path) == 'sqlite':
+        connection = sqlite3.connect(str(path))
+        try:
+            for ts, endpoint, goal, goal_vector, items, user_id, latency_ms in connection.execute(
+                    "SELECT ts, endpoint, goal, goal_vector, items, user_id, latency_ms FROM events"):
+                yield {
+                    'ts': ts, 'endpoint': endpoint, 'goal': goal,
+                    'goal_vector': json.loads(goal_vector), 'items': json.loads(items),
+                    'user_id': user_id, 'latency_ms': latency_ms
+                }
+        finally:
+            connection.close()
+        return
+
+    with open(path, encoding='utf-8') as fp:
+        for line in fp:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def aggregate(events: Iterator[Dict], skill_dimensions: List[str], top: int = 20) -> Dict:
+    """
+    Summarizes an event stream.
+
+    Args:
+        events: Events from read_events
+        skill_dimensions: Dimension names, in goal-vector order
+        top: Number of goals and items listed
+
+    Returns:
+        Dictionary with event count, top goals, mean goal vector and dominant
+        dimension counts, and the most exposed items
+    """
+    goals = Counter()
+    exposures = Counter()
+    dominant = Counter()
+    vector_sum = np.zeros(len(skill_dimensions))
+    n_events = 0
+    for event in events:
+        n_events += 1
+        if event.get('goal'):
+            goals[event['goal'].strip().lower()] += 1
+        exposures.update(event.get('items') or [])
+        vector = np.asarray(event.get('goal_vector') or [], dtype=np.float64)
+        if vector.shape == vector_sum.shape:
+            vector_sum += vector
+            # Uniform (no keyword matched) vectors have no dominant dimension
+            if np.ptp(vector) > 0:
+                dominant[skill_dimensions[int(np.argmax(vector))]] += 1
+            else:
+                dominant['(none)'] += 1
+
+    return {
+        'events': n_events,
+        'top_goals': goals.most_common(top),
+        'mean_goal_vector': dict(zip(skill_dimensions, (vector_sum / max(n_events, 1)).round(4).tolist())),
+        'dominant_dimensions': dict(dominant.most_common()),
+        'item_exposure': exposures.most_common(top),
+        'distinct_items_exposed': len(exposures)
+    }
+
+
+def main():
+    """Aggregates an analytics log"""
+    from ingest import DEFAULT_SKILL_DIMENSIONS
+
+    parser = argparse.ArgumentParser(description="Aggregate goal analytics")
+    parser.add_argument('path', help="JSONL log or SQLite database written by the API")
+    parser.add_argument('--top', type=int, default=20, help="Goals and items to list")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = aggregate(read_events(args.path), DEFAULT_SKILL_DIMENSIONS, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Events: {report['events']:,}  distinct items exposed: {report['distinct_items_exposed']:,}")
+    print("\nTop goals:")
+    for goal, count in report['top_goals']:
+        print(f"  {count:>8,}  {goal}")
+    print("\nDominant dimension:")
+    for dimension, count in report['dominant_dimensions'].items():
+        print(f"  {count:>8,}  {dimension}")
+    print("\nMean goal vector:")
+    for dimension, value in report['mean_goal_vector'].items():
+        print(f"  {value:>8.3f}  {dimension}")
+    print("\nMost exposed items:")
+    for item, count in report['item_exposure']:
+        print(f"  {count:>8,}  content_id {item}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Precomputed Answer Table for the Future-Self Recommendation Engine
+Goal vectors come from keyword match counts, so the set of goal vectors seen in practice
+is small and discrete. This module enumerates every count vector up to a per-dimension
+limit, precomputes its top-N results against the catalog, and serves them by table lookup.
+
+Usage:
+    python answer_table.py --output answer_table.npz --max-count 3 --top-n 20
+    python answer_table.py --output answer_table.npz --catalog-dir catalog_artifacts/
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from sharding import top_k_rows
+
+# Version 2: tied rows are ordered by higher row index, as in recommend()
+TABLE_FORMAT_VERSION = 2
+
+
+class AnswerTable:
+    """
+    Dense lookup table from keyword count vectors to precomputed top-N rankings.
+
+    Count vectors are addressed by their mixed-radix code, so a lookup is one dot
+    product and one row read. The all-zero vector is the uniform fallback goal.
+    """
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray, max_count: int,
+                 catalog_version: str, skill_dimensions):
+        """
+        Args:
+            indices: Array of shape (n_codes, top_n) with catalog rows in ranking order
+            scores: Array of shape (n_codes, top_n) with the matching similarities
+            max_count: Largest per-dimension count covered by the table
+            catalog_version: Catalog version the table was built against
+            skill_dimensions: Skill dimension names, in vector order
+        """
+        self.indices = indices
+        self.scores = scores
+        self.max_count = int(max_count)
+        self.catalog_version = str(catalog_version)
+        self.skill_dimensions = list(skill_dimensions)
+        self.top_n = indices.shape[1]
+        self._radix = (self.max_count + 1) ** np.arange(len(self.skill_dimensions), dtype=np.int64)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def enumerate_counts(n_dims: int, max_count: int) -> np.ndarray:
+        """
+        Enumerates every count vector with entries in [0, max_count].
+
+        Args:
+            n_dims: Number of skill dimensions
+            max_count: Largest per-dimension count
+
+        Returns:
+            Array of shape ((max_count + 1) ** n_dims, n_dims), row i having code i
+        """
+        base = max_count + 1
+        codes = np.arange(base ** n_dims, dtype=np.int64)
+        radix = base ** np.arange(n_dims, dtype=np.int64)
+        return ((codes[:, None] // radix) % base).astype(np.float64)
+
+    @classmethod
+    def build(cls, engine, max_count: int = 3, top_n: int = 20,
+              block_size: int = 4096) -> "AnswerTable":
+        """
+        Precomputes the top-N results of every count vector against an engine's catalog.
+
+        Args:
+            engine: FutureSelfEngine whose catalog is scored
+            max_count: Largest per-dimension keyword count covered
+            top_n: Number of results stored per vector
+            block_size: Count vectors scored per matrix product
+
+        Returns:
+            Built AnswerTable
+        """
+        n_dims = len(engine.skill_dimensions)
+        n_items = len(engine.content_vectors)
+        top_n = min(top_n, n_items)
+        counts = cls.enumerate_counts(n_dims, max_count)
+
+        # Same normalization as text_to_vector, including the uniform fallback
+        norms = np.linalg.norm(counts, axis=1, keepdims=True)
+        goal_matrix = np.divide(counts, norms, out=np.zeros_like(counts), where=norms > 0)
+        goal_matrix[norms[:, 0] == 0] = 1.0 / np.sqrt(n_dims)
+
+        indices = np.empty((len(counts), top_n), dtype=np.int32)
+        scores = np.empty((len(counts), top_n), dtype=np.float64)
+        for start in range(0, len(counts), block_size):
+            similarities = engine._score_matrix(goal_matrix[start:start + block_size])
+            # Ranked by score, breaking ties by higher row index like recommend()
+            candidates = np.stack([top_k_rows(row_scores, top_n) for row_scores in similarities])
+            indices[start:start + block_size] = candidates
+            scores[start:start + block_size] = np.take_along_axis(similarities, candidates, axis=1)
+
+        return cls(indices, scores, max_count, engine.catalog_version, engine.skill_dimensions)
+
+    def lookup(self, counts: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns the precomputed ranking for a keyword count vector.
+
+        Args:
+            counts: Raw keyword match counts per dimension
+
+        Returns:
+            Tuple of (row indices, scores) in ranking order, or None if the vector is
+            outside the table (counts above max_count or not whole numbers)
+        """
+        counts = np.asarray(counts)
+        rounded = np.rint(counts)
+        if (counts.shape != self._radix.shape or np.any(rounded != counts)
+                or np.any(rounded < 0) or np.any(rounded > self.max_count)):
+            self.misses += 1
+            return None
+        code = int(rounded.astype(np.int64) @ self._radix)
+        self.hits += 1
+        return self.indices[code], self.scores[code]
+
+    def save(self, path: str):
+        """
+        Writes the table to a compact .npz file.
+
+        The file is written under a unique temporary name next to the target and
+        renamed into place, so concurrent writers never interleave and readers
+        never observe a partial table.
+
+        Args:
+            path: Output file path
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=target.name + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                np.savez(
+                    fp,
+                    indices=self.indices,
+                    scores=self.scores,
+                    max_count=np.int64(self.max_count),
+                    catalog_version=np.array(self.catalog_version),
+                    skill_dimensions=np.array(self.skill_dimensions),
+                    format_version=np.int64(TABLE_FORMAT_VERSION)
+                )
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "AnswerTable":
+        """
+        Reads a table written by save.
+
+        Args:
+            path: Table file path
+
+        Returns:
+            Loaded AnswerTable
+
+        Raises:
+            ValueError: If the file uses an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['format_version']) != TABLE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported answer table format {int(data['format_version'])}")
+            return cls(
+                data['indices'], data['scores'], int(data['max_count']),
+                str(data['catalog_version']), data['skill_dimensions'].tolist()
+            )
+
+    def stats(self) -> Dict:
+        """
+        Returns table statistics.
+
+        Returns:
+            Dictionary with size, coverage and hit/miss counters
+        """
+        return {
+            'vectors': int(self.indices.shape[0]),
+            'top_n': int(self.top_n),
+            'max_count': self.max_count,
+            'catalog_version': self.catalog_version,
+            'bytes': int(self.indices.nbytes + self.scores.nbytes),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def load_or_build(engine, path: str, max_count: int = 3, top_n: int = 20) -> AnswerTable:
+    """
+    Loads a table for the engine's catalog, rebuilding and saving it when it is
+    missing, stale (another catalog version) or built with other parameters.
+
+    Args:
+        engine: FutureSelfEngine the table must match
+        path: Table file path
+        max_count: Largest per-dimension keyword count covered
+        top_n: Number of results stored per vector
+
+    Returns:
+        AnswerTable matching the engine's catalog
+    """
+    table_path = Path(path)
+    if table_path.exists():
+        try:
+            table = AnswerTable.load(str(table_path))
+            if (table.catalog_version == engine.catalog_version
+                    and table.skill_dimensions == list(engine.skill_dimensions)
+                    and table.max_count == max_count
+                    and table.top_n == min(top_n, len(engine.content_vectors))):
+                return table
+        except (OSError, ValueError, KeyError):
+            pass
+
+    table = AnswerTable.build(engine, max_count=max_count, top_n=top_n)
+    table.save(str(table_path))
+    return table
+
+
+def main():
+    """Builds the answer table for the current catalog"""
+    from recommender import DataLoader, FutureSelfEngine
+
+    parser = argparse.ArgumentParser(description="Precompute the goal-vector answer table")
+    parser.add_argument('--output', default='answer_table.npz', help="Output .npz file")
+    parser.add_argument('--max-count', type=int, default=3,
+                        help="Largest per-dimension keyword count to enumerate")
+    parser.add_argument('--top-n', type=int, default=20, help="Results stored per goal vector")
+    parser.add_argument('--catalog-dir', default=None,
+                        help="Ingested catalog artifacts (built-in catalog by default)")
+    parser.add_argument('--snapshot', default=None, help="Load the engine from a snapshot")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        engine = FutureSelfEngine.from_snapshot(args.snapshot)
+    else:
+        loader = DataLoader.from_artifacts(args.catalog_dir) if args.catalog_dir else None
+        engine = FutureSelfEngine(data_loader=loader)
+    start = time.perf_counter()
+    table = AnswerTable.build(engine, max_count=args.max_count, top_n=args.top_n)
+    table.save(args.output)
+    stats = table.stats()
+    print(f"Built {stats['vectors']:,} goal vectors x top {stats['top_n']} "
+          f"for catalog {stats['catalog_version']} in {time.perf_counter() - start:.2f}s "
+          f"({stats['bytes'] / 1024 / 1024:.1f} MB) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,61 @@ FastAPI Backend Server for Future-Self Recommendation System
 Provides REST API endpoint for content recommendations.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Optional, Literal
+from contextlib import asynccontextmanager
+import hashlib
+import os
 import sys
+import time
 from pathlib import Path
 
 # Add backend directory to path to import recommender
 sys.path.append(str(Path(__file__).parent))
 
-from recommender import FutureSelfEngine
+from recommender import DataLoader, FutureSelfEngine
+from persistent_cache import PersistentCache
+from analytics import AnalyticsSink, make_event
+from profiling import PROFILE_MODES, PeriodicProfiler, profile_call
+from memory import MemoryTracker, engine_memory_report
+from blocked import DEFAULT_BLOCK_SIZE, limit_blas_threads
+from http_cache import SerializedBodyCache, etag_matches, make_etag, not_modified, serialize_json
+from admission import ADMIT, AdmissionController
+from traffic import CaptureMiddleware, TrafficRecorder
+from binary_encoding import MSGPACK_MEDIA_TYPE, accepts_json, encode_msgpack, msgpack_available, wants_msgpack
+from exporters import EXPORT_EXTENSIONS, EXPORT_FORMATS, available_formats, iter_export
+from ingest import read_manifest
+from snapshot import is_current as snapshot_is_current
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Releases background resources when the server shuts down.
+    
+    Queued analytics events and traffic capture records are written, the scoring
+    thread pool is shut down and the last partial profile window is written.
+    """
+    yield
+    if analytics is not None:
+        analytics.close()
+    if traffic_recorder is not None:
+        traffic_recorder.close()
+    if recommendation_engine.blocked_scorer is not None:
+        recommendation_engine.blocked_scorer.close()
+    if periodic_profiler is not None:
+        periodic_profiler.stop()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Future-Self Recommendation API",
     description="Goal-driven content recommendation system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow frontend requests
@@ -31,8 +69,284 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Optional traffic capture: a sample of recommend requests (body, latency, ranking
+# digest) is appended to FUTURE_SELF_CAPTURE for replay with traffic.py
+CAPTURE_PATH = os.environ.get("FUTURE_SELF_CAPTURE")
+traffic_recorder = (
+    TrafficRecorder(CAPTURE_PATH, sample_rate=float(os.environ.get("FUTURE_SELF_CAPTURE_RATE", 0.1)))
+    if CAPTURE_PATH else None
+)
+if traffic_recorder is not None:
+    app.add_middleware(CaptureMiddleware, recorder=traffic_recorder)
+
+# Optional on-disk cache shared by all workers on this host
+CACHE_DIR = os.environ.get("FUTURE_SELF_CACHE_DIR")
+CACHE_MAX_BYTES = int(os.environ.get("FUTURE_SELF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+persistent_cache = PersistentCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES) if CACHE_DIR else None
+
+# Optional precomputed answer table for the discrete goal-vector space
+ANSWER_TABLE_PATH = os.environ.get("FUTURE_SELF_ANSWER_TABLE")
+ANSWER_TABLE_MAX_COUNT = int(os.environ.get("FUTURE_SELF_ANSWER_TABLE_MAX_COUNT", 3))
+
+# Optional ingested catalog (see ingest.py); the built-in dummy catalog is used otherwise
+CATALOG_DIR = os.environ.get("FUTURE_SELF_CATALOG_DIR")
+
+# Optional engine snapshot: loaded (memory-mapped) when it was built from the catalog
+# configured above, otherwise (re)written after a normal startup, so later workers
+# skip catalog construction
+SNAPSHOT_PATH = os.environ.get("FUTURE_SELF_SNAPSHOT")
+SNAPSHOT_VERIFY = os.environ.get("FUTURE_SELF_SNAPSHOT_VERIFY", "0") == "1"
+
+# Optional keyword taxonomy file (JSON or CSV); the bundled keyword_taxonomy.json
+# is used otherwise. POST /admin/taxonomy/reload re-reads it without a restart
+TAXONOMY_PATH = os.environ.get("FUTURE_SELF_TAXONOMY")
+
 # Initialize recommendation engine
-recommendation_engine = FutureSelfEngine()
+SOURCE_CATALOG_VERSION = read_manifest(CATALOG_DIR)['catalog_version'] if CATALOG_DIR else None
+snapshot_loaded = bool(SNAPSHOT_PATH) and snapshot_is_current(SNAPSHOT_PATH, SOURCE_CATALOG_VERSION)
+if snapshot_loaded:
+    recommendation_engine = FutureSelfEngine.from_snapshot(
+        SNAPSHOT_PATH,
+        verify=SNAPSHOT_VERIFY,
+        persistent_cache=persistent_cache
+    )
+    if TAXONOMY_PATH:
+        # Keeps the snapshot's compiled matcher when the file has not changed
+        recommendation_engine.reload_taxonomy(TAXONOMY_PATH)
+else:
+    recommendation_engine = FutureSelfEngine(
+        persistent_cache=persistent_cache,
+        data_loader=DataLoader.from_artifacts(CATALOG_DIR) if CATALOG_DIR else None
+    )
+    if TAXONOMY_PATH:
+        recommendation_engine.reload_taxonomy(TAXONOMY_PATH)
+if persistent_cache is not None:
+    # Entries computed against an earlier catalog can never match again
+    persistent_cache.purge_other_versions(recommendation_engine.catalog_version)
+if ANSWER_TABLE_PATH:
+    recommendation_engine.attach_answer_table(ANSWER_TABLE_PATH, max_count=ANSWER_TABLE_MAX_COUNT)
+
+# Optional blocked, multi-threaded top-k scoring for large catalogs. BLAS is held to
+# FUTURE_SELF_BLAS_THREADS per call (1 by default with blocked scoring, since the
+# scoring threads and uvicorn workers already use the cores)
+SCORING_THREADS = int(os.environ.get("FUTURE_SELF_SCORING_THREADS", 0))
+SCORING_BLOCK_SIZE = int(os.environ.get("FUTURE_SELF_SCORING_BLOCK_SIZE", DEFAULT_BLOCK_SIZE))
+BLAS_THREADS = os.environ.get("FUTURE_SELF_BLAS_THREADS")
+if BLAS_THREADS or SCORING_THREADS:
+    limit_blas_threads(int(BLAS_THREADS or 1))
+if SCORING_THREADS:
+    recommendation_engine.enable_blocked_scoring(n_threads=SCORING_THREADS, block_size=SCORING_BLOCK_SIZE)
+
+# Optional per-dimension sorted lists: goals non-zero in at most this many skill
+# dimensions get their exact top-k by the threshold algorithm instead of a scan
+THRESHOLD_MAX_DIMS = int(os.environ.get("FUTURE_SELF_THRESHOLD_MAX_DIMS", 0))
+if THRESHOLD_MAX_DIMS:
+    recommendation_engine.enable_threshold_index(max_dims=THRESHOLD_MAX_DIMS)
+else:
+    # Not configured (any lists restored from the snapshot are dropped)
+    recommendation_engine.sorted_index = None
+
+# Requests with a deadline_ms are scored in cluster order until the budget runs out.
+# The cluster layout is built here, or else once (under a lock) by the first such
+# request, which waits for the build before its budget starts
+if os.environ.get("FUTURE_SELF_DEADLINE_SCORING", "0") == "1":
+    recommendation_engine.enable_deadline_scoring()
+
+# Written once the indexes above exist, so later workers load them with the catalog
+if SNAPSHOT_PATH and not snapshot_loaded:
+    recommendation_engine.save_snapshot(SNAPSHOT_PATH)
+
+# Optional goal analytics log (JSONL, or SQLite for .db paths), written off the request path
+ANALYTICS_PATH = os.environ.get("FUTURE_SELF_ANALYTICS")
+ANALYTICS_POLICY = os.environ.get("FUTURE_SELF_ANALYTICS_POLICY", "drop_newest")
+ANALYTICS_MAX_QUEUE = int(os.environ.get("FUTURE_SELF_ANALYTICS_MAX_QUEUE", 10000))
+
+analytics = (
+    AnalyticsSink(ANALYTICS_PATH, max_queue=ANALYTICS_MAX_QUEUE, policy=ANALYTICS_POLICY)
+    if ANALYTICS_PATH else None
+)
+
+
+async def log_analytics(*events: Dict):
+    """
+    Queues analytics events without stalling the event loop.
+    
+    Under the 'block' policy a full queue makes log() wait for room, so the
+    events are handed to the threadpool; the other policies never wait.
+    
+    Args:
+        *events: Events built by make_event
+    """
+    if analytics is None:
+        return
+    if analytics.policy == 'block':
+        await run_in_threadpool(lambda: [analytics.log(event) for event in events])
+    else:
+        for event in events:
+            analytics.log(event)
+
+# On-demand profiling of /recommend_content: FUTURE_SELF_PROFILING=1 honours the
+# X-Profile header (guarded by X-Admin-Token when FUTURE_SELF_ADMIN_TOKEN is set),
+# FUTURE_SELF_PROFILING=cprofile|sampling profiles every request
+PROFILING = os.environ.get("FUTURE_SELF_PROFILING", "").strip().lower()
+ADMIN_TOKEN = os.environ.get("FUTURE_SELF_ADMIN_TOKEN")
+
+# Optional always-on sampler writing one aggregated profile per window
+PROFILE_DIR = os.environ.get("FUTURE_SELF_PROFILE_DIR")
+periodic_profiler = (
+    PeriodicProfiler(
+        PROFILE_DIR,
+        interval=float(os.environ.get("FUTURE_SELF_PROFILE_INTERVAL_MS", 10)) / 1000,
+        window=float(os.environ.get("FUTURE_SELF_PROFILE_WINDOW", 60))
+    ).start()
+    if PROFILE_DIR else None
+)
+
+# Conditional requests: ETags derive from the catalog (and taxonomy) version, so
+# clients revalidate with If-None-Match and get a 304 without any recomputation.
+# FUTURE_SELF_HTTP_MAX_AGE > 0 additionally lets clients reuse responses unchecked
+HTTP_MAX_AGE = int(os.environ.get("FUTURE_SELF_HTTP_MAX_AGE", 0))
+CACHE_CONTROL = f"public, max-age={HTTP_MAX_AGE}" if HTTP_MAX_AGE > 0 else "no-cache"
+static_bodies = SerializedBodyCache(CACHE_CONTROL)
+_catalog_summary: Dict = {}
+
+# Optional admission control for /recommend_content: at most FUTURE_SELF_MAX_IN_FLIGHT
+# engine calls run at once (on worker threads, so the event loop keeps accepting and
+# can see the backlog); the limit shrinks while p99 latency exceeds the target.
+# Requests over the limit get precomputed or cached answers only, or are shed
+MAX_IN_FLIGHT = int(os.environ.get("FUTURE_SELF_MAX_IN_FLIGHT", 0))
+SHED_STATUS = int(os.environ.get("FUTURE_SELF_SHED_STATUS", 503))
+if SHED_STATUS not in (429, 503):
+    raise ValueError("FUTURE_SELF_SHED_STATUS must be 429 or 503")
+admission = (
+    AdmissionController(
+        max_in_flight=MAX_IN_FLIGHT,
+        min_in_flight=int(os.environ.get("FUTURE_SELF_MIN_IN_FLIGHT", 1)),
+        target_p99_ms=float(os.environ.get("FUTURE_SELF_TARGET_P99_MS", 250))
+    )
+    if MAX_IN_FLIGHT > 0 else None
+)
+
+
+def catalog_summary() -> Dict:
+    """
+    Returns the catalog-derived part of /stats, recomputed only when the catalog changes.
+    
+    Returns:
+        Dictionary with item count, skill dimensions, content type counts and version
+    """
+    version = recommendation_engine.catalog_version
+    if _catalog_summary.get("catalog_version") != version:
+        _catalog_summary.clear()
+        _catalog_summary.update({
+            "total_content_items": len(recommendation_engine.content_metadata),
+            "skill_dimensions": recommendation_engine.skill_dimensions,
+            "content_types": recommendation_engine.content_metadata['Type'].value_counts().to_dict(),
+            "catalog_version": version
+        })
+    return _catalog_summary
+
+
+# tracemalloc snapshots for /admin/memory; FUTURE_SELF_TRACEMALLOC=1 traces from startup
+memory_tracker = MemoryTracker()
+if os.environ.get("FUTURE_SELF_TRACEMALLOC", "0") == "1":
+    memory_tracker.start()
+
+
+def negotiate_msgpack(accept: Optional[str]) -> bool:
+    """
+    Chooses between JSON and MessagePack for the recommend endpoints.
+    
+    Args:
+        accept: Accept header of the request
+    
+    Returns:
+        True for MessagePack, False for JSON
+    
+    Raises:
+        HTTPException: 406 if only MessagePack is acceptable but msgpack is not installed
+    """
+    if not wants_msgpack(accept):
+        return False
+    if msgpack_available():
+        return True
+    if accepts_json(accept):
+        return False
+    raise HTTPException(
+        status_code=406,
+        detail="MessagePack responses are not available (msgpack is not installed)"
+    )
+
+
+def msgpack_response(content, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serializes a response body as MessagePack with float32-packed vectors.
+    
+    Args:
+        content: Response content
+        headers: Extra response headers
+    
+    Returns:
+        Response with the MessagePack media type
+    """
+    return Response(
+        content=encode_msgpack(content), media_type=MSGPACK_MEDIA_TYPE,
+        headers={**(headers or {}), "Vary": "Accept"}
+    )
+
+
+def require_admin(x_admin_token: Optional[str]):
+    """
+    Guards admin endpoints with FUTURE_SELF_ADMIN_TOKEN, when it is set.
+    
+    Args:
+        x_admin_token: Value of the X-Admin-Token header
+    
+    Raises:
+        HTTPException: If the token is set and does not match
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints require a valid X-Admin-Token")
+
+
+def requested_profile_mode(x_profile: Optional[str], x_admin_token: Optional[str]) -> Optional[str]:
+    """
+    Decides whether (and how) a request is profiled.
+    
+    Args:
+        x_profile: Value of the X-Profile header
+        x_admin_token: Value of the X-Admin-Token header
+    
+    Returns:
+        'cprofile', 'sampling', or None when the request is not profiled
+    
+    Raises:
+        HTTPException: If profiling is requested with a wrong admin token or mode
+    """
+    if not PROFILING or PROFILING in ("0", "false", "off"):
+        return None
+    if PROFILING in PROFILE_MODES:
+        return PROFILING
+    if not x_profile:
+        return None
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Admin-Token")
+    mode = x_profile.strip().lower()
+    if mode not in PROFILE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"X-Profile must be one of {list(PROFILE_MODES)}"
+        )
+    return mode
+
+
+# Optional item-to-item neighbour lists for "more like this", built offline with
+# neighbors.py; without a matching file each lookup scores the item in one pass
+NEIGHBORS_PATH = os.environ.get("FUTURE_SELF_NEIGHBORS")
+NEIGHBORS_M = int(os.environ.get("FUTURE_SELF_NEIGHBORS_M", 20))
+if NEIGHBORS_PATH:
+    recommendation_engine.attach_neighbors(NEIGHBORS_PATH, m=NEIGHBORS_M)
 
 
 # Request/Response Models
@@ -50,16 +364,137 @@ class RecommendationRequest(BaseModel):
         ge=1,
         le=20
     )
+    user_id: Optional[str] = Field(
+        default=None,
+        description="Optional user identifier; content the user has consumed is excluded",
+        max_length=128
+    )
+    explain: bool = Field(
+        default=False,
+        description="Attach each skill dimension's contribution to the match score"
+    )
+    deadline_ms: Optional[float] = Field(
+        default=None,
+        description="Scoring time budget in milliseconds; the best results found in time are returned",
+        gt=0,
+        le=60000
+    )
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Request model for scoring many independent goals at once"""
+    goals: List[str] = Field(
+        ...,
+        description="Goal statements scored in one batched engine call",
+        min_length=1,
+        max_length=1000
+    )
+    top_k: int = Field(
+        default=5,
+        description="Number of recommendations to return per goal",
+        ge=1,
+        le=20
+    )
+
+
+class ExportRequest(BaseModel):
+    """Request model for streaming recommendation exports"""
+    goals: List[str] = Field(
+        ...,
+        description="Goal statements to score and export",
+        min_length=1,
+        max_length=100000
+    )
+    top_k: int = Field(
+        default=5,
+        description="Number of recommendations to return per goal",
+        ge=1,
+        le=20
+    )
+    format: Literal['json', 'csv', 'parquet'] = Field(
+        default='json',
+        description="Export format"
+    )
+    pack_vectors: bool = Field(
+        default=False,
+        description="For JSON, encode vectors as base64 little-endian float32"
+    )
+
+
+class WeightedGoal(BaseModel):
+    """A single goal with its relative weight"""
+    goal: str = Field(..., min_length=3, example="I want to become a CTO")
+    weight: float = Field(default=1.0, description="Relative importance of this goal", gt=0)
+
+
+class MultiGoalRequest(BaseModel):
+    """Request model for blended multi-goal recommendations"""
+    goals: List[WeightedGoal] = Field(..., min_length=1, max_length=10)
+    top_k: int = Field(
+        default=5,
+        description="Number of recommendations to return",
+        ge=1,
+        le=20
+    )
+    aggregation: Literal['weighted_sum', 'max', 'round_robin'] = Field(
+        default='weighted_sum',
+        description="How per-goal scores are combined before top-k selection"
+    )
+    user_id: Optional[str] = Field(
+        default=None,
+        description="Optional user identifier; content the user has consumed is excluded",
+        max_length=128
+    )
+
+
+class ConsumptionEvent(BaseModel):
+    """A single user-consumed-content event"""
+    user_id: str = Field(..., min_length=1, max_length=128)
+    content_id: int = Field(..., description="Catalog row ID returned as content_id", ge=0)
+
+
+class ConsumptionEventsRequest(BaseModel):
+    """Request model for bulk consumption recording"""
+    events: List[ConsumptionEvent] = Field(..., max_length=10000)
+
+
+class LoadMoreRequest(BaseModel):
+    """Request model for loading further results of a previous recommendation"""
+    cursor: str = Field(
+        ...,
+        description="Opaque cursor returned as next_cursor by a previous response"
+    )
+    page_size: int = Field(
+        default=5,
+        description="Number of additional recommendations to return",
+        ge=1,
+        le=20
+    )
+    explain: bool = Field(
+        default=False,
+        description="Attach each skill dimension's contribution to the match score"
+    )
+
+
+class ContentVectorUpdate(BaseModel):
+    """Request model for changing one item's skill vector"""
+    vector: List[float] = Field(
+        ...,
+        description="New skill vector, one value in [0, 1] per skill dimension",
+        min_length=1
+    )
 
 
 class ContentRecommendation(BaseModel):
     """Model for individual content recommendation"""
+    content_id: int
     title: str
     type: str
     description: str
     url: str
     match_score: float
     content_vector: List[float]
+    explanation: Optional[Dict[str, float]] = None
 
 
 class RecommendationResponse(BaseModel):
@@ -68,6 +503,37 @@ class RecommendationResponse(BaseModel):
     goal_vector: List[float]
     skill_dimensions: List[str]
     recommendations: List[Dict]
+    next_cursor: Optional[str] = None
+    coverage: Optional[float] = None
+
+
+class BatchRecommendationResponse(BaseModel):
+    """Response model for the batch endpoint"""
+    results: List[RecommendationResponse]
+
+
+class MultiGoalResponse(BaseModel):
+    """Response model for the multi-goal endpoint"""
+    goals: List[Dict]
+    aggregation: str
+    goal_vector: List[float]
+    skill_dimensions: List[str]
+    recommendations: List[Dict]
+
+
+class SimilarContentResponse(BaseModel):
+    """Response model for the item-to-item endpoint"""
+    item: Dict
+    skill_dimensions: List[str]
+    recommendations: List[Dict]
+
+
+class RecommendationPageResponse(BaseModel):
+    """Response model for the load-more endpoint"""
+    goal_vector: List[float]
+    skill_dimensions: List[str]
+    recommendations: List[Dict]
+    next_cursor: Optional[str] = None
 
 
 # API Endpoints
@@ -79,8 +545,16 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /recommend_content": "Get content recommendations based on your future-self goal",
+            "POST /recommend_content/more": "Load the next page of results for a cursor",
+            "POST /recommend_content/multi": "Get one blended list for several weighted goals",
+            "POST /recommend_content/batch": "Get recommendations for many independent goals at once",
+            "POST /recommend_content/export": "Stream recommendations for many goals as JSON, CSV or Parquet",
+            "POST /consumption_events": "Record consumed content so it is excluded from a user's results",
+            "GET /content/{content_id}/similar": "Get items similar to a catalog item",
             "GET /health": "Health check endpoint",
-            "GET /stats": "Get system statistics"
+            "GET /stats": "Get system statistics",
+            "GET /admin/memory": "Get the engine's memory footprint per component",
+            "POST /admin/taxonomy/reload": "Reload the keyword taxonomy file without a restart"
         }
     }
 
@@ -96,28 +570,88 @@ async def health_check():
 
 
 @app.get("/stats")
-async def get_stats():
-    """Get system statistics"""
-    return {
-        "total_content_items": len(recommendation_engine.content_metadata),
-        "skill_dimensions": recommendation_engine.skill_dimensions,
-        "content_types": recommendation_engine.content_metadata['Type'].value_counts().to_dict()
-    }
+async def get_stats(if_none_match: Optional[str] = Header(default=None)):
+    """
+    Get system statistics.
+    
+    The catalog part is computed once per catalog version; the live counters change
+    between calls, so the ETag is a hash of the serialized body.
+    """
+    body = serialize_json({
+        **catalog_summary(),
+        "persistent_cache": persistent_cache.stats() if persistent_cache else None,
+        "answer_table": (
+            recommendation_engine.answer_table.stats()
+            if recommendation_engine.answer_table else None
+        ),
+        "taxonomy": recommendation_engine.taxonomy.stats(),
+        "blocked_scoring": (
+            recommendation_engine.blocked_scorer.stats()
+            if recommendation_engine.blocked_scorer else None
+        ),
+        "deadline_scoring": (
+            recommendation_engine.anytime_scorer.stats()
+            if recommendation_engine.anytime_scorer else None
+        ),
+        "threshold_index": (
+            recommendation_engine.sorted_index.stats()
+            if recommendation_engine.sorted_index else None
+        ),
+        "neighbors": (
+            recommendation_engine.neighbor_index.stats()
+            if recommendation_engine.neighbor_index else None
+        ),
+        "http_cache": static_bodies.stats(),
+        "admission": admission.stats() if admission else None,
+        "analytics": analytics.stats() if analytics else None,
+        "traffic_capture": traffic_recorder.stats() if traffic_recorder else None,
+        "periodic_profiler": periodic_profiler.stats() if periodic_profiler else None
+    })
+    etag = make_etag("/stats", hashlib.sha256(body).hexdigest())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, "no-cache")
+    return Response(
+        content=body, media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
 
 
 @app.post("/recommend_content", response_model=RecommendationResponse)
-async def recommend_content(request: RecommendationRequest):
+async def recommend_content(
+    request: RecommendationRequest,
+    response: Response,
+    x_profile: Optional[str] = Header(default=None),
+    x_admin_token: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None)
+):
     """
     Generate content recommendations based on user's future-self goal.
     
+    Results are deterministic for a goal, catalog version and taxonomy version, so
+    anonymous requests carry an ETag; a matching If-None-Match gets a 304 before any
+    scoring. Requests with a user_id depend on that user's consumption history and
+    are not tagged.
+    
+    With admission control on, requests over the in-flight limit are answered from
+    the answer table or persistent cache only (marked with X-Degraded: cached), or
+    rejected with a Retry-After when no such answer exists.
+    
     Args:
         request: RecommendationRequest containing user's goal
+        response: Response whose caching headers are set
+        x_profile: Optional profiler ('cprofile' or 'sampling') when profiling is enabled
+        x_admin_token: Admin token required for profiling when one is configured
+        if_none_match: ETag of a previously received response
+        accept: 'application/x-msgpack' selects a MessagePack body with float32 vectors
     
     Returns:
-        RecommendationResponse with goal vector and top recommendations
+        RecommendationResponse with goal vector and top recommendations; profiled
+        requests also carry a 'profile' with a pstats summary or collapsed stacks
     
     Raises:
-        HTTPException: If recommendation generation fails
+        HTTPException: If recommendation generation fails, 406 if only MessagePack
+            is acceptable and it is unavailable, or 503/429 when load is shed
     """
     try:
         # Validate input
@@ -127,12 +661,81 @@ async def recommend_content(request: RecommendationRequest):
                 detail="Goal cannot be empty"
             )
         
-        # Generate recommendations
-        result = recommendation_engine.recommend(
+        profile_mode = requested_profile_mode(x_profile, x_admin_token)
+        use_msgpack = negotiate_msgpack(accept)
+        etag = None
+        if profile_mode is None and request.user_id is None:
+            etag = make_etag(
+                "/recommend_content", recommendation_engine.catalog_version,
+                recommendation_engine.taxonomy.version, request.goal.strip(),
+                request.top_k, request.explain, use_msgpack, request.deadline_ms
+            )
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, CACHE_CONTROL)
+        
+        recommend_kwargs = dict(
             user_goal=request.goal.strip(),
-            top_k=request.top_k
+            top_k=request.top_k,
+            with_cursor=True,
+            user_id=request.user_id,
+            explain=request.explain,
+            deadline_ms=request.deadline_ms
         )
         
+        def generate():
+            if profile_mode is None:
+                return recommendation_engine.recommend(**recommend_kwargs), None
+            return profile_call(
+                recommendation_engine.recommend, mode=profile_mode, **recommend_kwargs
+            )
+        
+        # Generate recommendations
+        start = time.perf_counter()
+        profile = None
+        degraded = False
+        ticket = admission.acquire() if admission is not None else None
+        if ticket is None:
+            result, profile = generate()
+        elif ticket == ADMIT:
+            try:
+                result, profile = await run_in_threadpool(generate)
+            finally:
+                admission.release((time.perf_counter() - start) * 1000)
+        else:
+            # Over the limit: answer from a lookup only. It may read the SQLite
+            # persistent cache, so it runs in the threadpool too
+            result = await run_in_threadpool(
+                lambda: recommendation_engine.recommend(cached_only=True, **recommend_kwargs)
+            )
+            if result is None:
+                admission.record_shed()
+                raise HTTPException(
+                    status_code=SHED_STATUS,
+                    detail="Server is overloaded, retry later",
+                    headers={"Retry-After": str(admission.retry_after())}
+                )
+            degraded = True
+        
+        if analytics is not None:
+            await log_analytics(make_event(
+                result, 'recommend_content',
+                latency_ms=(time.perf_counter() - start) * 1000,
+                user_id=request.user_id
+            ))
+        
+        if profile is not None:
+            result = {**result, "profile": profile}
+        # A deadline-cut result depends on timing, not just on the request
+        if result.get("coverage", 1.0) < 1.0:
+            etag = None
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL} if etag is not None else {}
+        if degraded:
+            headers["X-Degraded"] = "cached"
+        if use_msgpack:
+            return msgpack_response(result, headers)
+        if profile is not None:
+            return JSONResponse(content=result)
+        response.headers.update({**headers, "Vary": "Accept"})
         return result
     
     except HTTPException:
@@ -144,15 +747,218 @@ async def recommend_content(request: RecommendationRequest):
         )
 
 
-@app.get("/content/all")
-async def get_all_content():
-    """Get all available content items"""
+@app.post("/recommend_content/more", response_model=RecommendationPageResponse)
+async def recommend_more(request: LoadMoreRequest):
+    """
+    Load the next page of results for a cursor returned by /recommend_content.
+    
+    Args:
+        request: LoadMoreRequest containing the cursor and page size
+    
+    Returns:
+        RecommendationPageResponse with the next recommendations and cursor
+    
+    Raises:
+        HTTPException: If the cursor is invalid or loading fails
+    """
+    try:
+        start = time.perf_counter()
+        result = recommendation_engine.recommend_more(
+            cursor=request.cursor,
+            page_size=request.page_size,
+            explain=request.explain
+        )
+        if analytics is not None:
+            await log_analytics(make_event(
+                result, 'recommend_content/more',
+                latency_ms=(time.perf_counter() - start) * 1000
+            ))
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to load more recommendations: {str(e)}"
+        )
+
+
+@app.post("/recommend_content/batch", response_model=BatchRecommendationResponse)
+async def recommend_content_batch(
+    request: BatchRecommendationRequest,
+    accept: Optional[str] = Header(default=None)
+):
+    """
+    Generate recommendations for many independent goals in one scoring call.
+    
+    Args:
+        request: BatchRecommendationRequest with the goals and top_k
+        accept: 'application/x-msgpack' selects a MessagePack body with float32 vectors
+    
+    Returns:
+        BatchRecommendationResponse with one result per goal, in input order
+    
+    Raises:
+        HTTPException: If a goal is empty or recommendation generation fails, or 406
+            if only MessagePack is acceptable and it is unavailable
+    """
+    goals = [goal.strip() for goal in request.goals]
+    if any(not goal for goal in goals):
+        raise HTTPException(
+            status_code=400,
+            detail="Goal cannot be empty"
+        )
+    use_msgpack = negotiate_msgpack(accept)
+    
     try:
+        results = await run_in_threadpool(
+            recommendation_engine.recommend_batch, goals, top_k=request.top_k
+        )
+        if analytics is not None:
+            await log_analytics(*(make_event(result, 'recommend_content/batch') for result in results))
+        if use_msgpack:
+            return msgpack_response({"results": results})
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate recommendations: {str(e)}"
+        )
+
+
+# Goals scored per engine call while streaming an export
+EXPORT_CHUNK_SIZE = 500
+
+
+@app.post("/recommend_content/export")
+async def export_recommendations(request: ExportRequest):
+    """
+    Stream recommendations for many goals as JSON, CSV or Parquet.
+    
+    Goals are scored in chunks while the response is written, so the full export
+    is never held in memory.
+    
+    Args:
+        request: ExportRequest with the goals, top_k and format
+    
+    Returns:
+        Streaming file download
+    
+    Raises:
+        HTTPException: If a goal is empty or the format is unavailable
+    """
+    goals = [goal.strip() for goal in request.goals]
+    if any(not goal for goal in goals):
+        raise HTTPException(
+            status_code=400,
+            detail="Goal cannot be empty"
+        )
+    if request.format not in available_formats():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Export format '{request.format}' is not available on this server"
+        )
+    
+    def scored_results():
+        for start in range(0, len(goals), EXPORT_CHUNK_SIZE):
+            yield from recommendation_engine.recommend_batch(
+                goals[start:start + EXPORT_CHUNK_SIZE], top_k=request.top_k
+            )
+    
+    filename = f"future_self_recommendations.{EXPORT_EXTENSIONS[request.format]}"
+    return StreamingResponse(
+        iter_export(scored_results(), request.format, pack_vectors=request.pack_vectors),
+        media_type=EXPORT_FORMATS[request.format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.post("/recommend_content/multi", response_model=MultiGoalResponse)
+async def recommend_content_multi(request: MultiGoalRequest):
+    """
+    Generate one blended list of recommendations for several weighted goals.
+    
+    Args:
+        request: MultiGoalRequest with the goals, weights and aggregation
+    
+    Returns:
+        MultiGoalResponse with per-goal vectors and blended recommendations
+    
+    Raises:
+        HTTPException: If a goal is empty or recommendation generation fails
+    """
+    goals = [(item.goal.strip(), item.weight) for item in request.goals]
+    if any(not goal for goal, _ in goals):
+        raise HTTPException(
+            status_code=400,
+            detail="Goal cannot be empty"
+        )
+    
+    try:
+        start = time.perf_counter()
+        result = await run_in_threadpool(
+            recommendation_engine.recommend_multi,
+            goals=goals,
+            top_k=request.top_k,
+            aggregation=request.aggregation,
+            user_id=request.user_id
+        )
+        if analytics is not None:
+            # The blended vector is what was scored; the goal texts are logged together
+            await log_analytics(make_event(
+                {**result, 'user_goal': ' + '.join(goal for goal, _ in goals)},
+                'recommend_content/multi',
+                latency_ms=(time.perf_counter() - start) * 1000,
+                user_id=request.user_id
+            ))
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate recommendations: {str(e)}"
+        )
+
+
+@app.post("/consumption_events")
+async def record_consumption_events(request: ConsumptionEventsRequest):
+    """
+    Record, in bulk, which content users have consumed.
+    
+    Recorded items are excluded from later recommendations for the same user_id.
+    
+    Args:
+        request: ConsumptionEventsRequest with (user_id, content_id) events
+    
+    Returns:
+        Number of events and distinct users recorded
+    
+    Raises:
+        HTTPException: If a content ID is outside the catalog
+    """
+    try:
+        return recommendation_engine.record_consumption(
+            [(event.user_id, event.content_id) for event in request.events]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/content/all")
+async def get_all_content(if_none_match: Optional[str] = Header(default=None)):
+    """Get all available content items (serialized once per catalog version)"""
+    def build():
         content_df = recommendation_engine.data_loader.content_data
         return {
             "total_items": len(content_df),
             "content": content_df.to_dict(orient='records')
         }
+    
+    try:
+        return static_bodies.respond(
+            "/content/all", recommendation_engine.catalog_version, build, if_none_match
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -160,13 +966,168 @@ async def get_all_content():
         )
 
 
+@app.get("/content/{content_id}/similar", response_model=SimilarContentResponse)
+async def get_similar_content(content_id: int, top_k: int = Query(default=5, ge=1, le=20)):
+    """
+    Get the items most similar to a catalog item ("more like this").
+    
+    Served from precomputed neighbour lists, so the cost does not grow with the catalog.
+    
+    Args:
+        content_id: Catalog row ID, as returned in content_id
+        top_k: Number of similar items to return
+    
+    Returns:
+        The source item and its most similar items
+    
+    Raises:
+        HTTPException: If the content ID is unknown
+    """
+    try:
+        start = time.perf_counter()
+        result = recommendation_engine.similar_items(content_id, top_k=top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if analytics is not None:
+        # The source item's vector stands in for a goal vector
+        await log_analytics(make_event(
+            {**result, 'goal_vector': result['item']['content_vector']},
+            'content/similar',
+            latency_ms=(time.perf_counter() - start) * 1000
+        ))
+    return result
+
+
+@app.put("/content/{content_id}/vector")
+async def update_content_vector(content_id: int, request: ContentVectorUpdate,
+                                x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Change one item's skill vector.
+    
+    Loaded neighbour lists are updated incrementally and caches keyed by the old
+    catalog version stop matching; their persistent cache entries are deleted.
+    
+    Args:
+        content_id: Catalog row ID
+        request: New skill vector
+        x_admin_token: Admin token (required when FUTURE_SELF_ADMIN_TOKEN is set)
+    
+    Returns:
+        New catalog version, neighbour update counts and purged cache entries
+    
+    Raises:
+        HTTPException: 403 without a valid admin token, 400 if the content ID is
+            unknown or the vector is invalid
+    """
+    require_admin(x_admin_token)
+    if any(value < 0 or value > 1 for value in request.vector):
+        raise HTTPException(status_code=400, detail="Vector values must be between 0 and 1")
+    try:
+        result = recommendation_engine.update_content_vectors({content_id: request.vector})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if persistent_cache is not None:
+        result['purged_cache_entries'] = await run_in_threadpool(
+            persistent_cache.purge_other_versions, result['catalog_version']
+        )
+    return result
+
+
 @app.get("/skills")
-async def get_skill_dimensions():
+async def get_skill_dimensions(if_none_match: Optional[str] = Header(default=None)):
     """Get all skill dimensions used in the system"""
-    return {
-        "skill_dimensions": recommendation_engine.skill_dimensions,
-        "total_dimensions": len(recommendation_engine.skill_dimensions)
-    }
+    return static_bodies.respond(
+        "/skills", recommendation_engine.catalog_version,
+        lambda: {
+            "skill_dimensions": recommendation_engine.skill_dimensions,
+            "total_dimensions": len(recommendation_engine.skill_dimensions)
+        },
+        if_none_match
+    )
+
+
+@app.get("/admin/memory")
+async def get_memory_report(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Get the memory footprint of each engine component.
+    
+    Args:
+        x_admin_token: Admin token (required when FUTURE_SELF_ADMIN_TOKEN is set)
+    
+    Returns:
+        Bytes per component, shared or duplicated data, and the process RSS
+    """
+    require_admin(x_admin_token)
+    return engine_memory_report(recommendation_engine)
+
+
+@app.post("/admin/memory/snapshot")
+async def take_memory_snapshot(label: Optional[str] = Query(default=None),
+                               x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Take a tracemalloc snapshot (tracing starts with the first one).
+    
+    Args:
+        label: Optional snapshot name used by /admin/memory/diff (made unique if
+            already taken; the response has the label actually used)
+        x_admin_token: Admin token (required when FUTURE_SELF_ADMIN_TOKEN is set)
+    
+    Returns:
+        Snapshot label, traced totals and the retained snapshot labels
+    """
+    require_admin(x_admin_token)
+    return memory_tracker.snapshot(label)
+
+
+@app.get("/admin/memory/diff")
+async def diff_memory_snapshots(base: Optional[str] = Query(default=None),
+                                target: Optional[str] = Query(default=None),
+                                top: int = Query(default=20, ge=1, le=200),
+                                x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Compare two tracemalloc snapshots to find growing allocation sites.
+    
+    Args:
+        base: Older snapshot label (first retained snapshot by default)
+        target: Newer snapshot label (latest snapshot by default)
+        top: Number of allocation sites listed
+        x_admin_token: Admin token (required when FUTURE_SELF_ADMIN_TOKEN is set)
+    
+    Returns:
+        Total growth and the largest changes per source line
+    
+    Raises:
+        HTTPException: If fewer than two snapshots exist or a label is unknown
+    """
+    require_admin(x_admin_token)
+    try:
+        return memory_tracker.diff(base=base, target=target, top=top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/admin/taxonomy/reload")
+async def reload_taxonomy(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Re-read the keyword taxonomy file and swap in the new matcher.
+    
+    The file is FUTURE_SELF_TAXONOMY, or the file the current taxonomy came from.
+    On any error the current taxonomy stays in use.
+    
+    Args:
+        x_admin_token: Admin token (required when FUTURE_SELF_ADMIN_TOKEN is set)
+    
+    Returns:
+        Keyword and state counts, version and source of the taxonomy now in use
+    
+    Raises:
+        HTTPException: If the file cannot be read or is malformed
+    """
+    require_admin(x_admin_token)
+    try:
+        return recommendation_engine.reload_taxonomy(TAXONOMY_PATH)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Taxonomy reload failed: {str(e)}")
 
 
 # Run the application
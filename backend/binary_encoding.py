@@ -0,0 +1,236 @@
+"""
+Binary Response Encoding for the Future-Self Recommendation API
+MessagePack bodies for service-to-service callers, negotiated through the Accept
+header. Skill vectors (goal_vector, content_vector) are sent as raw little-endian
+float32 buffers instead of lists of JSON numbers: 28 bytes for 7 dimensions, copied
+straight into a numpy array on the client. Everything else keeps its JSON shape.
+
+Usage:
+    python binary_encoding.py --goals 1000 --top-k 10
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # Binary responses are optional
+    msgpack = None
+
+
+MSGPACK_MEDIA_TYPE = 'application/x-msgpack'
+
+# Media types accepted for MessagePack; the first is the one sent back
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/msgpack', 'application/vnd.msgpack')
+
+# Fields packed as float32 buffers wherever they occur in a response
+VECTOR_FIELDS = frozenset({'goal_vector', 'content_vector'})
+
+VECTOR_DTYPE = np.dtype('<f4')
+
+
+def msgpack_available() -> bool:
+    """
+    Returns whether MessagePack responses can be produced in this environment.
+
+    Returns:
+        True when the msgpack package is installed
+    """
+    return msgpack is not None
+
+
+def _parse_accept(accept: str) -> Dict[str, float]:
+    """
+    Parses an Accept header into media ranges and their q-values.
+
+    Returns:
+        Dictionary mapping lower-cased media ranges to q (the highest when repeated)
+    """
+    ranges = {}
+    for item in accept.split(','):
+        media_range, *params = (part.strip() for part in item.split(';'))
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_range = media_range.lower()
+        ranges[media_range] = max(q, ranges.get(media_range, 0.0))
+    return ranges
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """
+    Decides whether a client prefers MessagePack over JSON.
+
+    MessagePack wins when it is listed explicitly with a q-value at least as high as
+    JSON's (explicit or through application/* or */*). Without an Accept header, or
+    when msgpack is not listed, the response stays JSON.
+
+    Args:
+        accept: Accept header value
+
+    Returns:
+        True if the response should be MessagePack
+    """
+    if not accept:
+        return False
+    ranges = _parse_accept(accept)
+    msgpack_q = max(ranges.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    if msgpack_q <= 0:
+        return False
+    json_q = ranges.get('application/json', ranges.get('application/*', ranges.get('*/*', 0.0)))
+    return msgpack_q >= json_q
+
+
+def accepts_json(accept: Optional[str]) -> bool:
+    """
+    Returns whether JSON is an acceptable fallback for an Accept header.
+
+    Args:
+        accept: Accept header value
+
+    Returns:
+        True if JSON may be sent
+    """
+    if not accept:
+        return True
+    ranges = _parse_accept(accept)
+    return ranges.get('application/json', ranges.get('application/*', ranges.get('*/*', 0.0))) > 0
+
+
+def _pack_vectors(value):
+    """Replaces vector fields with float32 buffers, copying only containers on the way."""
+    if isinstance(value, dict):
+        return {
+            key: (
+                np.asarray(item, dtype=VECTOR_DTYPE).tobytes()
+                if key in VECTOR_FIELDS and item is not None else _pack_vectors(item)
+            )
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_pack_vectors(item) for item in value]
+    return value
+
+
+def _unpack_vectors(value, as_numpy: bool):
+    """Turns float32 buffers in vector fields back into arrays (or lists)."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in VECTOR_FIELDS and isinstance(item, (bytes, bytearray)):
+                vector = np.frombuffer(item, dtype=VECTOR_DTYPE)
+                value[key] = vector if as_numpy else vector.tolist()
+            else:
+                _unpack_vectors(item, as_numpy)
+    elif isinstance(value, list):
+        for item in value:
+            _unpack_vectors(item, as_numpy)
+    return value
+
+
+def _msgpack_default(value):
+    """Serializes numpy scalars and arrays that reach the packer."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_msgpack(content) -> bytes:
+    """
+    Serializes a response body as MessagePack with float32-packed vectors.
+
+    Args:
+        content: recommend() result, {'results': [...]} batch response, or any
+            JSON-like value
+
+    Returns:
+        MessagePack bytes
+
+    Raises:
+        RuntimeError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise RuntimeError("MessagePack encoding requires msgpack (pip install msgpack)")
+    return msgpack.packb(_pack_vectors(content), use_bin_type=True, default=_msgpack_default)
+
+
+def decode_msgpack(body: bytes, as_numpy: bool = True):
+    """
+    Parses a MessagePack response body.
+
+    Args:
+        body: Bytes produced by encode_msgpack
+        as_numpy: Return vectors as read-only float32 arrays over the body's buffers
+            (lists of floats when False)
+
+    Returns:
+        Decoded content with the same shape as the JSON response
+
+    Raises:
+        RuntimeError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise RuntimeError("MessagePack decoding requires msgpack (pip install msgpack)")
+    return _unpack_vectors(msgpack.unpackb(body, raw=False), as_numpy)
+
+
+def main():
+    """Compares JSON and MessagePack payload size and encode/decode time on engine results"""
+    from http_cache import serialize_json
+    from recommender import FutureSelfEngine
+
+    parser = argparse.ArgumentParser(description="Benchmark MessagePack against JSON responses")
+    parser.add_argument('--goals', type=int, default=1000, help="Goals in the batch payload")
+    parser.add_argument('--top-k', type=int, default=10, help="Recommendations per goal")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed repetitions per codec")
+    args = parser.parse_args()
+
+    if msgpack is None:
+        parser.exit(1, "msgpack is not installed (pip install msgpack)\n")
+
+    engine = FutureSelfEngine()
+    keywords = sorted(engine.taxonomy.keywords)
+    rng = np.random.default_rng(42)
+    goals = [
+        "I want to " + " and ".join(rng.choice(keywords, size=3, replace=False))
+        for _ in range(args.goals)
+    ]
+    payloads = {
+        'single': engine.recommend(goals[0], top_k=args.top_k),
+        'batch': {'results': engine.recommend_batch(goals, top_k=args.top_k)}
+    }
+
+    def timed(fn, value) -> float:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn(value)
+        return (time.perf_counter() - start) / args.repeat * 1000
+
+    print(f"{args.goals} goals, top {args.top_k}, {len(engine.skill_dimensions)} dimensions")
+    print(f"{'payload':>8} {'codec':>8} {'bytes':>11} {'ratio':>6} {'encode ms':>10} {'decode ms':>10}")
+    for name, content in payloads.items():
+        json_body = serialize_json(content)
+        packed_body = encode_msgpack(content)
+        rows = [
+            ('json', json_body, timed(serialize_json, content), timed(json.loads, json_body)),
+            ('msgpack', packed_body, timed(encode_msgpack, content), timed(decode_msgpack, packed_body))
+        ]
+        for codec, body, encode_ms, decode_ms in rows:
+            print(f"{name:>8} {codec:>8} {len(body):>11,} {len(body) / len(json_body):>6.2f} "
+                  f"{encode_ms:>10.3f} {decode_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Blocked Scoring for the Future-Self Recommendation Engine
+Scores a large catalog in fixed-size row blocks on a thread pool instead of one
+catalog-wide cosine_similarity call. Each block keeps only its own top-k, and the
+per-block candidates are merged at the end. Temporary memory is therefore bounded by
+threads x block size rather than by the catalog size. The heavy per-block work
+(row norms, the matrix product, partial selection) runs in numpy and BLAS with the
+GIL released, so blocks really do run in parallel.
+
+Usage:
+    python blocked.py --items 2000000 --threads 1 2 4 --block-size 16384
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from sharding import BLAS_THREAD_VARIABLES, top_k_rows
+
+# 16k rows x 7 float64 dimensions is under 1 MB per block, small enough to stay in
+# L2 cache together with the block's scores
+DEFAULT_BLOCK_SIZE = 16384
+
+
+def limit_blas_threads(n_threads: int) -> str:
+    """
+    Caps the threads BLAS may start for each call in this process.
+
+    Blocked scoring (and every uvicorn worker process) already supplies parallelism,
+    so leaving BLAS at one thread per core would oversubscribe the machine. Uses
+    threadpoolctl when installed. Otherwise sets the OMP/OpenBLAS/MKL variables,
+    which only affect BLAS libraries loaded after this call (for example in worker
+    processes started later).
+
+    Args:
+        n_threads: BLAS threads per call
+
+    Returns:
+        'threadpoolctl' or 'environment', naming the mechanism used
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        os.environ.update({name: str(n_threads) for name in BLAS_THREAD_VARIABLES})
+        return 'environment'
+    threadpool_limits(limits=n_threads, user_api='blas')
+    return 'threadpoolctl'
+
+
+def _cosine(block: np.ndarray, unit_goals: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarities of catalog rows against unit-length goal vectors.
+
+    One matrix product divided by the row norms, without the normalized copy of the
+    block that cosine_similarity makes; all-zero rows score 0 as there.
+
+    Returns:
+        Array of shape (n_goals, n_rows)
+    """
+    norms = np.sqrt(np.einsum('ij,ij->i', block, block))
+    return (block @ unit_goals.T).T / np.where(norms > 0, norms, 1.0)
+
+
+class BlockedScorer:
+    """
+    Thread-pooled, blocked top-k scorer.
+
+    Results follow the engine's ranking: score descending, ties broken by the higher
+    row index. Scores match cosine_similarity up to floating-point rounding.
+    """
+
+    def __init__(self, n_threads: Optional[int] = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            n_threads: Worker threads (one per core when omitted)
+            block_size: Catalog rows scored per task
+
+        Raises:
+            ValueError: If n_threads or block_size is not positive
+        """
+        n_threads = n_threads or os.cpu_count() or 1
+        if n_threads < 1 or block_size < 1:
+            raise ValueError("n_threads and block_size must be positive")
+        self.n_threads = n_threads
+        self.block_size = block_size
+        self._pool = (
+            ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix='score-block')
+            if n_threads > 1 else None
+        )
+        self.queries = 0
+        self.blocks = 0
+
+    def _block_top_k(self, vectors: np.ndarray, start: int, goal_matrix: np.ndarray, k: int,
+                     exclusion_mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores one block and keeps its best k rows per goal.
+
+        Returns:
+            Tuple of (global rows, scores), each of shape (n_goals, min(k, block rows));
+            excluded rows carry a score of -inf
+        """
+        block = vectors[start:start + self.block_size]
+        similarities = _cosine(block, goal_matrix)
+        if exclusion_mask is not None:
+            similarities[:, exclusion_mask[start:start + len(block)]] = -np.inf
+        # Tie-aware, so the merged result is exactly the head of the full ranking
+        candidates = np.stack([top_k_rows(goal_scores, k) for goal_scores in similarities])
+        return candidates + start, np.take_along_axis(similarities, candidates, axis=1)
+
+    def top_k(self, vectors: np.ndarray, goal_matrix: np.ndarray, top_k: int,
+              exclusion_mask: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Finds the best catalog rows for each goal.
+
+        Args:
+            vectors: Catalog vectors of shape (n_items, n_dims) (may be memory-mapped)
+            goal_matrix: Array of shape (n_goals, n_dims) of goal vectors
+            top_k: Rows returned per goal
+            exclusion_mask: Optional boolean mask of rows to skip, shared by all goals
+
+        Returns:
+            Per goal, a tuple of (row indices, scores) in ranking order; shorter than
+            top_k only when exclusions leave fewer rows
+        """
+        goal_matrix = normalize(np.atleast_2d(goal_matrix))
+        n_items = len(vectors)
+        if not n_items or top_k < 1:
+            return [(np.empty(0, dtype=np.intp), np.empty(0)) for _ in range(len(goal_matrix))]
+
+        starts = range(0, n_items, self.block_size)
+        if self._pool is None or len(starts) == 1:
+            parts = [self._block_top_k(vectors, start, goal_matrix, top_k, exclusion_mask)
+                     for start in starts]
+        else:
+            parts = list(self._pool.map(
+                lambda start: self._block_top_k(vectors, start, goal_matrix, top_k, exclusion_mask),
+                starts
+            ))
+        self.queries += 1
+        self.blocks += len(parts)
+
+        # Merge: at most top_k candidates per block and goal, so a full sort is cheap
+        rows = np.concatenate([part[0] for part in parts], axis=1)
+        scores = np.concatenate([part[1] for part in parts], axis=1)
+        ranking = np.lexsort((-rows, -scores))[:, :top_k]
+        rows = np.take_along_axis(rows, ranking, axis=1)
+        scores = np.take_along_axis(scores, ranking, axis=1)
+        return [
+            (goal_rows[goal_scores > -np.inf], goal_scores[goal_scores > -np.inf])
+            for goal_rows, goal_scores in zip(rows, scores)
+        ]
+
+    @staticmethod
+    def ranking_offset(vectors: np.ndarray, goal_vector: np.ndarray, rows: np.ndarray,
+                       scores: np.ndarray, exclusion_mask: Optional[np.ndarray] = None) -> int:
+        """
+        Locates the end of a top-k result in the full catalog ranking.
+
+        Cursors store positions in the full ranking, which also counts excluded rows.
+        Only the excluded rows are scored here to find how many rank ahead of the
+        last returned row.
+
+        Args:
+            vectors: Catalog vectors
+            goal_vector: Goal vector the result was scored for
+            rows: Returned row indices, in ranking order
+            scores: Their scores
+            exclusion_mask: Boolean mask of excluded rows, or None
+
+        Returns:
+            Ranking position after the last returned row (the catalog size when the
+            result ran out of rows)
+        """
+        n_items = len(vectors)
+        excluded = np.flatnonzero(exclusion_mask) if exclusion_mask is not None else np.empty(0, dtype=np.intp)
+        if not len(rows) or len(rows) + len(excluded) >= n_items:
+            # Every row was either returned or excluded
+            return n_items
+        if not len(excluded):
+            return len(rows)
+        excluded_scores = _cosine(vectors[excluded], normalize(np.atleast_2d(goal_vector)))[0]
+        last_row, last_score = rows[-1], scores[-1]
+        ahead = (excluded_scores > last_score) | ((excluded_scores == last_score) & (excluded > last_row))
+        return len(rows) + int(np.count_nonzero(ahead))
+
+    def stats(self) -> Dict:
+        """
+        Returns scorer settings and counters.
+
+        Returns:
+            Dictionary with thread count, block size, queries and blocks scored
+        """
+        return {
+            'threads': self.n_threads,
+            'block_size': self.block_size,
+            'queries': self.queries,
+            'blocks_scored': self.blocks
+        }
+
+    def close(self):
+        """Shuts the thread pool down."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def main():
+    """Benchmarks blocked scoring against the single-call path on a synthetic catalog"""
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Benchmark blocked multi-threaded scoring")
+    parser.add_argument('--items', type=int, default=2_000_000, help="Synthetic catalog size")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help="Thread counts to run")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="Rows per block")
+    parser.add_argument('--queries', type=int, default=20, help="Queries per run")
+    parser.add_argument('--top-k', type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+
+    print(f"BLAS threads limited via {limit_blas_threads(1)}")
+    rng = np.random.default_rng(42)
+    vectors = rng.random((args.items, 7))
+    goals = rng.random((args.queries, 7))
+
+    def measure(fn):
+        tracemalloc.start()
+        start = time.perf_counter()
+        results = [fn(goal) for goal in goals]
+        elapsed = (time.perf_counter() - start) / len(goals) * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return results, elapsed, peak / 1024 / 1024
+
+    def single_call(goal):
+        similarities = cosine_similarity(goal.reshape(1, -1), vectors)[0]
+        order = np.argsort(similarities)[::-1][:args.top_k]
+        return order, similarities[order]
+
+    reference, elapsed, peak = measure(single_call)
+    print(f"Catalog: {args.items:,} items, top {args.top_k}, block size {args.block_size:,}")
+    print(f"{'threads':>8} {'ms/query':>9} {'speedup':>8} {'peak MB':>8} {'parity':>7}")
+    print(f"{'single':>8} {elapsed:>9.2f} {1.0:>8.2f} {peak:>8.1f} {'':>7}")
+    for n_threads in args.threads:
+        scorer = BlockedScorer(n_threads=n_threads, block_size=args.block_size)
+        results, blocked_ms, blocked_peak = measure(lambda goal: scorer.top_k(vectors, goal, args.top_k)[0])
+        scorer.close()
+        parity = all(
+            np.allclose(ref_scores, scores, rtol=0, atol=1e-12)
+            for (_, ref_scores), (_, scores) in zip(reference, results)
+        )
+        print(f"{n_threads:>8} {blocked_ms:>9.2f} {elapsed / blocked_ms:>8.2f} "
+              f"{blocked_peak:>8.1f} {'ok' if parity else 'FAIL':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Result Cursors for the Future-Self Recommendation Engine
+Keeps the head of scored candidate orderings for a bounded time so "load more" pages
+can be served without rescoring the catalog.
+"""
+
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def encode_cursor(payload: Dict) -> str:
+    """
+    Encodes cursor state into an opaque URL-safe token.
+
+    Args:
+        payload: JSON-serializable cursor state
+
+    Returns:
+        Opaque cursor string
+    """
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """
+    Decodes a token produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor string
+
+    Returns:
+        Cursor state dictionary
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Malformed cursor: {str(e)}")
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
+
+
+class CursorStore:
+    """
+    Bounded, TTL-limited store of scored candidate orderings.
+
+    Orderings are keyed by catalog version and goal vector, so every user paging
+    through the same goal shares one entry. Only the first ``max_rows`` positions
+    of an ordering and their scores are kept (16 bytes per row), and entries are
+    evicted least recently used first beyond ``max_entries`` or ``max_bytes``.
+    Losing an entry (eviction or expiry) or paging past the stored head is never
+    fatal: the cursor itself carries enough state to rescore once.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0,
+                 max_rows: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Maximum number of orderings kept in memory
+            ttl_seconds: Lifetime of an ordering after it was last stored
+            max_rows: Leading positions of each ordering that are stored
+            max_bytes: Maximum bytes held by all stored orderings
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns the ordering stored under key, if it is still alive.
+
+        Args:
+            key: Ordering key
+
+        Returns:
+            Tuple of (leading row indices in ranking order, their scores in the same
+            order), or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, order, scores = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return order, scores
+
+    def put(self, key: str, order: np.ndarray, similarities: np.ndarray):
+        """
+        Stores the head of an ordering, evicting the least recently used ones
+        beyond capacity.
+
+        Args:
+            key: Ordering key
+            order: Catalog row indices sorted by descending similarity
+            similarities: Similarity scores indexed by catalog row
+        """
+        head = np.array(order[:self.max_rows])
+        scores = np.asarray(similarities)[head]
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, head, scores)
+            self._bytes += head.nbytes + scores.nbytes
+            while len(self._entries) > self.max_entries or (
+                    self._bytes > self.max_bytes and len(self._entries) > 1):
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        """Removes an entry and its bytes (called with the lock held)."""
+        _, order, scores = self._entries.pop(key)
+        self._bytes -= order.nbytes + scores.nbytes
+
+    def clear(self):
+        """Drops every stored ordering."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def nbytes(self) -> int:
+        """
+        Returns the memory held by stored orderings.
+
+        Returns:
+            Total bytes of the stored index and score arrays
+        """
+        with self._lock:
+            return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,166 @@
+"""
+Per-User Content Exclusions for the Future-Self Recommendation Engine
+Tracks which catalog rows each user has already consumed as compact bitsets.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class ExclusionStore:
+    """
+    Bounded in-memory store of consumed-content bitsets.
+
+    Each user is represented by one bit per catalog row (n_items / 8 bytes), so a
+    mask for scoring is a single unpack instead of a set lookup per candidate. Since
+    that cost grows with the catalog, the least recently used users are evicted
+    once either ``max_users`` or ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_users: int = 100_000, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_users: Maximum number of users whose bitsets are kept in memory
+            max_bytes: Maximum bytes held by all bitsets
+        """
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self._bitsets: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def record(self, user_id: str, content_ids: Iterable[int], n_items: int):
+        """
+        Marks content rows as consumed by a user.
+
+        Args:
+            user_id: User identifier
+            content_ids: Catalog row IDs the user consumed
+            n_items: Current catalog size
+
+        Raises:
+            ValueError: If a content ID is outside the catalog
+        """
+        ids = np.asarray(list(content_ids), dtype=np.int64)
+        if ids.size and (ids.min() < 0 or ids.max() >= n_items):
+            raise ValueError(f"Content IDs must be between 0 and {n_items - 1}")
+
+        n_bytes = (n_items + 7) // 8
+        with self._lock:
+            bits = self._bitsets.pop(user_id, None)
+            if bits is None:
+                bits = np.zeros(n_bytes, dtype=np.uint8)
+            else:
+                self._bytes -= bits.nbytes
+                if bits.size < n_bytes:
+                    # Catalog grew since the bitset was created
+                    bits = np.concatenate([bits, np.zeros(n_bytes - bits.size, dtype=np.uint8)])
+            np.bitwise_or.at(bits, ids >> 3, (1 << (ids & 7)).astype(np.uint8))
+            self._bitsets[user_id] = bits
+            self._bytes += bits.nbytes
+            # The user just recorded is always kept
+            while len(self._bitsets) > 1 and (
+                    len(self._bitsets) > self.max_users or self._bytes > self.max_bytes):
+                _, evicted = self._bitsets.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def record_events(self, events: Iterable[Tuple[str, int]], n_items: int) -> Dict[str, int]:
+        """
+        Records a bulk batch of consumption events.
+
+        Args:
+            events: Iterable of (user_id, content_id) pairs
+            n_items: Current catalog size
+
+        Returns:
+            Dictionary with the number of events and distinct users recorded
+
+        Raises:
+            ValueError: If a content ID is outside the catalog (nothing is recorded)
+        """
+        by_user: Dict[str, list] = {}
+        n_events = 0
+        for user_id, content_id in events:
+            content_id = int(content_id)
+            if content_id < 0 or content_id >= n_items:
+                raise ValueError(f"Content IDs must be between 0 and {n_items - 1}")
+            by_user.setdefault(user_id, []).append(content_id)
+            n_events += 1
+
+        for user_id, content_ids in by_user.items():
+            self.record(user_id, content_ids, n_items)
+
+        return {'events': n_events, 'users': len(by_user)}
+
+    def mask(self, user_id: Optional[str], n_items: int) -> Optional[np.ndarray]:
+        """
+        Returns a boolean mask over catalog rows the user has consumed.
+
+        Args:
+            user_id: User identifier (None for anonymous requests)
+            n_items: Current catalog size
+
+        Returns:
+            Boolean array of length n_items, or None if nothing is excluded
+        """
+        if user_id is None:
+            return None
+        with self._lock:
+            bits = self._bitsets.get(user_id)
+            if bits is None:
+                return None
+            self._bitsets.move_to_end(user_id)
+        mask = np.unpackbits(bits, count=min(n_items, bits.size * 8), bitorder='little').astype(bool)
+        if mask.size < n_items:
+            mask = np.concatenate([mask, np.zeros(n_items - mask.size, dtype=bool)])
+        return mask
+
+    def count(self, user_id: str) -> int:
+        """
+        Returns the number of consumed rows recorded for a user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Number of excluded catalog rows
+        """
+        with self._lock:
+            bits = self._bitsets.get(user_id)
+        if bits is None:
+            return 0
+        return int(np.unpackbits(bits).sum())
+
+    def clear(self, user_id: Optional[str] = None):
+        """
+        Forgets the exclusions of one user, or of every user.
+
+        Args:
+            user_id: User identifier, or None to clear the whole store
+        """
+        with self._lock:
+            if user_id is None:
+                self._bitsets.clear()
+                self._bytes = 0
+            else:
+                bits = self._bitsets.pop(user_id, None)
+                if bits is not None:
+                    self._bytes -= bits.nbytes
+
+    def nbytes(self) -> int:
+        """
+        Returns the memory held by the bitsets.
+
+        Returns:
+            Total bytes of all users' bitsets
+        """
+        with self._lock:
+            return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._bitsets)
@@ -0,0 +1,348 @@
+"""
+Result Export for the Future-Self Recommendation System
+Streams recommendation results (single or batch) as JSON, CSV or Parquet without
+building the whole document in memory. Shared by the API and the Streamlit apps.
+"""
+
+import base64
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+EXPORT_EXTENSIONS = {
+    'json': 'json',
+    'csv': 'csv',
+    'parquet': 'parquet',
+}
+
+# Number of recommendation rows buffered per CSV flush / Parquet row group
+ROWS_PER_CHUNK = 2000
+
+
+def available_formats() -> List[str]:
+    """
+    Returns the export formats usable in this environment.
+
+    Returns:
+        Format names; 'parquet' is only listed when pyarrow is installed
+    """
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pa is not None]
+
+
+def iter_results(payload) -> Iterator[Dict]:
+    """
+    Normalizes the accepted inputs into a stream of result dictionaries.
+
+    Args:
+        payload: A single recommend() result, a {'results': [...]} batch response,
+            or any iterable of results (including a generator)
+
+    Yields:
+        Result dictionaries with 'user_goal', 'goal_vector', 'skill_dimensions'
+        and 'recommendations'
+    """
+    if isinstance(payload, dict):
+        if 'recommendations' in payload:
+            yield payload
+            return
+        if 'results' in payload:
+            yield from payload['results']
+            return
+        raise ValueError("Unrecognized result payload")
+    yield from payload
+
+
+def pack_vector(vector: Iterable[float]) -> str:
+    """
+    Packs a vector as base64-encoded little-endian float32.
+
+    Args:
+        vector: Sequence of floats
+
+    Returns:
+        Base64 string (40 characters for 7 dimensions)
+    """
+    return base64.b64encode(np.asarray(vector, dtype='<f4').tobytes()).decode('ascii')
+
+
+def unpack_vector(packed: str) -> List[float]:
+    """
+    Reverses pack_vector.
+
+    Args:
+        packed: Base64 string produced by pack_vector
+
+    Returns:
+        List of floats
+    """
+    return np.frombuffer(base64.b64decode(packed), dtype='<f4').tolist()
+
+
+def _pack_result(result: Dict) -> Dict:
+    """Returns a copy of a result with its vectors packed as base64 float32."""
+    packed = dict(result)
+    packed['goal_vector'] = pack_vector(result['goal_vector'])
+    packed['recommendations'] = [
+        {**rec, 'content_vector': pack_vector(rec['content_vector'])}
+        for rec in result['recommendations']
+    ]
+    packed['vector_encoding'] = 'base64-float32'
+    return packed
+
+
+def iter_json(payload, pack_vectors: bool = False) -> Iterator[bytes]:
+    """
+    Streams results as one JSON array, serializing one result at a time.
+
+    Args:
+        payload: Result, batch response or iterable of results
+        pack_vectors: Encode vectors as base64 float32 instead of float lists
+
+    Yields:
+        UTF-8 encoded chunks of the JSON document
+    """
+    yield b'['
+    first = True
+    for result in iter_results(payload):
+        if pack_vectors:
+            result = _pack_result(result)
+        chunk = json.dumps(result, separators=(',', ':'), default=_json_default)
+        yield (chunk if first else ',' + chunk).encode('utf-8')
+        first = False
+    yield b']'
+
+
+def _json_default(value):
+    """Serializes numpy scalars and arrays that may appear in results."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _iter_rows(payload) -> Iterator[tuple]:
+    """
+    Flattens results into one row per recommendation.
+
+    Yields:
+        Tuples of (skill_dimensions, row dictionary)
+    """
+    for result in iter_results(payload):
+        dimensions = result['skill_dimensions']
+        for rank, rec in enumerate(result['recommendations'], 1):
+            yield dimensions, {
+                'goal': result.get('user_goal'),
+                'rank': rank,
+                'content_id': rec.get('content_id'),
+                'title': rec['title'],
+                'type': rec['type'],
+                'url': rec['url'],
+                'match_score': rec['match_score'],
+                'goal_vector': result['goal_vector'],
+                'content_vector': rec['content_vector'],
+            }
+
+
+def iter_csv(payload) -> Iterator[bytes]:
+    """
+    Streams results as CSV, one row per recommendation.
+
+    Vectors are written as one numeric column per skill dimension (goal_<dim> and
+    content_<dim>), which keeps the file compact and spreadsheet-friendly.
+
+    Args:
+        payload: Result, batch response or iterable of results
+
+    Yields:
+        UTF-8 encoded CSV chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    buffered = 0
+
+    for dimensions, row in _iter_rows(payload):
+        if not header_written:
+            writer.writerow(
+                ['goal', 'rank', 'content_id', 'title', 'type', 'url', 'match_score']
+                + [f'goal_{dim}' for dim in dimensions]
+                + [f'content_{dim}' for dim in dimensions]
+            )
+            header_written = True
+        writer.writerow(
+            [row['goal'], row['rank'], row['content_id'], row['title'], row['type'],
+             row['url'], f"{row['match_score']:.6f}"]
+            + [f"{x:.6g}" for x in row['goal_vector']]
+            + [f"{x:.6g}" for x in row['content_vector']]
+        )
+        buffered += 1
+        if buffered >= ROWS_PER_CHUNK:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            buffered = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(payload) -> Iterator[bytes]:
+    """
+    Streams results as Parquet, writing one row group per ROWS_PER_CHUNK rows.
+
+    Vectors are stored as fixed-size lists of float32.
+
+    Args:
+        payload: Result, batch response or iterable of results
+
+    Yields:
+        Chunks of the Parquet file
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    sink = _ChunkSink()
+    writer = None
+    columns = {name: [] for name in (
+        'goal', 'rank', 'content_id', 'title', 'type', 'url', 'match_score',
+        'goal_vector', 'content_vector'
+    )}
+
+    def flush(n_dims: int):
+        nonlocal writer
+        vector_type = pa.list_(pa.float32(), n_dims)
+        table = pa.table({
+            'goal': pa.array(columns['goal'], pa.string()),
+            'rank': pa.array(columns['rank'], pa.int32()),
+            'content_id': pa.array(columns['content_id'], pa.int64()),
+            'title': pa.array(columns['title'], pa.string()),
+            'type': pa.array(columns['type'], pa.string()),
+            'url': pa.array(columns['url'], pa.string()),
+            'match_score': pa.array(columns['match_score'], pa.float32()),
+            'goal_vector': pa.array(columns['goal_vector'], vector_type),
+            'content_vector': pa.array(columns['content_vector'], vector_type),
+        })
+        if writer is None:
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), table.schema)
+        writer.write_table(table)
+        for values in columns.values():
+            values.clear()
+
+    n_dims = None
+    for dimensions, row in _iter_rows(payload):
+        n_dims = len(dimensions)
+        for name, values in columns.items():
+            values.append(row[name])
+        if len(columns['goal']) >= ROWS_PER_CHUNK:
+            flush(n_dims)
+            yield sink.drain()
+
+    if columns['goal'] or writer is None:
+        flush(n_dims or 0)
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(payload, fmt: str, pack_vectors: bool = False) -> Iterator[bytes]:
+    """
+    Streams results in the requested format.
+
+    Args:
+        payload: Result, batch response or iterable of results
+        fmt: One of 'json', 'csv' or 'parquet'
+        pack_vectors: For JSON, encode vectors as base64 float32
+
+    Yields:
+        Encoded chunks of the export
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == 'json':
+        return iter_json(payload, pack_vectors=pack_vectors)
+    if fmt == 'csv':
+        return iter_csv(payload)
+    if fmt == 'parquet':
+        return iter_parquet(payload)
+    raise ValueError(f"Unknown export format '{fmt}', expected one of {list(EXPORT_FORMATS)}")
+
+
+def write_export(payload, fmt: str, fp, pack_vectors: bool = False) -> int:
+    """
+    Writes results in the requested format to a binary file object.
+
+    Args:
+        payload: Result, batch response or iterable of results
+        fmt: One of 'json', 'csv' or 'parquet'
+        fp: Binary file object opened for writing
+        pack_vectors: For JSON, encode vectors as base64 float32
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    for chunk in iter_export(payload, fmt, pack_vectors=pack_vectors):
+        fp.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def export_bytes(payload, fmt: str, pack_vectors: bool = False) -> bytes:
+    """
+    Returns a small export as bytes (e.g. a single result for a download button).
+
+    Args:
+        payload: Result, batch response or iterable of results
+        fmt: One of 'json', 'csv' or 'parquet'
+        pack_vectors: For JSON, encode vectors as base64 float32
+
+    Returns:
+        Encoded export
+    """
+    return b''.join(iter_export(payload, fmt, pack_vectors=pack_vectors))
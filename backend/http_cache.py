@@ -0,0 +1,141 @@
+"""
+HTTP Conditional Caching for the Future-Self Recommendation API
+Builds ETags from the catalog version (and whatever else a response depends on),
+evaluates If-None-Match, and keeps pre-serialized JSON bodies for responses that
+only change when the catalog does.
+"""
+
+import hashlib
+import json
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi.responses import Response
+
+
+def make_etag(*parts) -> str:
+    """
+    Builds a strong ETag from the values a response depends on.
+
+    Args:
+        *parts: JSON-serializable values (endpoint name, catalog version, request fields)
+
+    Returns:
+        Quoted entity tag
+    """
+    digest = hashlib.sha256(json.dumps(parts, separators=(',', ':'), default=str).encode('utf-8'))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluates an If-None-Match header against a current ETag.
+
+    Uses weak comparison, as required for If-None-Match: a W/ prefix is ignored.
+
+    Args:
+        if_none_match: Header value ('*' or a comma-separated list of entity tags)
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in candidates)
+
+
+def serialize_json(content) -> bytes:
+    """
+    Serializes a response body the way FastAPI's JSONResponse does.
+
+    Args:
+        content: JSON-serializable value
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """
+    Builds a 304 response for a matching If-None-Match.
+
+    Args:
+        etag: Current ETag
+        cache_control: Cache-Control header value
+
+    Returns:
+        Empty 304 response carrying the validators
+    """
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+
+
+class SerializedBodyCache:
+    """
+    Pre-serialized JSON bodies keyed by name, rebuilt when their version changes.
+
+    The ETag depends only on the name and version, so a matching If-None-Match is
+    answered before the body is built or even looked up.
+    """
+
+    def __init__(self, cache_control: str):
+        """
+        Args:
+            cache_control: Cache-Control header sent with every response
+        """
+        self.cache_control = cache_control
+        self._bodies: Dict[str, Tuple[str, bytes]] = {}
+        self.hits = 0
+        self.builds = 0
+        self.not_modified = 0
+
+    def respond(self, name: str, version: str, build: Callable[[], object],
+                if_none_match: Optional[str] = None) -> Response:
+        """
+        Returns a 304, the stored body, or a freshly built one.
+
+        Args:
+            name: Resource name (for example the endpoint path)
+            version: Version the body depends on (for example the catalog version)
+            build: Produces the JSON-serializable content on a miss
+            if_none_match: Client's If-None-Match header
+
+        Returns:
+            Response with ETag and Cache-Control headers
+        """
+        etag = make_etag(name, version)
+        if etag_matches(if_none_match, etag):
+            self.not_modified += 1
+            return not_modified(etag, self.cache_control)
+
+        cached = self._bodies.get(name)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            body = cached[1]
+        else:
+            self.builds += 1
+            body = serialize_json(build())
+            self._bodies[name] = (version, body)
+        return Response(
+            content=body, media_type='application/json',
+            headers={'ETag': etag, 'Cache-Control': self.cache_control}
+        )
+
+    def stats(self) -> Dict:
+        """
+        Returns cache counters.
+
+        Returns:
+            Dictionary with stored bodies, their total size, hits, builds and 304s
+        """
+        return {
+            'bodies': len(self._bodies),
+            'bytes': sum(len(body) for _, body in self._bodies.values()),
+            'hits': self.hits,
+            'builds': self.builds,
+            'not_modified': self.not_modified
+        }
@@ -0,0 +1,515 @@
+"""
+Catalog Ingestion Pipeline for the Future-Self Recommendation System
+Streams large CSV/JSONL catalog dumps in chunks, validates and deduplicates rows, and
+writes ready-to-serve engine artifacts without loading the whole dump into memory.
+
+Usage:
+    python ingest.py catalog.csv --output catalog_artifacts/
+    python ingest.py catalog.jsonl --output catalog_artifacts/ --chunk-size 200000
+
+Artifacts written to the output directory (<version> is the catalog version):
+    vectors.<version>.f32      raw skill vectors, float32, row-major (n_rows x n_dims)
+    normalized.<version>.f32   L2-normalized skill vectors, float32, row-major
+    metadata.<version>.csv     Title, Type, Description, URL columns
+    type_rows.<version>.i64    row IDs grouped by content type, int64; the rows of
+                               types[i] are type_offsets[i]:type_offsets[i + 1]
+    manifest.json              file names, row count, dimensions, content types and
+                               offsets, catalog version and ingestion report
+
+Every file is written under a temporary name and renamed into place, the manifest
+last, so readers see either the previous catalog or the new one in full. Files of a
+previous catalog are not overwritten (servers may have them memory-mapped); those
+older than the previous manifest's are deleted.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+METADATA_COLUMNS = ['Title', 'Type', 'Description', 'URL']
+DEFAULT_SKILL_DIMENSIONS = [
+    'Coding',
+    'Data Science',
+    'Leadership',
+    'Communication',
+    'Fitness',
+    'Mindfulness',
+    'Entrepreneurship'
+]
+ARTIFACT_FORMAT_VERSION = 3
+MAX_ERROR_SAMPLES = 20
+
+# Artifact files: name -> suffix; each is stored as <name>.<catalog version><suffix>
+ARTIFACT_FILES = {'vectors': '.f32', 'normalized': '.f32', 'metadata': '.csv', 'type_rows': '.i64'}
+_ARTIFACT_PATTERN = re.compile(
+    r'^(%s)\.[0-9a-f]{16}(\.f32|\.csv|\.i64)$' % '|'.join(ARTIFACT_FILES)
+)
+
+# Rows of type codes sorted per step while grouping rows by type
+TYPE_GROUP_BLOCK = 1_000_000
+
+
+class SeenHashes:
+    """
+    Memory-efficient set of 64-bit row hashes used for deduplication.
+
+    Hashes live in one sorted uint64 array (8 bytes per row) plus a smaller sorted
+    pending array. Each chunk's new hashes are merged into the pending array, and
+    only once it reaches ``merge_threshold`` is it merged into the main array, so
+    the whole set is rewritten once per ``merge_threshold`` rows instead of once
+    per chunk. Membership tests are binary searches in both arrays.
+    """
+
+    def __init__(self, merge_threshold: int = 1_000_000):
+        """
+        Args:
+            merge_threshold: Pending hashes accumulated before merging into the sorted array
+        """
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._pending = np.empty(0, dtype=np.uint64)
+        self.merge_threshold = merge_threshold
+
+    @staticmethod
+    def _insert(target: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        """Merges sorted hashes, none of them in target, into a sorted array in one pass."""
+        return np.insert(target, np.searchsorted(target, hashes), hashes)
+
+    @staticmethod
+    def _member(target: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        """Binary-searches sorted hashes in a sorted array."""
+        if not target.size:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(target, hashes)
+        positions[positions == target.size] = 0
+        return target[positions] == hashes
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Tests hashes for membership.
+
+        Args:
+            hashes: Array of uint64 hashes
+
+        Returns:
+            Boolean array, True where the hash was already added
+        """
+        # Searching in ascending order walks the large array front to back, which
+        # is several times faster than random probes
+        order = np.argsort(hashes)
+        ordered = hashes[order]
+        found = np.empty(len(hashes), dtype=bool)
+        found[order] = self._member(self._sorted, ordered) | self._member(self._pending, ordered)
+        return found
+
+    def add(self, hashes: np.ndarray):
+        """
+        Adds hashes to the set.
+
+        Args:
+            hashes: uint64 hashes not yet in the set (as filtered with contains)
+        """
+        hashes = np.sort(np.asarray(hashes, dtype=np.uint64))
+        first = np.ones(len(hashes), dtype=bool)
+        first[1:] = hashes[1:] != hashes[:-1]
+        hashes = hashes[first]
+        self._pending = self._insert(self._pending, hashes)
+        if self._pending.size >= self.merge_threshold:
+            self._sorted = self._insert(self._sorted, self._pending)
+            self._pending = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return int(self._sorted.size + self._pending.size)
+
+
+def read_chunks(path: str, chunk_size: int, fmt: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Reads a catalog dump in chunks.
+
+    Args:
+        path: CSV or JSONL file
+        chunk_size: Rows per chunk
+        fmt: 'csv' or 'jsonl' (inferred from the extension when omitted)
+
+    Yields:
+        DataFrame chunks
+    """
+    if fmt is None:
+        fmt = 'jsonl' if Path(path).suffix.lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+    if fmt == 'jsonl':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, keep_default_na=False,
+                               dtype={column: str for column in METADATA_COLUMNS})
+
+
+def validate_chunk(chunk: pd.DataFrame, skill_dimensions: List[str]) -> Dict:
+    """
+    Validates schema and vector ranges for one chunk.
+
+    Args:
+        chunk: Raw chunk read from the dump
+        skill_dimensions: Expected skill dimension columns
+
+    Returns:
+        Dictionary with the metadata frame, the float64 vector matrix, a boolean
+        'valid' mask and a per-row 'reason' array for rejected rows
+
+    Raises:
+        ValueError: If required columns are missing
+    """
+    missing = [column for column in METADATA_COLUMNS + skill_dimensions if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Catalog is missing required columns: {missing}")
+
+    metadata = chunk[METADATA_COLUMNS].fillna('').astype(str).apply(lambda column: column.str.strip())
+    vectors = chunk[skill_dimensions].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+    reason = np.full(len(chunk), '', dtype=object)
+    finite = np.isfinite(vectors).all(axis=1)
+    in_range = finite & ((vectors >= 0.0) & (vectors <= 1.0)).all(axis=1)
+    has_signal = vectors.sum(axis=1) > 0
+    has_title = (metadata['Title'] != '').to_numpy()
+    has_url = (metadata['URL'] != '').to_numpy()
+
+    reason[~has_url] = 'missing URL'
+    reason[~has_title] = 'missing Title'
+    reason[in_range & ~has_signal] = 'all-zero vector'
+    reason[finite & ~in_range] = 'vector value outside [0, 1]'
+    reason[~finite] = 'non-numeric vector value'
+
+    return {
+        'metadata': metadata,
+        'vectors': vectors,
+        'valid': reason == '',
+        'reason': reason
+    }
+
+
+def dedupe_hashes(metadata: pd.DataFrame, dedupe_key: str) -> np.ndarray:
+    """
+    Hashes the deduplication key of each row.
+
+    Args:
+        metadata: Validated metadata frame
+        dedupe_key: 'url', 'title' or 'url+title'
+
+    Returns:
+        uint64 hash per row
+    """
+    url = metadata['URL'].str.lower()
+    title = metadata['Title'].str.lower()
+    if dedupe_key == 'url':
+        key = url
+    elif dedupe_key == 'title':
+        key = title
+    else:
+        key = url + '\x1f' + title
+    return pd.util.hash_pandas_object(key, index=False).to_numpy(dtype=np.uint64)
+
+
+def ingest(source: str, output_dir: str, chunk_size: int = 100_000,
+           fmt: Optional[str] = None, dedupe_key: str = 'url',
+           skill_dimensions: Optional[List[str]] = None, strict: bool = False,
+           progress: bool = True) -> Dict:
+    """
+    Streams a catalog dump into engine artifacts.
+
+    Args:
+        source: CSV or JSONL catalog dump
+        output_dir: Directory receiving the artifacts
+        chunk_size: Rows processed per chunk
+        fmt: 'csv' or 'jsonl' (inferred from the extension when omitted)
+        dedupe_key: Deduplicate on 'url', 'title' or 'url+title'
+        skill_dimensions: Vector columns (defaults to the engine's 7 dimensions)
+        strict: Abort on the first invalid row instead of skipping it
+        progress: Print a line per chunk
+
+    Returns:
+        The manifest dictionary written to manifest.json
+
+    Raises:
+        ValueError: If required columns are missing, or a row is invalid in strict mode
+    """
+    skill_dimensions = list(skill_dimensions or DEFAULT_SKILL_DIMENSIONS)
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    # Everything is written under unique temporary names in the output directory
+    # (so the final renames stay on one file system) and renamed once complete
+    temp_paths = {}
+    for name in list(ARTIFACT_FILES) + ['type_codes', 'manifest']:
+        fd, temp_paths[name] = tempfile.mkstemp(dir=out, prefix=f'{name}.', suffix='.tmp')
+        os.close(fd)
+    try:
+        manifest = _write_artifacts(
+            source, out, temp_paths, chunk_size, fmt, dedupe_key, skill_dimensions, strict, progress
+        )
+    finally:
+        for temp_path in temp_paths.values():
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+    return manifest
+
+
+def _write_artifacts(source: str, out: Path, temp_paths: Dict[str, str], chunk_size: int,
+                     fmt: Optional[str], dedupe_key: str, skill_dimensions: List[str],
+                     strict: bool, progress: bool) -> Dict:
+    """
+    Streams the dump into the temporary files, then renames them into place.
+
+    Returns:
+        The manifest dictionary written to manifest.json
+    """
+    seen = SeenHashes()
+    types: Dict[str, int] = {}
+    # Separate digests so the version does not depend on chunk boundaries
+    vectors_digest = hashlib.sha256()
+    metadata_digest = hashlib.sha256()
+    report = {'rows_read': 0, 'rows_written': 0, 'rejected': 0, 'duplicates': 0,
+              'rejection_reasons': {}, 'error_samples': []}
+    start = time.perf_counter()
+
+    with open(temp_paths['vectors'], 'wb') as vectors_file, \
+            open(temp_paths['normalized'], 'wb') as normalized_file, \
+            open(temp_paths['type_codes'], 'wb') as codes_file, \
+            open(temp_paths['metadata'], 'w', newline='', encoding='utf-8') as metadata_file:
+
+        header = True
+        for chunk_number, chunk in enumerate(read_chunks(source, chunk_size, fmt)):
+            first_row = report['rows_read']
+            report['rows_read'] += len(chunk)
+            checked = validate_chunk(chunk, skill_dimensions)
+            valid = checked['valid']
+
+            for row in np.flatnonzero(~valid):
+                reason = checked['reason'][row]
+                if strict:
+                    raise ValueError(f"Row {first_row + row}: {reason}")
+                report['rejection_reasons'][reason] = report['rejection_reasons'].get(reason, 0) + 1
+                if len(report['error_samples']) < MAX_ERROR_SAMPLES:
+                    report['error_samples'].append({'row': int(first_row + row), 'reason': reason})
+            report['rejected'] += int((~valid).sum())
+
+            metadata = checked['metadata'][valid]
+            vectors = checked['vectors'][valid]
+
+            # Drop rows seen in earlier chunks, then duplicates within this chunk
+            hashes = dedupe_hashes(metadata, dedupe_key)
+            fresh = ~seen.contains(hashes)
+            _, first_index = np.unique(hashes, return_index=True)
+            first_in_chunk = np.zeros(len(hashes), dtype=bool)
+            first_in_chunk[first_index] = True
+            keep = fresh & first_in_chunk
+            report['duplicates'] += int(len(keep) - keep.sum())
+
+            metadata = metadata[keep]
+            vectors = vectors[keep].astype(np.float32)
+            seen.add(hashes[keep])
+
+            # Vectorized normalization for the whole chunk
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            normalized = vectors / np.where(norms > 0, norms, 1.0)
+
+            for content_type in metadata['Type'].unique():
+                types.setdefault(content_type, len(types))
+            if len(types) > np.iinfo(np.uint16).max:
+                raise ValueError("More than 65535 distinct content types")
+            codes_file.write(metadata['Type'].map(types).to_numpy(dtype=np.uint16).tobytes())
+
+            vectors_bytes = np.ascontiguousarray(vectors).tobytes()
+            vectors_file.write(vectors_bytes)
+            normalized_file.write(np.ascontiguousarray(normalized, dtype=np.float32).tobytes())
+            metadata_text = metadata.to_csv(index=False, header=header)
+            metadata_file.write(metadata_text)
+            header = False
+
+            vectors_digest.update(vectors_bytes)
+            metadata_digest.update(metadata_text.encode('utf-8'))
+            report['rows_written'] += len(metadata)
+
+            if progress:
+                print(f"chunk {chunk_number}: read {report['rows_read']:,}, "
+                      f"written {report['rows_written']:,}, rejected {report['rejected']:,}, "
+                      f"duplicates {report['duplicates']:,}")
+
+        if header:
+            metadata_file.write(','.join(METADATA_COLUMNS) + '\n')
+
+    n_rows = report['rows_written']
+    type_offsets = _group_rows_by_type(temp_paths['type_codes'], temp_paths['type_rows'], len(types))
+
+    catalog_version = hashlib.sha256(vectors_digest.digest() + metadata_digest.digest()).hexdigest()[:16]
+    files = {name: f'{name}.{catalog_version}{suffix}' for name, suffix in ARTIFACT_FILES.items()}
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'source': str(source),
+        'n_rows': n_rows,
+        'skill_dimensions': skill_dimensions,
+        'types': sorted(types, key=types.get),
+        'type_offsets': type_offsets,
+        'dedupe_key': dedupe_key,
+        'catalog_version': catalog_version,
+        'files': files,
+        'report': report,
+        'elapsed_seconds': round(time.perf_counter() - start, 3)
+    }
+
+    try:
+        previous_files = set(read_manifest(str(out))['files'].values())
+    except (OSError, ValueError, KeyError):
+        previous_files = set()
+    for name, file_name in files.items():
+        os.replace(temp_paths[name], out / file_name)
+    manifest_path = temp_paths['manifest']
+    with open(manifest_path, 'w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(manifest_path, out / 'manifest.json')
+
+    # Servers may still read the previous catalog's files; older ones are unused
+    for path in out.iterdir():
+        if _ARTIFACT_PATTERN.match(path.name) and path.name not in previous_files | set(files.values()):
+            path.unlink()
+    return manifest
+
+
+def _group_rows_by_type(codes_path: str, rows_path: str, n_types: int) -> List[int]:
+    """
+    Writes row IDs grouped by type code, in row order within each type.
+
+    The codes are read memory-mapped and sorted a block at a time, so memory stays
+    bounded by TYPE_GROUP_BLOCK rather than the catalog size.
+
+    Args:
+        codes_path: File of one uint16 type code per row
+        rows_path: Output file of int64 row IDs
+        n_types: Number of distinct codes
+
+    Returns:
+        n_types + 1 offsets into the row file where each type's rows start
+    """
+    n_rows = os.path.getsize(codes_path) // 2
+    if not n_rows:
+        return [0] * (n_types + 1)
+    codes = np.memmap(codes_path, dtype=np.uint16, mode='r')
+    counts = np.zeros(n_types, dtype=np.int64)
+    for start in range(0, n_rows, TYPE_GROUP_BLOCK):
+        counts += np.bincount(codes[start:start + TYPE_GROUP_BLOCK], minlength=n_types)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    rows = np.memmap(rows_path, dtype=np.int64, mode='w+', shape=(n_rows,))
+    positions = offsets[:-1].copy()
+    for start in range(0, n_rows, TYPE_GROUP_BLOCK):
+        block = codes[start:start + TYPE_GROUP_BLOCK]
+        order = np.argsort(block, kind='stable')
+        bounds = np.searchsorted(block[order], np.arange(n_types + 1))
+        for code in range(n_types):
+            group = order[bounds[code]:bounds[code + 1]] + start
+            rows[positions[code]:positions[code] + len(group)] = group
+            positions[code] += len(group)
+    rows.flush()
+    del rows, codes
+    return offsets.tolist()
+
+
+def read_manifest(artifacts_dir: str) -> Dict:
+    """
+    Reads and checks the manifest of an artifact directory.
+
+    Args:
+        artifacts_dir: Directory containing manifest.json
+
+    Returns:
+        The manifest dictionary
+
+    Raises:
+        ValueError: If the artifacts use another format version
+    """
+    with open(Path(artifacts_dir) / 'manifest.json', encoding='utf-8') as fp:
+        manifest = json.load(fp)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format_version')}")
+    return manifest
+
+
+def load_artifacts(artifacts_dir: str, mmap: bool = True) -> Dict:
+    """
+    Opens artifacts written by ingest.
+
+    Args:
+        artifacts_dir: Directory containing manifest.json
+        mmap: Memory-map the vector files instead of reading them
+
+    Returns:
+        Dictionary with the manifest, 'vectors', 'normalized', 'metadata' and
+        'type_rows' ({type: row IDs}, slices of one memory-mapped array)
+    """
+    root = Path(artifacts_dir)
+    manifest = read_manifest(artifacts_dir)
+
+    shape = (manifest['n_rows'], len(manifest['skill_dimensions']))
+    files = manifest['files']
+
+    def matrix(name: str) -> np.ndarray:
+        path = root / files[name]
+        if not shape[0]:
+            return np.zeros(shape, dtype=np.float32)
+        if mmap:
+            return np.memmap(path, dtype=np.float32, mode='r', shape=shape)
+        return np.fromfile(path, dtype=np.float32).reshape(shape)
+
+    metadata = pd.read_csv(root / files['metadata'], dtype=str, keep_default_na=False)
+
+    offsets = manifest['type_offsets']
+    if not shape[0]:
+        grouped = np.zeros(0, dtype=np.int64)
+    elif mmap:
+        grouped = np.memmap(root / files['type_rows'], dtype=np.int64, mode='r', shape=(shape[0],))
+    else:
+        grouped = np.fromfile(root / files['type_rows'], dtype=np.int64)
+    type_rows = {
+        content_type: grouped[offsets[i]:offsets[i + 1]]
+        for i, content_type in enumerate(manifest['types'])
+    }
+
+    return {
+        'manifest': manifest,
+        'vectors': matrix('vectors'),
+        'normalized': matrix('normalized'),
+        'metadata': metadata,
+        'type_rows': type_rows
+    }
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Ingest a catalog dump into engine artifacts")
+    parser.add_argument('source', help="CSV or JSONL catalog dump")
+    parser.add_argument('--output', required=True, help="Artifact output directory")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                        help="Input format (inferred from the extension by default)")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows per chunk")
+    parser.add_argument('--dedupe-key', choices=['url', 'title', 'url+title'], default='url',
+                        help="Column(s) identifying duplicate items")
+    parser.add_argument('--strict', action='store_true', help="Abort on the first invalid row")
+    args = parser.parse_args()
+
+    manifest = ingest(args.source, args.output, chunk_size=args.chunk_size, fmt=args.format,
+                      dedupe_key=args.dedupe_key, strict=args.strict)
+    report = manifest['report']
+    print(f"Ingested {report['rows_written']:,} of {report['rows_read']:,} rows "
+          f"({report['rejected']:,} rejected, {report['duplicates']:,} duplicates) "
+          f"in {manifest['elapsed_seconds']}s -> {args.output} "
+          f"(catalog {manifest['catalog_version']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Memory Accounting for the Future-Self Recommendation Engine
+Reports what each engine component costs in bytes, flags components that share (or
+duplicate) the same data, and keeps optional tracemalloc snapshots that can be diffed
+over time to find leaks.
+
+Usage:
+    python memory.py
+    python memory.py --catalog-dir catalog_artifacts/ --json
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _array_entry(name: str, array: np.ndarray) -> Dict:
+    """Describes an array component, including whether it owns its buffer."""
+    kind = 'memmap' if isinstance(array, np.memmap) or isinstance(getattr(array, 'base', None), np.memmap) else 'ndarray'
+    return {
+        'component': name,
+        'bytes': int(array.nbytes),
+        'kind': kind,
+        'owns_data': array.base is None,
+        'shape': list(array.shape),
+        'dtype': str(array.dtype)
+    }
+
+
+def process_rss() -> Optional[int]:
+    """
+    Returns the resident set size of this process.
+
+    Returns:
+        Bytes, or None where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def engine_memory_report(engine) -> Dict:
+    """
+    Measures the memory footprint of each engine component.
+
+    Array components are also checked pairwise with np.shares_memory, so a copy
+    (separate buffers holding the same data) is told apart from a view.
+
+    Args:
+        engine: FutureSelfEngine to measure
+
+    Returns:
+        Dictionary with a 'components' list, the 'total_bytes' across components,
+        'overlaps' (whether data extracted from content_data shares its buffers or
+        duplicates them) and the process RSS
+    """
+    loader = engine.data_loader
+    components: List[Dict] = []
+
+    # Only measure the frame when it exists: array-backed loaders build it lazily
+    content_data = loader.__dict__.get('content_data')
+    if content_data is not None:
+        components.append({
+            'component': 'data_loader.content_data',
+            'bytes': int(content_data.memory_usage(deep=True).sum()),
+            'kind': 'DataFrame',
+            'rows': len(content_data)
+        })
+        frame_vectors = content_data[loader.skill_dimensions].to_numpy(copy=False)
+    else:
+        frame_vectors = None
+
+    components.append(_array_entry('content_vectors', np.asarray(engine.content_vectors)))
+    # Lazily decoded metadata (ingested catalogs, snapshots) is reported, not loaded
+    metadata = _loaded_metadata(engine)
+    if metadata is not None:
+        components.append({
+            'component': 'content_metadata',
+            'bytes': int(metadata.memory_usage(deep=True).sum()),
+            'kind': 'DataFrame',
+            'rows': len(metadata)
+        })
+    else:
+        components.append({
+            'component': 'content_metadata',
+            'bytes': 0,
+            'kind': 'unloaded'
+        })
+    taxonomy = engine.taxonomy.stats()
+    components.append({
+        'component': 'keyword_taxonomy',
+        'bytes': taxonomy['bytes'],
+        'kind': 'automaton',
+        'entries': taxonomy['keywords']
+    })
+    if loader.unit_vectors is not None:
+        components.append(_array_entry('data_loader.unit_vectors', np.asarray(loader.unit_vectors)))
+    components.append({
+        'component': 'cursor_store',
+        'bytes': engine.cursor_store.nbytes(),
+        'kind': 'cache',
+        'entries': len(engine.cursor_store)
+    })
+    components.append({
+        'component': 'exclusion_store',
+        'bytes': engine.exclusion_store.nbytes(),
+        'kind': 'cache',
+        'entries': len(engine.exclusion_store)
+    })
+    if engine.answer_table is not None:
+        components.append({
+            'component': 'answer_table',
+            'bytes': engine.answer_table.stats()['bytes'],
+            'kind': 'index',
+            'entries': int(engine.answer_table.indices.shape[0])
+        })
+    if engine.neighbor_index is not None:
+        components.append({
+            'component': 'neighbor_index',
+            'bytes': engine.neighbor_index.stats()['bytes'],
+            'kind': 'index',
+            'entries': int(len(engine.neighbor_index.indices))
+        })
+    if engine.sorted_index is not None:
+        components.append({
+            'component': 'sorted_index',
+            'bytes': engine.sorted_index.nbytes(),
+            'kind': 'index',
+            'entries': int(len(engine.sorted_index.unit_vectors))
+        })
+    if engine.anytime_scorer is not None:
+        components.append({
+            'component': 'anytime_scorer',
+            'bytes': engine.anytime_scorer.nbytes(),
+            'kind': 'index',
+            'entries': int(len(engine.anytime_scorer.unit_vectors))
+        })
+    if engine.persistent_cache is not None:
+        stats = engine.persistent_cache.stats()
+        components.append({
+            'component': 'persistent_cache',
+            'bytes': 0,
+            'kind': 'on disk',
+            'disk_bytes': stats.get('bytes'),
+            'entries': stats.get('entries')
+        })
+
+    # Data the engine extracted from the frame: a view costs nothing, a copy doubles it
+    overlaps = []
+    if content_data is not None:
+        vectors = np.asarray(engine.content_vectors)
+        pairs = [(['data_loader.content_data', 'content_vectors'],
+                  bool(np.shares_memory(frame_vectors, vectors)), int(vectors.nbytes))]
+        if metadata is not None:
+            pairs.append((['data_loader.content_data', 'content_metadata'],
+                          _frames_share(content_data, metadata),
+                          int(metadata.memory_usage(deep=True, index=False).sum())))
+        for names, shared, size in pairs:
+            overlaps.append({
+                'components': names,
+                'shared': shared,
+                'duplicated_bytes': 0 if shared else size
+            })
+
+    return {
+        'catalog_version': engine.catalog_version,
+        'components': components,
+        'total_bytes': int(sum(component['bytes'] for component in components)),
+        'overlaps': overlaps,
+        'process_rss_bytes': process_rss(),
+        'tracemalloc': tracemalloc.is_tracing()
+    }
+
+
+def _loaded_metadata(engine) -> Optional[pd.DataFrame]:
+    """Returns the engine's metadata frame if it is already decoded, without decoding it."""
+    if engine._content_metadata is not None:
+        return engine._content_metadata
+    metadata = engine.data_loader._metadata
+    return metadata if isinstance(metadata, pd.DataFrame) else None
+
+
+def _column_buffers(column: pd.Series) -> List[int]:
+    """Returns the addresses of the data buffers behind a column (numpy or Arrow backed)."""
+    array = column.array
+    if hasattr(array, '__arrow_array__'):
+        # Arrow-backed: the Arrow array is exported zero-copy, to_numpy() would convert
+        arrow_array = array.__arrow_array__()
+        chunks = getattr(arrow_array, 'chunks', [arrow_array])
+        return [buffer.address for chunk in chunks for buffer in chunk.buffers() if buffer is not None]
+    return [column.to_numpy(copy=False).__array_interface__['data'][0]]
+
+
+def _frames_share(frame: pd.DataFrame, subset: pd.DataFrame) -> bool:
+    """Checks whether every column of subset is backed by the same buffers as in frame."""
+    return all(
+        _column_buffers(frame[column]) == _column_buffers(subset[column])
+        for column in subset.columns
+    )
+
+
+class MemoryTracker:
+    """
+    Keeps labelled tracemalloc snapshots and diffs them.
+
+    Tracing slows allocation-heavy code, so it only starts when start() is called
+    (or a snapshot is requested); snapshots are filtered to drop tracemalloc's own
+    bookkeeping and at most ``max_snapshots`` are kept.
+    """
+
+    def __init__(self, max_snapshots: int = 10, frames: int = 5):
+        """
+        Args:
+            max_snapshots: Snapshots retained (oldest dropped first)
+            frames: Stack frames stored per allocation while tracing
+        """
+        self.frames = frames
+        self.snapshots = deque(maxlen=max_snapshots)
+        self._taken = 0
+
+    def start(self):
+        """Starts tracing allocations if it is not already running."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        """Stops tracing and forgets the snapshots."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.snapshots.clear()
+
+    def snapshot(self, label: Optional[str] = None) -> Dict:
+        """
+        Takes a snapshot, starting tracing first if needed.
+
+        Labels are unique among retained snapshots: the default label is the
+        snapshot time plus a sequence number, and a label already in use gets the
+        sequence number appended.
+
+        Args:
+            label: Optional name (defaults to the snapshot time and sequence number)
+
+        Returns:
+            Dictionary with the label actually used, time and traced totals
+        """
+        self.start()
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        taken_at = time.time()
+        self._taken += 1
+        if not label:
+            label = f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(taken_at))}#{self._taken}"
+        elif any(item[0] == label for item in self.snapshots):
+            label = f"{label}#{self._taken}"
+        self.snapshots.append((label, taken_at, snap))
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'label': label,
+            'taken_at': taken_at,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'snapshots': [item[0] for item in self.snapshots]
+        }
+
+    def diff(self, base: Optional[str] = None, target: Optional[str] = None,
+             top: int = 20, key_type: str = 'lineno') -> Dict:
+        """
+        Compares two snapshots.
+
+        Args:
+            base: Label of the older snapshot (the first retained one by default)
+            target: Label of the newer snapshot (the latest by default)
+            top: Number of allocation sites listed
+            key_type: tracemalloc grouping, 'lineno', 'filename' or 'traceback'
+
+        Returns:
+            Dictionary with the labels, total growth and the largest changes
+
+        Raises:
+            ValueError: If fewer than two snapshots exist or a label is unknown
+        """
+        if len(self.snapshots) < 2:
+            raise ValueError("At least two snapshots are needed for a diff")
+        by_label = {label: snap for label, _, snap in self.snapshots}
+        base_label = base or self.snapshots[0][0]
+        target_label = target or self.snapshots[-1][0]
+        for label in (base_label, target_label):
+            if label not in by_label:
+                raise ValueError(f"Unknown snapshot '{label}'")
+
+        stats = by_label[target_label].compare_to(by_label[base_label], key_type)
+        return {
+            'base': base_label,
+            'target': target_label,
+            'size_diff_bytes': int(sum(stat.size_diff for stat in stats)),
+            'top': [
+                {
+                    'location': str(stat.traceback[0]) if stat.traceback else '?',
+                    'size_diff_bytes': stat.size_diff,
+                    'size_bytes': stat.size,
+                    'count_diff': stat.count_diff
+                }
+                for stat in stats[:top]
+            ]
+        }
+
+
+def format_report(report: Dict) -> str:
+    """
+    Renders an engine memory report as a text table.
+
+    Args:
+        report: Output of engine_memory_report
+
+    Returns:
+        Multi-line text
+    """
+    lines = [f"{'component':<28} {'kind':<16} {'MB':>10}"]
+    for component in sorted(report['components'], key=lambda item: -item['bytes']):
+        lines.append(f"{component['component']:<28} {component['kind']:<16} "
+                     f"{component['bytes'] / 1024 / 1024:>10.3f}")
+    lines.append(f"{'total':<28} {'':<16} {report['total_bytes'] / 1024 / 1024:>10.3f}")
+    if report['process_rss_bytes'] is not None:
+        lines.append(f"{'process RSS':<28} {'':<16} {report['process_rss_bytes'] / 1024 / 1024:>10.3f}")
+    for overlap in report['overlaps']:
+        state = 'shared' if overlap['shared'] else f"copied, {overlap['duplicated_bytes'] / 1024 / 1024:.3f} MB duplicated"
+        lines.append(f"{' -> '.join(overlap['components'])}: {state}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Prints the memory footprint of a freshly built engine"""
+    from recommender import DataLoader, FutureSelfEngine
+
+    parser = argparse.ArgumentParser(description="Report engine memory usage per component")
+    parser.add_argument('--catalog-dir', default=None,
+                        help="Ingested catalog artifacts (built-in catalog by default)")
+    parser.add_argument('--snapshot', default=None, help="Load the engine from a snapshot")
+    parser.add_argument('--trace', action='store_true',
+                        help="Trace allocations while the engine is built and list the top sites")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    tracker = MemoryTracker()
+    if args.trace:
+        tracker.snapshot('before')
+    if args.snapshot:
+        engine = FutureSelfEngine.from_snapshot(args.snapshot)
+    else:
+        loader = DataLoader.from_artifacts(args.catalog_dir) if args.catalog_dir else None
+        engine = FutureSelfEngine(data_loader=loader)
+    report = engine_memory_report(engine)
+    if args.trace:
+        tracker.snapshot('after')
+        report['allocations'] = tracker.diff(top=10)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(format_report(report))
+    if args.trace:
+        print("\nLargest allocation sites while building the engine:")
+        for site in report['allocations']['top']:
+            print(f"  {site['size_diff_bytes'] / 1024:>10.1f} KB  {site['location']}")
+
+
+if __name__ == "__main__":
+    main()
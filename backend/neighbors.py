@@ -0,0 +1,361 @@
+"""
+Item-to-Item Neighbours for the Future-Self Recommendation Engine
+Precomputes every catalog item's top-M most similar items (cosine over the content
+vectors) with a blocked matrix product, so the full n x n similarity matrix is never
+materialized, and serves "more like this" lookups by reading one stored row. The
+build is quadratic in the catalog size, so it runs offline; the API only loads the
+resulting file.
+
+Usage:
+    python neighbors.py --output neighbors.npz --neighbors 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from sharding import top_k_rows
+
+# Version 2: tied neighbours are ordered by higher item index
+NEIGHBORS_FORMAT_VERSION = 2
+
+# Bytes of per-block temporaries per (row, item) pair: the float32 similarity (the
+# top m are then selected one row at a time)
+BLOCK_BYTES_PER_CELL = 4
+
+# Default budget for those temporaries
+DEFAULT_MAX_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Returns L2-normalized float32 rows (all-zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _top_m(similarities: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Selects the best m columns of each row.
+
+    Args:
+        similarities: Array of shape (n_rows, n_items); excluded cells hold -inf
+        m: Columns kept per row
+
+    Returns:
+        Tuple of (indices, scores), each of shape (n_rows, m), ordered by score
+        and then by higher item index
+    """
+    # Tie-aware selection, one row at a time, so temporaries stay per row
+    candidates = np.stack([top_k_rows(row_scores, m) for row_scores in similarities])
+    return (candidates.astype(np.int32),
+            np.take_along_axis(similarities, candidates, axis=1).astype(np.float32))
+
+
+def block_rows(n_items: int, max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES) -> int:
+    """
+    Returns how many rows fit in one block scored against the whole catalog.
+
+    Args:
+        n_items: Catalog size
+        max_block_bytes: Budget for one block's temporaries
+
+    Returns:
+        Rows per block (at least 1)
+    """
+    return max(1, max_block_bytes // (BLOCK_BYTES_PER_CELL * max(n_items, 1)))
+
+
+class NeighborIndex:
+    """
+    Compact top-M neighbour lists: an int32 and a float32 array of shape (n_items, M).
+
+    At 7 dimensions and M=20 this is 160 bytes per item, against 4 * n_items bytes
+    per item for the dense similarity matrix.
+    """
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray, catalog_version: str):
+        """
+        Args:
+            indices: Array of shape (n_items, M) with neighbour rows in ranking order
+            scores: Array of shape (n_items, M) with the matching cosine similarities
+            catalog_version: Catalog version the lists were computed against
+        """
+        self.indices = indices
+        self.scores = scores
+        self.catalog_version = str(catalog_version)
+
+    @property
+    def m(self) -> int:
+        """Number of neighbours stored per item."""
+        return self.indices.shape[1]
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, catalog_version: str, m: int = 20,
+              max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES) -> "NeighborIndex":
+        """
+        Computes the neighbour lists of every item, one block of rows at a time.
+
+        Args:
+            vectors: Content vectors of shape (n_items, n_dims)
+            catalog_version: Catalog version stored with the lists
+            m: Neighbours kept per item (capped at n_items - 1)
+            max_block_bytes: Budget for a block's temporaries; the block holds as
+                many rows as fit, at 4 bytes per row and catalog item
+
+        Returns:
+            Built NeighborIndex
+        """
+        normalized = _normalize_rows(vectors)
+        n_items = len(normalized)
+        m = max(0, min(m, n_items - 1))
+        indices = np.empty((n_items, m), dtype=np.int32)
+        scores = np.empty((n_items, m), dtype=np.float32)
+        if m:
+            block_size = block_rows(n_items, max_block_bytes)
+            for start in range(0, n_items, block_size):
+                indices[start:start + block_size], scores[start:start + block_size] = \
+                    cls._block_neighbors(normalized, np.arange(start, min(start + block_size, n_items)), m)
+        return cls(indices, scores, catalog_version)
+
+    @staticmethod
+    def _block_neighbors(normalized: np.ndarray, rows: np.ndarray,
+                         m: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores a set of rows against the whole catalog and keeps their top m."""
+        similarities = normalized[rows] @ normalized.T
+        similarities[np.arange(len(rows)), rows] = -np.inf
+        return _top_m(similarities, m)
+
+    def neighbors(self, content_id: int, top_k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns an item's stored neighbours.
+
+        Args:
+            content_id: Catalog row ID
+            top_k: Number of neighbours (at most M; all of them when omitted)
+
+        Returns:
+            Tuple of (row IDs, scores) in ranking order
+
+        Raises:
+            ValueError: If the ID is outside the catalog
+        """
+        if content_id < 0 or content_id >= len(self.indices):
+            raise ValueError(f"Content ID must be between 0 and {len(self.indices) - 1}")
+        top_k = self.m if top_k is None else min(top_k, self.m)
+        return self.indices[content_id, :top_k], self.scores[content_id, :top_k]
+
+    def update(self, vectors: np.ndarray, changed_ids: Iterable[int], catalog_version: str,
+               block_size: int = 2048, max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES) -> Dict[str, int]:
+        """
+        Refreshes the lists after some items changed or were appended.
+
+        Changed items get their lists recomputed. Every other item is compared with
+        the changed items only: a changed item that now beats its M-th neighbour is
+        merged in, and items that listed a changed item are recomputed in full,
+        since its new score may push it below items that are not in the list.
+
+        Args:
+            vectors: Full content vectors after the change (rows may have been appended)
+            changed_ids: Rows whose vectors changed (appended rows are implied)
+            catalog_version: New catalog version
+            block_size: Rows compared with the changed items at a time
+            max_block_bytes: Budget for a recomputed block's temporaries
+
+        Returns:
+            Dictionary with the number of changed items, lists recomputed in full,
+            and lists updated by merging
+        """
+        normalized = _normalize_rows(vectors)
+        n_items = len(normalized)
+        n_old = len(self.indices)
+        changed = np.union1d(
+            np.asarray(list(changed_ids), dtype=np.int64),
+            np.arange(n_old, n_items, dtype=np.int64)
+        )
+        # Rows are only ever changed or appended, so the list width stays M
+        m = self.m
+        indices = np.empty((n_items, m), dtype=np.int32)
+        scores = np.empty((n_items, m), dtype=np.float32)
+        indices[:n_old], scores[:n_old] = self.indices, self.scores
+
+        # Rows that listed a changed item, plus the changed items themselves
+        stale = np.isin(indices[:n_old], changed).any(axis=1)
+        recompute = np.union1d(np.flatnonzero(stale), changed)
+
+        merged = 0
+        if m and len(changed):
+            # Merge changed items into the remaining lists where they now qualify
+            others = np.setdiff1d(np.arange(n_old), recompute)
+            for start in range(0, len(others), block_size):
+                rows = others[start:start + block_size]
+                candidate_scores = normalized[rows] @ normalized[changed].T
+                improves = candidate_scores > scores[rows, -1:]
+                improves |= (candidate_scores == scores[rows, -1:]) & (changed > indices[rows, -1:])
+                hit = improves.any(axis=1)
+                if not hit.any():
+                    continue
+                rows, candidate_scores = rows[hit], candidate_scores[hit]
+                pooled_scores = np.concatenate([scores[rows], candidate_scores.astype(np.float32)], axis=1)
+                pooled_indices = np.concatenate(
+                    [indices[rows], np.broadcast_to(changed, candidate_scores.shape).astype(np.int32)], axis=1
+                )
+                ranking = np.lexsort((-pooled_indices, -pooled_scores))[:, :m]
+                indices[rows] = np.take_along_axis(pooled_indices, ranking, axis=1)
+                scores[rows] = np.take_along_axis(pooled_scores, ranking, axis=1)
+                merged += len(rows)
+
+            recompute_block = block_rows(n_items, max_block_bytes)
+            for start in range(0, len(recompute), recompute_block):
+                rows = recompute[start:start + recompute_block]
+                indices[rows], scores[rows] = self._block_neighbors(normalized, rows, m)
+
+        self.indices, self.scores, self.catalog_version = indices, scores, str(catalog_version)
+        return {'changed': int(len(changed)), 'recomputed': int(len(recompute)), 'merged': merged}
+
+    def save(self, path: str):
+        """
+        Writes the lists to a compact .npz file.
+
+        The file is written under a unique temporary name next to the target and
+        renamed into place, so an API worker loading it never sees a partial file.
+
+        Args:
+            path: Output file path
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=target.name + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                np.savez(
+                    fp,
+                    indices=self.indices,
+                    scores=self.scores,
+                    catalog_version=np.array(self.catalog_version),
+                    format_version=np.int64(NEIGHBORS_FORMAT_VERSION)
+                )
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "NeighborIndex":
+        """
+        Reads lists written by save.
+
+        Args:
+            path: File path
+
+        Returns:
+            Loaded NeighborIndex
+
+        Raises:
+            ValueError: If the file uses an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['format_version']) != NEIGHBORS_FORMAT_VERSION:
+                raise ValueError(f"Unsupported neighbour list format {int(data['format_version'])}")
+            return cls(data['indices'], data['scores'], str(data['catalog_version']))
+
+    def stats(self) -> Dict:
+        """
+        Returns index statistics.
+
+        Returns:
+            Dictionary with item count, M, catalog version and size in bytes
+        """
+        return {
+            'items': int(len(self.indices)),
+            'neighbors': int(self.m),
+            'catalog_version': self.catalog_version,
+            'bytes': int(self.indices.nbytes + self.scores.nbytes)
+        }
+
+
+def load_matching(engine, path: str, m: int = 20) -> Optional[NeighborIndex]:
+    """
+    Loads prebuilt neighbour lists if they match the engine's catalog.
+
+    Nothing is built here: the lists are built offline with this module's CLI.
+
+    Args:
+        engine: FutureSelfEngine the lists must match
+        path: .npz file path
+        m: Neighbours kept per item
+
+    Returns:
+        NeighborIndex, or None if the file is missing, unreadable, stale or was
+        built with another M
+    """
+    expected_m = max(0, min(m, len(engine.content_vectors) - 1))
+    try:
+        index = NeighborIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if (index.catalog_version == engine.catalog_version
+            and len(index.indices) == len(engine.content_vectors)
+            and index.m == expected_m):
+        return index
+    return None
+
+
+def item_neighbors(vectors: np.ndarray, content_id: int, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes one item's top-m neighbours with a single pass over the catalog.
+
+    Used for lookups when no matching lists are loaded.
+
+    Args:
+        vectors: Content vectors of shape (n_items, n_dims)
+        content_id: Catalog row ID
+        m: Neighbours to return (capped at n_items - 1)
+
+    Returns:
+        Tuple of (row IDs, scores) in ranking order
+
+    Raises:
+        ValueError: If the ID is outside the catalog
+    """
+    if content_id < 0 or content_id >= len(vectors):
+        raise ValueError(f"Content ID must be between 0 and {len(vectors) - 1}")
+    m = max(0, min(m, len(vectors) - 1))
+    if not m:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    indices, scores = NeighborIndex._block_neighbors(_normalize_rows(vectors), np.array([content_id]), m)
+    return indices[0], scores[0]
+
+
+def main():
+    """Builds the neighbour lists for the current catalog"""
+    from recommender import DataLoader, FutureSelfEngine
+
+    parser = argparse.ArgumentParser(description="Precompute item-to-item neighbour lists")
+    parser.add_argument('--output', default='neighbors.npz', help="Output .npz file")
+    parser.add_argument('--neighbors', type=int, default=20, help="Neighbours kept per item")
+    parser.add_argument('--max-block-mb', type=int, default=DEFAULT_MAX_BLOCK_BYTES // (1024 * 1024),
+                        help="Memory budget for each block of rows scored against the catalog")
+    parser.add_argument('--catalog-dir', default=None,
+                        help="Ingested catalog artifacts (built-in catalog by default)")
+    args = parser.parse_args()
+
+    loader = DataLoader.from_artifacts(args.catalog_dir) if args.catalog_dir else None
+    engine = FutureSelfEngine(data_loader=loader)
+    start = time.perf_counter()
+    index = NeighborIndex.build(engine.content_vectors, engine.catalog_version,
+                                m=args.neighbors, max_block_bytes=args.max_block_mb * 1024 * 1024)
+    index.save(args.output)
+    stats = index.stats()
+    print(f"Built top {stats['neighbors']} neighbours for {stats['items']:,} items "
+          f"in {time.perf_counter() - start:.2f}s ({stats['bytes'] / 1024 / 1024:.1f} MB) "
+          f"-> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
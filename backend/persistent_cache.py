@@ -0,0 +1,258 @@
+"""
+Persistent Cache for the Future-Self Recommendation Engine
+Stores goal vectors and top-k results in a local SQLite file so they survive restarts
+and can be shared by several worker processes on the same host.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class PersistentCache:
+    """
+    SQLite-backed cache shared across restarts and worker processes.
+
+    Entries are tagged with the catalog version they were computed against, so a
+    catalog change never serves stale results. The database runs in WAL mode, which
+    lets any number of processes read concurrently while one of them writes. When the
+    total stored size grows past ``max_bytes`` the least recently used entries are
+    evicted.
+    """
+
+    GOAL_VECTOR = 'goal_vector'
+    RESULTS = 'results'
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 * 1024 * 1024,
+                 touch_interval: float = 60.0, evict_every: int = 256):
+        """
+        Args:
+            cache_dir: Directory holding the cache database (created if missing)
+            max_bytes: Upper bound on the total size of stored values
+            touch_interval: Minimum seconds between last-access updates of an entry,
+                so hot reads do not turn into a write per request
+            evict_every: Number of writes between size checks
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / 'future_self_cache.sqlite3'
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every
+
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    catalog_version TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (kind, key, catalog_version)
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the SQLite connection owned by the calling thread.
+
+        Returns:
+            Connection configured for concurrent multi-process access
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, kind: str, key: str, catalog_version: str) -> Optional[bytes]:
+        """
+        Reads a raw value and refreshes its last-access time when it is stale.
+
+        Returns:
+            Stored bytes, or None on a miss
+        """
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, last_access FROM entries "
+                "WHERE kind = ? AND key = ? AND catalog_version = ?",
+                (kind, key, catalog_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            now = time.time()
+            if now - row[1] > self.touch_interval:
+                with conn:
+                    conn.execute(
+                        "UPDATE entries SET last_access = ? "
+                        "WHERE kind = ? AND key = ? AND catalog_version = ?",
+                        (now, kind, key, catalog_version)
+                    )
+            return row[0]
+        except sqlite3.Error:
+            # The cache is an optimization; a locked or corrupt file must not fail requests
+            self.misses += 1
+            return None
+
+    def _put(self, kind: str, key: str, catalog_version: str, value: bytes):
+        """Writes a raw value and periodically enforces the size budget."""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(kind, key, catalog_version, value, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, key, catalog_version, value, len(value), time.time())
+                )
+        except sqlite3.Error:
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_every == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Evicts least recently used entries until the cache fits in ``max_bytes``.
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            conn = self._connection()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            # Free a little more than needed so we do not evict on every write
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            freed = 0
+            victims = []
+            for rowid, size in conn.execute(
+                "SELECT rowid, size FROM entries ORDER BY last_access"
+            ):
+                if total - freed <= target:
+                    break
+                victims.append((rowid,))
+                freed += size
+                removed += 1
+            with conn:
+                conn.executemany("DELETE FROM entries WHERE rowid = ?", victims)
+            return removed
+        except sqlite3.Error:
+            return 0
+
+    def purge_other_versions(self, catalog_version: str) -> int:
+        """
+        Deletes every entry computed against a different catalog version.
+
+        Args:
+            catalog_version: Version to keep
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM entries WHERE catalog_version != ?", (catalog_version,)
+                )
+            return cursor.rowcount
+        except sqlite3.Error:
+            return 0
+
+    def get_goal_vector(self, goal_key: str, catalog_version: str) -> Optional[np.ndarray]:
+        """
+        Looks up the goal vector for a normalized goal string.
+
+        Args:
+            goal_key: Normalized goal text
+            catalog_version: Catalog version the vector must belong to
+
+        Returns:
+            Goal vector, or None on a miss
+        """
+        value = self._get(self.GOAL_VECTOR, goal_key, catalog_version)
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float64).copy()
+
+    def put_goal_vector(self, goal_key: str, catalog_version: str, goal_vector: np.ndarray):
+        """Stores the goal vector for a normalized goal string."""
+        self._put(
+            self.GOAL_VECTOR, goal_key, catalog_version,
+            np.asarray(goal_vector, dtype=np.float64).tobytes()
+        )
+
+    def get_results(self, vector_key: str, catalog_version: str) -> Optional[List[Dict]]:
+        """
+        Looks up the top-k recommendations for a goal vector.
+
+        Args:
+            vector_key: Key derived from the goal vector and top_k
+            catalog_version: Catalog version the results must belong to
+
+        Returns:
+            List of recommendation dictionaries, or None on a miss
+        """
+        value = self._get(self.RESULTS, vector_key, catalog_version)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def put_results(self, vector_key: str, catalog_version: str, recommendations: List[Dict]):
+        """Stores the top-k recommendations for a goal vector."""
+        self._put(
+            self.RESULTS, vector_key, catalog_version,
+            json.dumps(recommendations, separators=(',', ':')).encode('utf-8')
+        )
+
+    def stats(self) -> Dict:
+        """
+        Returns cache statistics for this process.
+
+        Returns:
+            Dictionary with hit/miss counters, entry count and stored bytes
+        """
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            'path': str(self.db_path),
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,235 @@
+"""
+Request Profiling for the Future-Self Recommendation API
+Profiles single calls on demand, either deterministically (cProfile, reported as a
+pstats summary) or by stack sampling (reported as collapsed stacks that flame graph
+tools such as flamegraph.pl or speedscope read directly), and runs an optional
+periodic sampler that writes aggregated profiles to a directory.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+
+def _frame_stack(frame) -> str:
+    """Formats a frame and its callers as one collapsed stack, root first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """
+    Renders stack counts in the collapsed format ("root;child;leaf count" per line).
+
+    Args:
+        stacks: Counter of collapsed stack strings
+
+    Returns:
+        Text ready for flame graph tools
+    """
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of running threads from a background thread.
+
+    Each sample reads sys._current_frames(), so the sampled code runs unmodified and
+    the overhead is set by the sampling interval rather than by the call count.
+    """
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        """
+        Args:
+            interval: Seconds between samples
+            thread_id: Only sample this thread (every other thread when omitted)
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        """Takes one sample of the target thread(s)."""
+        own = threading.get_ident()
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, frame in frames.items():
+                if thread_id == own or (self.thread_id is not None and thread_id != self.thread_id):
+                    continue
+                self.stacks[_frame_stack(frame)] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> "StackSampler":
+        """Starts sampling in a daemon thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def drain(self) -> Counter:
+        """
+        Returns the stacks collected so far and starts a new aggregation window.
+
+        Returns:
+            Counter of collapsed stacks
+        """
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+            self.samples = 0
+        return stacks
+
+
+def profile_call(fn: Callable, *args, mode: str = 'cprofile', limit: int = 30,
+                 interval: float = 0.0005, **kwargs) -> Tuple[object, Dict]:
+    """
+    Runs a function under a profiler.
+
+    Args:
+        fn: Function to call
+        *args: Positional arguments for fn
+        mode: 'cprofile' for a deterministic pstats summary, or 'sampling' for
+            collapsed stacks of the calling thread
+        limit: Number of functions listed in the pstats summary
+        interval: Seconds between samples in sampling mode
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        Tuple of (fn's return value, profile dictionary with 'mode', 'format',
+        'elapsed_ms' and 'data')
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {list(PROFILE_MODES)}")
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        return result, {
+            'mode': mode,
+            'format': 'pstats',
+            'elapsed_ms': elapsed * 1000,
+            'data': output.getvalue()
+        }
+
+    sampler = StackSampler(interval=interval, thread_id=threading.get_ident()).start()
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+    return result, {
+        'mode': mode,
+        'format': 'collapsed',
+        'elapsed_ms': elapsed * 1000,
+        'samples': sum(sampler.stacks.values()),
+        'data': format_collapsed(sampler.stacks)
+    }
+
+
+class PeriodicProfiler:
+    """
+    Always-on low-rate sampler that writes one aggregated profile per window.
+
+    Files are named profile-<unix time in ms>.collapsed in the output directory; the
+    oldest are deleted beyond ``keep`` files. Nothing runs unless start() is called.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.01, window: float = 60.0,
+                 keep: int = 100):
+        """
+        Args:
+            output_dir: Directory receiving the profiles
+            interval: Seconds between samples (overhead scales with 1 / interval)
+            window: Seconds aggregated per written profile
+            keep: Number of profile files retained
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.window = window
+        self.keep = keep
+        self.sampler = StackSampler(interval=interval)
+        self.files_written = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _flush(self):
+        """Writes the current window if it holds any samples."""
+        stacks = self.sampler.drain()
+        if not stacks:
+            return
+        path = self.output_dir / f"profile-{int(time.time() * 1000)}.collapsed"
+        path.write_text(format_collapsed(stacks), encoding='utf-8')
+        self.files_written += 1
+        for old in sorted(self.output_dir.glob('profile-*.collapsed'))[:-self.keep]:
+            old.unlink(missing_ok=True)
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            self._flush()
+
+    def start(self) -> "PeriodicProfiler":
+        """Starts sampling and the window writer."""
+        self.sampler.start()
+        self._thread = threading.Thread(target=self._run, name='periodic-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling and writes the last partial window."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sampler.stop()
+        self._flush()
+
+    def stats(self) -> Dict:
+        """
+        Returns profiler settings and output counters.
+
+        Returns:
+            Dictionary with the output directory, interval, window and files written
+        """
+        return {
+            'output_dir': str(self.output_dir),
+            'interval_ms': self.sampler.interval * 1000,
+            'window_seconds': self.window,
+            'files_written': self.files_written
+        }
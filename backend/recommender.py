@@ -3,10 +3,26 @@ Future-Self Recommendation Engine
 Generates dummy content data and performs cosine similarity-based recommendations.
 """
 
+import hashlib
+import threading
+import time
+from functools import cached_property
 import pandas as pd
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple, Optional, Union
+
+from cursors import CursorStore, encode_cursor, decode_cursor
+from exclusions import ExclusionStore
+from answer_table import AnswerTable, load_or_build
+from ingest import load_artifacts
+from snapshot import load_snapshot, save_snapshot
+from neighbors import NeighborIndex, item_neighbors, load_matching as load_matching_neighbors
+from sharding import top_k_rows
+from taxonomy import KeywordTaxonomy, default_taxonomy
+from blocked import DEFAULT_BLOCK_SIZE, BlockedScorer
+from threshold import DEFAULT_MAX_DIMS, DEFAULT_MAX_FRACTION, SortedListIndex
+from anytime import AnytimeScorer
 
 
 class DataLoader:
@@ -15,6 +31,16 @@ class DataLoader:
     with 7-dimensional skill vectors.
     """
     
+    # Set by from_arrays for catalogs backed by (possibly memory-mapped) arrays; the
+    # metadata may be a function that decodes it on first use
+    _vectors: Optional[np.ndarray] = None
+    _metadata: Optional[Union[pd.DataFrame, Callable[[], pd.DataFrame]]] = None
+    
+    # Set by from_artifacts: the ingested L2-normalized rows and the manifest's
+    # catalog version (both dropped once a vector is changed)
+    unit_vectors: Optional[np.ndarray] = None
+    catalog_version: Optional[str] = None
+    
     def __init__(self):
         self.skill_dimensions = [
             'Coding', 
@@ -27,6 +53,61 @@ class DataLoader:
         ]
         self.content_data = self._generate_content()
     
+    @classmethod
+    def from_artifacts(cls, artifacts_dir: str) -> "DataLoader":
+        """
+        Loads a catalog produced by the ingestion pipeline (ingest.py).
+        
+        The float32 vector files stay memory-mapped, the normalized rows are used
+        for scoring and the manifest's catalog version is kept, so nothing is copied
+        or hashed at startup.
+        
+        Args:
+            artifacts_dir: Directory containing manifest.json and the artifact files
+        
+        Returns:
+            DataLoader serving the ingested catalog
+        """
+        artifacts = load_artifacts(artifacts_dir)
+        loader = cls.from_arrays(
+            artifacts['manifest']['skill_dimensions'], artifacts['vectors'], artifacts['metadata']
+        )
+        loader.unit_vectors = artifacts['normalized']
+        loader.catalog_version = artifacts['manifest']['catalog_version']
+        return loader
+    
+    @classmethod
+    def from_arrays(cls, skill_dimensions: List[str], vectors: np.ndarray,
+                    metadata: Union[pd.DataFrame, Callable[[], pd.DataFrame]]) -> "DataLoader":
+        """
+        Wraps an already-built catalog without copying the vectors.
+        
+        Args:
+            skill_dimensions: Skill dimension names, in vector order
+            vectors: Array of shape (n_items, n_dims), e.g. memory-mapped from a snapshot
+            metadata: Title, Type, Description and URL columns, or a function
+                returning them (called on first use)
+        
+        Returns:
+            DataLoader serving the given arrays
+        """
+        loader = cls.__new__(cls)
+        loader.skill_dimensions = list(skill_dimensions)
+        loader._vectors = vectors
+        loader._metadata = metadata
+        return loader
+    
+    @cached_property
+    def content_data(self) -> pd.DataFrame:
+        """
+        Full catalog frame for array-backed loaders, assembled on first access.
+        
+        Returns:
+            DataFrame with metadata and skill dimension columns
+        """
+        vectors = pd.DataFrame(np.asarray(self._vectors), columns=self.skill_dimensions)
+        return pd.concat([self.get_content_metadata(), vectors], axis=1)
+    
     def _generate_content(self) -> pd.DataFrame:
         """
         Generates at least 15 content items with skill vectors.
@@ -273,6 +354,26 @@ class DataLoader:
         
         return pd.DataFrame(content_items)
     
+    def update_vectors(self, content_ids: np.ndarray, vectors: np.ndarray):
+        """
+        Overwrites the skill vectors of some catalog rows.
+        
+        Args:
+            content_ids: Row IDs to update
+            vectors: Array of shape (len(content_ids), n_dims) with the new vectors
+        """
+        self.unit_vectors = None
+        self.catalog_version = None
+        if self._vectors is not None:
+            # Array-backed (possibly read-only memory-mapped): copy on first write
+            updated = np.array(self._vectors, dtype=np.float64)
+            updated[content_ids] = vectors
+            self._vectors = updated
+            self.__dict__.pop('content_data', None)
+        else:
+            columns = [self.content_data.columns.get_loc(dim) for dim in self.skill_dimensions]
+            self.content_data.iloc[content_ids, columns] = vectors
+    
     def get_content_vectors(self) -> np.ndarray:
         """
         Extracts the skill vectors from the content data.
@@ -280,6 +381,8 @@ class DataLoader:
         Returns:
             Numpy array of shape (n_items, 7) with skill vectors
         """
+        if self._vectors is not None:
+            return self._vectors
         return self.content_data[self.skill_dimensions].values
     
     def get_content_metadata(self) -> pd.DataFrame:
@@ -289,100 +392,210 @@ class DataLoader:
         Returns:
             DataFrame with metadata columns
         """
+        if callable(self._metadata):
+            self._metadata = self._metadata()
+        if self._metadata is not None:
+            return self._metadata
         return self.content_data[['Title', 'Type', 'Description', 'URL']]
 
 
+AGGREGATIONS = ('weighted_sum', 'max', 'round_robin')
+
+
 class FutureSelfEngine:
     """
     Core recommendation engine that converts user goals into vectors
     and finds similar content using cosine similarity.
     """
     
-    def __init__(self):
-        self.data_loader = DataLoader()
+    def __init__(self, persistent_cache=None, cursor_store: Optional[CursorStore] = None,
+                 exclusion_store: Optional[ExclusionStore] = None,
+                 data_loader: Optional[DataLoader] = None,
+                 catalog_version: Optional[str] = None,
+                 keyword_mapping: Optional[Dict] = None,
+                 taxonomy: Optional[KeywordTaxonomy] = None):
+        """
+        Args:
+            persistent_cache: Optional PersistentCache shared across restarts and
+                worker processes for goal vectors and top-k results
+            cursor_store: Store for scored orderings used by "load more" cursors
+                (a default bounded store is created when omitted)
+            exclusion_store: Store of per-user consumed content excluded from results
+                (a default bounded store is created when omitted)
+            data_loader: Catalog source (defaults to the built-in dummy catalog; use
+                DataLoader.from_artifacts for an ingested one)
+            catalog_version: Known version of the catalog (the data loader's, or
+                computed from the contents when omitted)
+            keyword_mapping: In-memory keyword table, {keyword: dimension} or
+                {keyword: {dimension: weight}} (the bundled taxonomy file is used
+                when neither this nor taxonomy is given)
+            taxonomy: Compiled KeywordTaxonomy
+        """
+        self.data_loader = data_loader if data_loader is not None else DataLoader()
         self.skill_dimensions = self.data_loader.skill_dimensions
         self.content_vectors = self.data_loader.get_content_vectors()
-        self.content_metadata = self.data_loader.get_content_metadata()
-        
-        # Keyword mapping for goal-to-vector conversion
-        self.keyword_mapping = {
-            # Coding keywords
-            'code': 'Coding',
-            'coding': 'Coding',
-            'programmer': 'Coding',
-            'developer': 'Coding',
-            'software': 'Coding',
-            'engineer': 'Coding',
-            'python': 'Coding',
-            'java': 'Coding',
-            'javascript': 'Coding',
-            'fullstack': 'Coding',
-            'backend': 'Coding',
-            'frontend': 'Coding',
-            
-            # Data Science keywords
-            'data': 'Data Science',
-            'science': 'Data Science',
-            'ml': 'Data Science',
-            'ai': 'Data Science',
-            'machine learning': 'Data Science',
-            'artificial intelligence': 'Data Science',
-            'analytics': 'Data Science',
-            'analyst': 'Data Science',
-            'deep learning': 'Data Science',
-            
-            # Leadership keywords
-            'lead': 'Leadership',
-            'leader': 'Leadership',
-            'leadership': 'Leadership',
-            'manager': 'Leadership',
-            'management': 'Leadership',
-            'cto': 'Leadership',
-            'ceo': 'Leadership',
-            'director': 'Leadership',
-            'executive': 'Leadership',
-            'vp': 'Leadership',
-            
-            # Communication keywords
-            'communication': 'Communication',
-            'speak': 'Communication',
-            'speaking': 'Communication',
-            'presentation': 'Communication',
-            'writing': 'Communication',
-            'influence': 'Communication',
-            'persuasion': 'Communication',
-            'networking': 'Communication',
-            
-            # Fitness keywords
-            'fit': 'Fitness',
-            'fitness': 'Fitness',
-            'health': 'Fitness',
-            'workout': 'Fitness',
-            'exercise': 'Fitness',
-            'gym': 'Fitness',
-            'athlete': 'Fitness',
-            'physical': 'Fitness',
-            
-            # Mindfulness keywords
-            'mindful': 'Mindfulness',
-            'mindfulness': 'Mindfulness',
-            'meditation': 'Mindfulness',
-            'zen': 'Mindfulness',
-            'peace': 'Mindfulness',
-            'calm': 'Mindfulness',
-            'spiritual': 'Mindfulness',
-            'awareness': 'Mindfulness',
-            
-            # Entrepreneurship keywords
-            'entrepreneur': 'Entrepreneurship',
-            'entrepreneurship': 'Entrepreneurship',
-            'startup': 'Entrepreneurship',
-            'business': 'Entrepreneurship',
-            'founder': 'Entrepreneurship',
-            'venture': 'Entrepreneurship',
-            'company': 'Entrepreneurship',
-            'innovation': 'Entrepreneurship',
-        }
+        self._content_metadata: Optional[pd.DataFrame] = None
+        self.catalog_version = (
+            catalog_version or self.data_loader.catalog_version or self._compute_catalog_version()
+        )
+        self.persistent_cache = persistent_cache
+        self.cursor_store = cursor_store if cursor_store is not None else CursorStore()
+        self.exclusion_store = exclusion_store if exclusion_store is not None else ExclusionStore()
+        self.answer_table: Optional[AnswerTable] = None
+        self.neighbor_index: Optional[NeighborIndex] = None
+        self.neighbors_path: Optional[str] = None
+        self.blocked_scorer: Optional[BlockedScorer] = None
+        self.sorted_index: Optional[SortedListIndex] = None
+        self.anytime_scorer: Optional[AnytimeScorer] = None
+        # Serializes lazy builds, so concurrent first requests build the layout once
+        self._build_lock = threading.Lock()
+        
+        # Compiled keyword matcher for goal-to-vector conversion; replaced as a whole
+        # by reload_taxonomy, so readers take one reference per request
+        if taxonomy is not None:
+            self.taxonomy = taxonomy
+        elif keyword_mapping is not None:
+            self.taxonomy = KeywordTaxonomy.from_mapping(keyword_mapping, self.skill_dimensions)
+        else:
+            self.taxonomy = default_taxonomy(tuple(self.skill_dimensions))
+    
+    @property
+    def content_metadata(self) -> pd.DataFrame:
+        """Title, Type, Description and URL columns, fetched from the loader on first use."""
+        if self._content_metadata is None:
+            self._content_metadata = self.data_loader.get_content_metadata()
+        return self._content_metadata
+    
+    @property
+    def keyword_mapping(self) -> Dict[str, Dict[str, float]]:
+        """Keyword table as {keyword: {dimension: weight}}."""
+        return self.taxonomy.mapping
+    
+    def reload_taxonomy(self, path: Optional[str] = None) -> Dict:
+        """
+        Loads a keyword taxonomy file and swaps it in without a restart.
+        
+        The new matcher is compiled completely before the engine's reference is
+        replaced, so concurrent requests see either the old or the new taxonomy.
+        Goal vectors cached under the old taxonomy stop matching.
+        
+        Args:
+            path: JSON or CSV taxonomy file (the current taxonomy's source by default)
+        
+        Returns:
+            Statistics of the taxonomy now in use
+        
+        Raises:
+            ValueError: If the file is malformed or no path is known
+            OSError: If the file cannot be read
+        """
+        path = path or self.taxonomy.source
+        if not path:
+            raise ValueError("No taxonomy file to reload from")
+        self.taxonomy = KeywordTaxonomy.load(path, self.skill_dimensions, reuse=self.taxonomy)
+        return self.taxonomy.stats()
+    
+    @classmethod
+    def from_snapshot(cls, path: str, verify: bool = True, **kwargs) -> "FutureSelfEngine":
+        """
+        Creates an engine from a snapshot written by save_snapshot.
+        
+        The scoring matrix, pre-normalized rows and any saved threshold or deadline
+        index are memory-mapped, the metadata is decoded on first use, and the
+        catalog version and compiled keyword matcher are read from the file, so
+        nothing is recomputed at startup.
+        
+        Args:
+            path: Snapshot file path
+            verify: Check section checksums while loading
+            **kwargs: Other constructor arguments (persistent_cache, stores)
+        
+        Returns:
+            FutureSelfEngine serving the snapshot's catalog
+        
+        Raises:
+            ValueError: If the file is not a valid snapshot or a checksum does not match
+        """
+        snapshot = load_snapshot(path, verify=verify)
+        data_loader = DataLoader.from_arrays(
+            snapshot['skill_dimensions'], snapshot['vectors'], snapshot['metadata']
+        )
+        data_loader.unit_vectors = snapshot['unit_vectors']
+        data_loader.catalog_version = snapshot['header'].get('source_catalog_version')
+        engine = cls(
+            data_loader=data_loader,
+            catalog_version=snapshot['catalog_version'],
+            taxonomy=snapshot['taxonomy'],
+            **kwargs
+        )
+        engine.sorted_index = snapshot['sorted_index']
+        engine.anytime_scorer = snapshot['anytime_scorer']
+        return engine
+    
+    def save_snapshot(self, path: str) -> Dict:
+        """
+        Writes the engine's catalog, indexes and keyword matcher to a snapshot file.
+        
+        Args:
+            path: Output file path
+        
+        Returns:
+            The snapshot header
+        """
+        return save_snapshot(self, path)
+    
+    def _compute_catalog_version(self) -> str:
+        """
+        Derives a short version identifier from the catalog contents.
+        
+        Returns:
+            Hex digest that changes whenever content vectors or metadata change
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(self.content_vectors, dtype=np.float64).tobytes())
+        digest.update(self.content_metadata.to_json(orient='values').encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
+    @staticmethod
+    def _normalize_goal(user_goal: str) -> str:
+        """
+        Normalizes goal text into a cache key without changing keyword matches.
+        
+        Args:
+            user_goal: User's goal statement
+        
+        Returns:
+            Lowercased, stripped goal text
+        """
+        return user_goal.strip().lower()
+    
+    @staticmethod
+    def _vector_key(goal_vector: np.ndarray) -> str:
+        """
+        Builds a stable key for a goal vector.
+        
+        Args:
+            goal_vector: Normalized goal vector
+        
+        Returns:
+            Hex digest identifying the vector
+        """
+        rounded = np.round(np.asarray(goal_vector, dtype=np.float64), 9)
+        return hashlib.sha1(rounded.tobytes()).hexdigest()
+    
+    @classmethod
+    def _results_key(cls, goal_vector: np.ndarray, top_k: int) -> str:
+        """
+        Builds the results cache key for a goal vector and result size.
+        
+        Args:
+            goal_vector: Normalized goal vector
+            top_k: Number of recommendations requested
+        
+        Returns:
+            Key identifying the query
+        """
+        return f"{cls._vector_key(goal_vector)}:{top_k}"
     
     def text_to_vector(self, user_goal: str) -> np.ndarray:
         """
@@ -394,19 +607,60 @@ class FutureSelfEngine:
         Returns:
             Numpy array of shape (7,) representing the goal vector
         """
-        # Initialize vector with zeros
-        goal_vector = {dim: 0.0 for dim in self.skill_dimensions}
+        taxonomy = self.taxonomy
+        if self.persistent_cache is None:
+            return self._encode_goal(user_goal, taxonomy)
+        
+        # Vectors depend on the taxonomy as well as the text
+        goal_key = f"{taxonomy.version}:{self._normalize_goal(user_goal)}"
+        cached = self.persistent_cache.get_goal_vector(goal_key, self.catalog_version)
+        if cached is not None:
+            return cached
+        
+        vector_array = self._encode_goal(user_goal, taxonomy)
+        self.persistent_cache.put_goal_vector(goal_key, self.catalog_version, vector_array)
+        return vector_array
+    
+    def _encode_goal(self, user_goal: str, taxonomy: Optional[KeywordTaxonomy] = None) -> np.ndarray:
+        """
+        Runs keyword matching and normalization for a goal statement.
+        
+        Args:
+            user_goal: User's goal statement
+            taxonomy: Matcher to use (the engine's current one by default)
+        
+        Returns:
+            Numpy array of shape (7,) representing the goal vector
+        """
+        return self._counts_to_vector(self._keyword_counts(user_goal, taxonomy))
+    
+    def _keyword_counts(self, user_goal: str, taxonomy: Optional[KeywordTaxonomy] = None) -> np.ndarray:
+        """
+        Counts keyword matches per skill dimension.
+        
+        Every keyword found in the lowercased goal adds its weights once; with the
+        bundled taxonomy (all weights 1) these are plain match counts.
+        
+        Args:
+            user_goal: User's goal statement
+            taxonomy: Matcher to use (the engine's current one by default)
         
-        # Convert to lowercase for matching
-        goal_lower = user_goal.lower()
+        Returns:
+            Numpy array of shape (7,) with weighted match counts
+        """
+        return (taxonomy or self.taxonomy).counts(user_goal)
+    
+    def _counts_to_vector(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Normalizes keyword match counts into a goal vector.
         
-        # Count matches for each skill dimension
-        for keyword, dimension in self.keyword_mapping.items():
-            if keyword in goal_lower:
-                goal_vector[dimension] += 1.0
+        Args:
+            counts: Raw match counts per skill dimension
         
-        # Convert to numpy array
-        vector_array = np.array([goal_vector[dim] for dim in self.skill_dimensions])
+        Returns:
+            L2-normalized goal vector, or a uniform vector if nothing matched
+        """
+        vector_array = counts
         
         # Normalize the vector (L2 normalization)
         vector_norm = np.linalg.norm(vector_array)
@@ -418,33 +672,782 @@ class FutureSelfEngine:
         
         return vector_array
     
-    def recommend(self, user_goal: str, top_k: int = 5) -> List[Dict]:
+    def _score(self, goal_vector: np.ndarray) -> np.ndarray:
+        """
+        Scores every catalog row against a goal vector.
+        
+        Args:
+            goal_vector: Normalized goal vector
+        
+        Returns:
+            Cosine similarities indexed by catalog row
+        """
+        unit_vectors = self.data_loader.unit_vectors
+        if unit_vectors is not None:
+            # Pre-normalized float32 rows: one product, no normalized copy
+            return (unit_vectors @ goal_vector.astype(np.float32)).astype(np.float64)
+        return cosine_similarity(
+            goal_vector.reshape(1, -1), 
+            self.content_vectors
+        )[0]
+    
+    def recommend(self, user_goal: str, top_k: int = 5, with_cursor: bool = False,
+                  user_id: Optional[str] = None, explain: bool = False,
+                  cached_only: bool = False, deadline_ms: Optional[float] = None) -> Optional[Dict]:
         """
         Generates content recommendations based on user's goal.
         
         Args:
             user_goal: User's goal statement
             top_k: Number of recommendations to return (default: 5)
+            with_cursor: Also return a 'next_cursor' for loading further results
+            user_id: Optional user whose consumed content is excluded from results
+            explain: Attach each skill dimension's contribution to the match score
+            cached_only: Only answer from the answer table or the persistent cache,
+                never by scoring the catalog (used to degrade under overload)
+            deadline_ms: Time budget. Scoring then visits the catalog in priority
+                order and stops when the budget is spent; the result carries a
+                'coverage' (fraction of the catalog scored, 1.0 when exact) and has
+                no cursor when it is partial
         
         Returns:
-            List of dictionaries containing recommended content with match scores
+            List of dictionaries containing recommended content with match scores, or
+            None when cached_only is set and no precomputed answer exists
         """
-        # Convert goal to vector
-        goal_vector = self.text_to_vector(user_goal)
+        deadline = None
+        if deadline_ms is not None:
+            # A lazy build of the cluster layout is not charged to the budget
+            self._deadline_scorer()
+            deadline = time.monotonic() + deadline_ms / 1000
         
-        # Calculate cosine similarity
-        similarities = cosine_similarity(
-            goal_vector.reshape(1, -1), 
-            self.content_vectors
-        )[0]
+        # Convert goal to vector (keeping the raw counts for the answer table, which
+        # only covers whole-number counts; weighted taxonomies fall through to a scan)
+        answer = None
+        if self._answer_table_ready(top_k):
+            counts = self._keyword_counts(user_goal)
+            goal_vector = self._counts_to_vector(counts)
+            answer = self.answer_table.lookup(counts)
+        else:
+            goal_vector = self.text_to_vector(user_goal)
+        
+        # Consumed content is masked out before top-k selection
+        exclusion_mask = self.exclusion_store.mask(user_id, len(self.content_vectors))
+        use_cache = self.persistent_cache is not None and exclusion_mask is None
+        
+        recommendations = None
+        next_offset = None
+        if answer is not None:
+            # Precomputed ranking: no scoring at all, as long as enough rows survive
+            # the exclusions (otherwise fall through to a full scan)
+            table_indices, table_scores = answer
+            top_indices, table_offset = self._take(table_indices, 0, top_k, exclusion_mask)
+            if len(top_indices) == top_k or len(table_indices) == len(self.content_vectors):
+                recommendations = self._build_recommendations(
+                    top_indices, dict(zip(table_indices.tolist(), table_scores.tolist()))
+                )
+                next_offset = table_offset
+                use_cache = False
+        
+        if use_cache:
+            results_key = self._results_key(goal_vector, top_k)
+            recommendations = self.persistent_cache.get_results(results_key, self.catalog_version)
+            if recommendations is not None:
+                next_offset = len(recommendations)
+        
+        if recommendations is None and cached_only:
+            return None
+        
+        coverage = 1.0
+        found = (
+            self._partial_top_k(goal_vector, top_k, exclusion_mask, deadline)
+            if recommendations is None else None
+        )
+        if found is not None:
+            # Top-k without ranking the whole catalog. The full ordering is not kept:
+            # a cursor's next page rescores once in recommend_more, as after a cursor
+            # store eviction
+            top_indices, top_scores, coverage = found
+            recommendations = self._build_recommendations(
+                top_indices, dict(zip(top_indices.tolist(), top_scores.tolist()))
+            )
+            if coverage == 1.0:
+                next_offset = BlockedScorer.ranking_offset(
+                    self.content_vectors, goal_vector, top_indices, top_scores, exclusion_mask
+                )
+                if use_cache:
+                    self.persistent_cache.put_results(results_key, self.catalog_version, recommendations)
+        
+        if recommendations is None:
+            # Calculate cosine similarity
+            similarities = self._score(goal_vector)
+            
+            # Rank the catalog and keep the ordering for follow-up pages (a stable
+            # sort, so ties go to the higher row like the blocked scorer and answer table)
+            order = np.argsort(similarities, kind='stable')[::-1]
+            if with_cursor:
+                self.cursor_store.put(self._ordering_key(goal_vector), order, similarities)
+            
+            # Get top K indices
+            top_indices, next_offset = self._take(order, 0, top_k, exclusion_mask)
+            recommendations = self._build_recommendations(top_indices, similarities)
+            
+            if use_cache:
+                self.persistent_cache.put_results(results_key, self.catalog_version, recommendations)
+        
+        if explain:
+            recommendations = self._attach_explanations(recommendations, goal_vector)
+        
+        result = {
+            'user_goal': user_goal,
+            'goal_vector': goal_vector.tolist(),
+            'skill_dimensions': self.skill_dimensions,
+            'recommendations': recommendations
+        }
+        if with_cursor:
+            # A partial result is not a prefix of the full ranking, so no page follows it
+            result['next_cursor'] = (
+                self._make_cursor(goal_vector, next_offset, user_id) if coverage == 1.0 else None
+            )
+        if deadline_ms is not None:
+            result['coverage'] = coverage
+        return result
+    
+    def _partial_top_k(self, goal_vector: np.ndarray, top_k: int,
+                       exclusion_mask: Optional[np.ndarray],
+                       deadline: Optional[float] = None) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+        """
+        Finds the top-k rows without a full ranking, when an index or scorer allows.
+        
+        Sparse goals go to the per-dimension sorted lists (threshold algorithm),
+        deadline-bound queries to the cluster-ordered anytime scorer, everything
+        else to the blocked scorer.
+        
+        Args:
+            goal_vector: Normalized goal vector
+            top_k: Number of rows to return
+            exclusion_mask: Boolean mask of excluded rows, or None
+            deadline: time.monotonic() value by which scoring should stop, or None
+        
+        Returns:
+            Tuple of (row indices, scores) in ranking order and the fraction of the
+            catalog covered, or None when the caller should score the whole catalog
+        """
+        if self.sorted_index is not None and self.sorted_index.catalog_version == self.catalog_version:
+            found = self.sorted_index.top_k(goal_vector, top_k, exclusion_mask)
+            if found is not None:
+                return (*found, 1.0)
+        if deadline is not None:
+            return self._deadline_scorer().top_k(goal_vector, top_k, deadline, exclusion_mask)
+        if self.blocked_scorer is not None:
+            (top_indices, top_scores), = self.blocked_scorer.top_k(
+                self.content_vectors, goal_vector, top_k, exclusion_mask
+            )
+            return top_indices, top_scores, 1.0
+        return None
+    
+    @staticmethod
+    def _take(order: np.ndarray, start: int, count: int,
+              exclusion_mask: Optional[np.ndarray]) -> Tuple[np.ndarray, int]:
+        """
+        Takes the next rows of a ranking, skipping excluded ones.
+        
+        Args:
+            order: Catalog row indices in ranking order
+            start: Position in the ranking to start from
+            count: Number of rows to take
+            exclusion_mask: Boolean mask of excluded rows, or None
+        
+        Returns:
+            Tuple of (selected row indices, ranking position after the last one)
+        """
+        if exclusion_mask is None:
+            selected = order[start:start + count]
+            return selected, start + len(selected)
+        
+        # Walk the ranking in chunks so the cost is proportional to the page plus
+        # the excluded rows skipped, not to the catalog size
+        selected = []
+        position = start
+        chunk_size = max(2 * count, 64)
+        while len(selected) < count and position < len(order):
+            chunk = order[position:position + chunk_size]
+            kept = np.flatnonzero(~exclusion_mask[chunk])
+            needed = count - len(selected)
+            if len(kept) >= needed:
+                selected.extend(chunk[kept[:needed]])
+                position += int(kept[needed - 1]) + 1
+                break
+            selected.extend(chunk[kept])
+            position += len(chunk)
+        return np.asarray(selected, dtype=np.intp), position
+    
+    def record_consumption(self, events: List[Tuple[str, int]]) -> Dict[str, int]:
+        """
+        Records that users consumed content so it is excluded from their results.
+        
+        Args:
+            events: List of (user_id, content_id) pairs, where content_id is the
+                catalog row ID returned with each recommendation
+        
+        Returns:
+            Dictionary with the number of events and distinct users recorded
+        
+        Raises:
+            ValueError: If a content ID is outside the catalog
+        """
+        return self.exclusion_store.record_events(events, len(self.content_vectors))
+    
+    def attach_answer_table(self, path: str, max_count: int = 3, top_n: int = 20) -> AnswerTable:
+        """
+        Loads the precomputed answer table, rebuilding it if the catalog changed.
+        
+        Args:
+            path: Table file path (written if missing or stale)
+            max_count: Largest per-dimension keyword count covered
+            top_n: Number of results stored per goal vector
+        
+        Returns:
+            The attached AnswerTable
+        """
+        self.answer_table = load_or_build(self, path, max_count=max_count, top_n=top_n)
+        return self.answer_table
+    
+    def _answer_table_ready(self, top_k: int) -> bool:
+        """
+        Checks whether the answer table can serve a query of this size.
+        
+        Args:
+            top_k: Number of recommendations requested
+        
+        Returns:
+            True if a table for the current catalog covers top_k results
+        """
+        return (
+            self.answer_table is not None
+            and self.answer_table.catalog_version == self.catalog_version
+            and top_k <= self.answer_table.top_n
+        )
+    
+    def enable_blocked_scoring(self, n_threads: Optional[int] = None,
+                               block_size: int = DEFAULT_BLOCK_SIZE) -> BlockedScorer:
+        """
+        Scores top-k queries block by block on a thread pool.
+        
+        Temporary memory per query is bounded by threads x block size instead of
+        growing with the catalog. Later cursor pages (recommend_more) still rank
+        the whole catalog.
+        
+        Args:
+            n_threads: Scoring threads (one per core when omitted)
+            block_size: Catalog rows per block
+        
+        Returns:
+            The attached BlockedScorer
+        """
+        if self.blocked_scorer is not None:
+            self.blocked_scorer.close()
+        self.blocked_scorer = BlockedScorer(n_threads=n_threads, block_size=block_size)
+        return self.blocked_scorer
+    
+    def enable_threshold_index(self, max_dims: int = DEFAULT_MAX_DIMS,
+                               max_fraction: float = DEFAULT_MAX_FRACTION) -> SortedListIndex:
+        """
+        Builds per-dimension sorted lists for sparse goals.
+        
+        Goals with at most max_dims non-zero dimensions (most goals matching one or
+        two skills) get their exact top-k from the heads of those lists with the
+        threshold algorithm; denser goals are scored as before.
+        
+        Args:
+            max_dims: Largest number of non-zero goal dimensions served by the index
+            max_fraction: Fraction of each list read before falling back to a scan
+        
+        Returns:
+            The attached SortedListIndex
+        """
+        index = self.sorted_index
+        if (index is not None and index.catalog_version == self.catalog_version
+                and (index.max_dims, index.max_fraction) == (max_dims, max_fraction)):
+            # Restored from a snapshot with the same settings
+            return index
+        self.sorted_index = SortedListIndex.build(
+            self.content_vectors, self.catalog_version,
+            max_dims=max_dims, max_fraction=max_fraction
+        )
+        return self.sorted_index
+    
+    def _deadline_scorer(self) -> AnytimeScorer:
+        """
+        Returns the anytime scorer for the current catalog, building it if needed.
+        
+        Concurrent callers wait for one build under a lock instead of each building.
+        
+        Returns:
+            The attached AnytimeScorer
+        """
+        scorer = self.anytime_scorer
+        if scorer is None or scorer.catalog_version != self.catalog_version:
+            with self._build_lock:
+                scorer = self.anytime_scorer
+                if scorer is None or scorer.catalog_version != self.catalog_version:
+                    scorer = self.enable_deadline_scoring()
+        return scorer
+    
+    def enable_deadline_scoring(self, block_size: int = DEFAULT_BLOCK_SIZE) -> AnytimeScorer:
+        """
+        Lays the catalog out in cluster order for deadline-bound queries.
+        
+        Built by the first recommend() call with a deadline_ms when not enabled
+        beforehand. That request waits for the build before its budget starts, so
+        enabling it at startup keeps the wait off the request path.
+        
+        Args:
+            block_size: Rows scored between deadline checks
+        
+        Returns:
+            The attached AnytimeScorer
+        """
+        scorer = self.anytime_scorer
+        if (scorer is not None and scorer.catalog_version == self.catalog_version
+                and scorer.block_size == block_size):
+            # Restored from a snapshot with the same settings
+            return scorer
+        self.anytime_scorer = AnytimeScorer.build(
+            self.content_vectors, self.catalog_version, block_size=block_size
+        )
+        return self.anytime_scorer
+    
+    def attach_neighbors(self, path: str, m: int = 20) -> Optional[NeighborIndex]:
+        """
+        Loads prebuilt item-to-item neighbour lists (see neighbors.py).
+        
+        The lists are never built here, since that is quadratic in the catalog
+        size; a missing or stale file leaves none attached. Attached lists are
+        written back to the same file whenever update_content_vectors changes them.
+        
+        Args:
+            path: .npz file written by neighbors.py
+            m: Neighbours kept per item
+        
+        Returns:
+            The attached NeighborIndex, or None if the file does not match the catalog
+        """
+        self.neighbor_index = load_matching_neighbors(self, path, m=m)
+        self.neighbors_path = path if self.neighbor_index is not None else None
+        return self.neighbor_index
+    
+    def similar_items(self, content_id: int, top_k: int = 5) -> Dict:
+        """
+        Returns the items most similar to a catalog item ("more like this").
+        
+        Served from the precomputed neighbour lists when they are attached, so the
+        cost does not depend on the catalog size. Without them the item is scored
+        against the catalog in one pass.
+        
+        Args:
+            content_id: Catalog row ID of the source item
+            top_k: Number of similar items (at most the stored M)
+        
+        Returns:
+            Dictionary with the source item and its 'recommendations'
+        
+        Raises:
+            ValueError: If the ID is outside the catalog
+        """
+        if self.neighbor_index is not None and self.neighbor_index.catalog_version == self.catalog_version:
+            rows, scores = self.neighbor_index.neighbors(content_id, top_k)
+        else:
+            rows, scores = item_neighbors(self.content_vectors, content_id, top_k)
+        source = self._build_recommendations([content_id], {content_id: 1.0})[0]
+        del source['match_score']
+        return {
+            'item': source,
+            'skill_dimensions': self.skill_dimensions,
+            'recommendations': self._build_recommendations(
+                rows, dict(zip(rows.tolist(), scores.tolist()))
+            )
+        }
+    
+    def update_content_vectors(self, changes: Dict[int, List[float]]) -> Dict:
+        """
+        Changes the skill vectors of catalog items and refreshes derived state.
+        
+        The catalog version is recomputed (so caches and the answer table keyed by
+        the old version stop matching), stored cursor orderings are dropped, and the
+        neighbour lists are updated incrementally instead of rebuilt, then saved
+        (atomically) to the file they were loaded from, so the next load does not
+        serve stale lists. Per-dimension sorted lists and the deadline scorer, when
+        enabled, are rebuilt.
+        
+        Args:
+            changes: Mapping of content ID to its new skill vector
+        
+        Returns:
+            Dictionary with the new catalog version and neighbour update counts
+        
+        Raises:
+            ValueError: If an ID is outside the catalog or a vector has the wrong length
+        """
+        n_items = len(self.content_vectors)
+        ids = np.asarray(list(changes), dtype=np.int64)
+        if ids.size and (ids.min() < 0 or ids.max() >= n_items):
+            raise ValueError(f"Content IDs must be between 0 and {n_items - 1}")
+        vectors = np.asarray(list(changes.values()), dtype=np.float64).reshape(len(ids), -1)
+        if vectors.shape[1] != len(self.skill_dimensions):
+            raise ValueError(f"Vectors must have {len(self.skill_dimensions)} values")
+        
+        self.data_loader.update_vectors(ids, vectors)
+        self.content_vectors = self.data_loader.get_content_vectors()
+        self.catalog_version = self._compute_catalog_version()
+        self.cursor_store.clear()
+        
+        result = {'updated': int(len(ids)), 'catalog_version': self.catalog_version}
+        if self.neighbor_index is not None:
+            result['neighbors'] = self.neighbor_index.update(
+                self.content_vectors, ids, self.catalog_version
+            )
+            if self.neighbors_path is not None:
+                self.neighbor_index.save(self.neighbors_path)
+        if self.sorted_index is not None:
+            self.enable_threshold_index(self.sorted_index.max_dims, self.sorted_index.max_fraction)
+        if self.anytime_scorer is not None:
+            self.enable_deadline_scoring(self.anytime_scorer.block_size)
+        return result
+    
+    def _ordering_key(self, goal_vector: np.ndarray) -> str:
+        """
+        Builds the cursor store key for a goal vector on the current catalog.
+        
+        Args:
+            goal_vector: Normalized goal vector
         
-        # Get top K indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        Returns:
+            Key identifying the scored ordering
+        """
+        return f"{self.catalog_version}:{self._vector_key(goal_vector)}"
+    
+    def _make_cursor(self, goal_vector: np.ndarray, offset: int,
+                     user_id: Optional[str] = None) -> Optional[str]:
+        """
+        Creates the cursor pointing at the next page of results.
+        
+        Args:
+            goal_vector: Normalized goal vector
+            offset: Position in the ranking after the last returned result
+            user_id: User whose exclusions apply to later pages
+        
+        Returns:
+            Opaque cursor, or None when the catalog is exhausted
+        """
+        if offset >= len(self.content_vectors):
+            return None
+        state = {
+            'v': self.catalog_version,
+            'g': [float(x) for x in goal_vector],
+            'o': int(offset)
+        }
+        if user_id is not None:
+            state['u'] = user_id
+        return encode_cursor(state)
+    
+    def recommend_more(self, cursor: str, page_size: int = 5, explain: bool = False) -> Dict:
+        """
+        Returns the next page of results for a cursor without rescoring the catalog.
+        
+        The head of the scored ordering is taken from the cursor store. If it has
+        expired, or the page lies beyond the stored head, the goal vector carried by
+        the cursor is rescored once and stored again.
+        
+        Args:
+            cursor: Cursor returned by recommend or a previous recommend_more call
+            page_size: Number of recommendations to return
+            explain: Attach each skill dimension's contribution to the match score
+        
+        Returns:
+            Dictionary with the goal vector, the next recommendations and a new cursor
         
-        # Build recommendations
+        Raises:
+            ValueError: If the cursor is malformed or refers to another catalog version
+        """
+        state = decode_cursor(cursor)
+        try:
+            version = state['v']
+            goal_vector = np.asarray(state['g'], dtype=np.float64)
+            offset = int(state['o'])
+            user_id = state.get('u')
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Malformed cursor")
+        if version != self.catalog_version:
+            raise ValueError("Cursor refers to an outdated catalog version")
+        if goal_vector.shape != (len(self.skill_dimensions),) or offset < 0:
+            raise ValueError("Malformed cursor")
+        
+        key = self._ordering_key(goal_vector)
+        exclusion_mask = self.exclusion_store.mask(user_id, len(self.content_vectors))
+        stored = self.cursor_store.get(key)
+        page_indices = None
+        if stored is not None:
+            # Only the head of the ordering is stored; a page running past it is
+            # served by a rescore, unless the head is the whole catalog
+            order, scores = stored
+            page_indices, next_offset = self._take(order, offset, page_size, exclusion_mask)
+            if len(page_indices) < page_size and len(order) < len(self.content_vectors):
+                page_indices = None
+            else:
+                similarities = dict(zip(
+                    order[offset:next_offset].tolist(), scores[offset:next_offset].tolist()
+                ))
+        if page_indices is None:
+            similarities = self._score(goal_vector)
+            order = np.argsort(similarities, kind='stable')[::-1]
+            self.cursor_store.put(key, order, similarities)
+            page_indices, next_offset = self._take(order, offset, page_size, exclusion_mask)
+        
+        recommendations = self._build_recommendations(page_indices, similarities)
+        if explain:
+            recommendations = self._attach_explanations(recommendations, goal_vector)
+        
+        return {
+            'goal_vector': goal_vector.tolist(),
+            'skill_dimensions': self.skill_dimensions,
+            'recommendations': recommendations,
+            'next_cursor': self._make_cursor(goal_vector, next_offset, user_id)
+        }
+    
+    def texts_to_matrix(self, user_goals: List[str]) -> np.ndarray:
+        """
+        Encodes several goal statements into one matrix of goal vectors.
+        
+        Args:
+            user_goals: List of goal statements
+        
+        Returns:
+            Numpy array of shape (n_goals, 7), one normalized goal vector per row
+        """
+        return np.vstack([self.text_to_vector(goal) for goal in user_goals])
+    
+    def _score_matrix(self, goal_matrix: np.ndarray) -> np.ndarray:
+        """
+        Scores every catalog row against several goal vectors in one matrix product.
+        
+        Args:
+            goal_matrix: Array of shape (n_goals, 7)
+        
+        Returns:
+            Cosine similarities of shape (n_goals, n_items)
+        """
+        unit_vectors = self.data_loader.unit_vectors
+        if unit_vectors is not None:
+            return (goal_matrix.astype(np.float32) @ unit_vectors.T).astype(np.float64)
+        return cosine_similarity(goal_matrix, self.content_vectors)
+    
+    def recommend_batch(self, user_goals: List[str], top_k: int = 5) -> List[Dict]:
+        """
+        Generates recommendations for many independent goals in one scoring call.
+        
+        Args:
+            user_goals: List of goal statements
+            top_k: Number of recommendations per goal (default: 5)
+        
+        Returns:
+            List of result dictionaries, one per goal, in input order
+        """
+        if not user_goals:
+            return []
+        
+        goal_matrix = self.texts_to_matrix(user_goals)
+        if self.blocked_scorer is not None:
+            return [
+                {
+                    'user_goal': goal,
+                    'goal_vector': goal_vector.tolist(),
+                    'skill_dimensions': self.skill_dimensions,
+                    'recommendations': self._build_recommendations(
+                        indices, dict(zip(indices.tolist(), row_scores.tolist()))
+                    )
+                }
+                for goal, goal_vector, (indices, row_scores) in zip(
+                    user_goals, goal_matrix,
+                    self.blocked_scorer.top_k(self.content_vectors, goal_matrix, top_k)
+                )
+            ]
+        
+        similarities = self._score_matrix(goal_matrix)
+        
+        # Tie-aware partial selection per row, ordered as recommend() orders them
+        top_indices = [top_k_rows(row_scores, top_k) for row_scores in similarities]
+        
+        return [
+            {
+                'user_goal': goal,
+                'goal_vector': goal_vector.tolist(),
+                'skill_dimensions': self.skill_dimensions,
+                'recommendations': self._build_recommendations(indices, row_scores)
+            }
+            for goal, goal_vector, indices, row_scores in zip(
+                user_goals, goal_matrix, top_indices, similarities
+            )
+        ]
+    
+    def recommend_multi(self, goals: List[Tuple[str, float]], top_k: int = 5,
+                        aggregation: str = 'weighted_sum',
+                        user_id: Optional[str] = None) -> Dict:
+        """
+        Generates one blended list of recommendations for several weighted goals.
+        
+        All goals are scored against the catalog in a single matrix product and
+        combined before one top-k selection:
+        
+        - 'weighted_sum': scores are averaged with the normalized weights
+        - 'max': each item keeps its best weight-scaled score across goals
+        - 'round_robin': the per-goal rankings are interleaved, with each goal
+          getting a share of the slots proportional to its weight
+        
+        Args:
+            goals: List of (goal statement, weight) pairs; weights must be positive
+            top_k: Number of recommendations to return (default: 5)
+            aggregation: One of 'weighted_sum', 'max' or 'round_robin'
+            user_id: Optional user whose consumed content is excluded from results
+        
+        Returns:
+            Dictionary with the per-goal vectors, the blended goal vector and the
+            recommendations
+        
+        Raises:
+            ValueError: If no goals are given, a weight is not positive or the
+                aggregation is unknown
+        """
+        if not goals:
+            raise ValueError("At least one goal is required")
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{aggregation}', expected one of {AGGREGATIONS}")
+        
+        texts = [goal for goal, _ in goals]
+        weights = np.asarray([weight for _, weight in goals], dtype=np.float64)
+        if np.any(weights <= 0):
+            raise ValueError("Goal weights must be positive")
+        weights = weights / weights.sum()
+        
+        goal_matrix = self.texts_to_matrix(texts)
+        similarities = self._score_matrix(goal_matrix)
+        exclusion_mask = self.exclusion_store.mask(user_id, len(self.content_vectors))
+        
+        if aggregation == 'round_robin':
+            top_indices, scores = self._interleave(similarities, weights, top_k, exclusion_mask)
+        else:
+            if aggregation == 'weighted_sum':
+                combined = weights @ similarities
+            else:
+                combined = ((weights / weights.max())[:, None] * similarities).max(axis=0)
+            order = np.argsort(-combined, kind='stable')
+            top_indices, _ = self._take(order, 0, top_k, exclusion_mask)
+            scores = combined
+        
+        recommendations = self._build_recommendations(top_indices, scores)
+        
+        # Blended profile for display alongside the per-goal vectors
+        blended = weights @ goal_matrix
+        blended_norm = np.linalg.norm(blended)
+        if blended_norm > 0:
+            blended = blended / blended_norm
+        
+        return {
+            'goals': [
+                {'goal': text, 'weight': float(weight), 'goal_vector': vector.tolist()}
+                for text, weight, vector in zip(texts, weights, goal_matrix)
+            ],
+            'aggregation': aggregation,
+            'goal_vector': blended.tolist(),
+            'skill_dimensions': self.skill_dimensions,
+            'recommendations': recommendations
+        }
+    
+    def _interleave(self, similarities: np.ndarray, weights: np.ndarray, top_k: int,
+                    exclusion_mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Interleaves per-goal rankings with smooth weighted round-robin.
+        
+        Args:
+            similarities: Cosine similarities of shape (n_goals, n_items)
+            weights: Normalized goal weights
+            top_k: Number of items to select
+            exclusion_mask: Boolean mask of excluded rows, or None
+        
+        Returns:
+            Tuple of (selected row indices, scores indexed by row where each selected
+            item carries the score of the goal that contributed it)
+        """
+        n_goals, n_items = similarities.shape
+        rankings = np.argsort(-similarities, axis=1, kind='stable')
+        positions = np.zeros(n_goals, dtype=np.intp)
+        taken = np.zeros(n_items, dtype=bool)
+        if exclusion_mask is not None:
+            taken |= exclusion_mask
+        credit = np.zeros(n_goals)
+        scores = np.zeros(n_items)
+        selected = []
+        
+        limit = min(top_k, int((~taken).sum()))
+        while len(selected) < limit:
+            credit += weights
+            goal = int(np.argmax(credit))
+            credit[goal] -= 1.0
+            # Advance this goal's ranking past items already selected or excluded
+            while positions[goal] < n_items and taken[rankings[goal, positions[goal]]]:
+                positions[goal] += 1
+            if positions[goal] == n_items:
+                continue
+            idx = rankings[goal, positions[goal]]
+            taken[idx] = True
+            scores[idx] = similarities[goal, idx]
+            selected.append(idx)
+        
+        return np.asarray(selected, dtype=np.intp), scores
+    
+    def _attach_explanations(self, recommendations: List[Dict], goal_vector: np.ndarray) -> List[Dict]:
+        """
+        Adds per-dimension match explanations to recommendations.
+        
+        The cosine score is the sum over dimensions of the elementwise product of the
+        normalized goal and content vectors, so that product is computed once for all
+        selected rows and split back into one 'explanation' block per item.
+        
+        Args:
+            recommendations: Recommendation dictionaries carrying 'content_id'
+            goal_vector: Goal vector the recommendations were scored against
+        
+        Returns:
+            New list of recommendation dictionaries with an 'explanation' key
+        """
+        if not recommendations:
+            return recommendations
+        
+        rows = self.content_vectors[[rec['content_id'] for rec in recommendations]]
+        row_norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        row_norms[row_norms == 0] = 1.0
+        goal_norm = np.linalg.norm(goal_vector) or 1.0
+        contributions = (rows / row_norms) * (np.asarray(goal_vector) / goal_norm)
+        
+        return [
+            {**rec, 'explanation': dict(zip(self.skill_dimensions, row.tolist()))}
+            for rec, row in zip(recommendations, contributions)
+        ]
+    
+    def _build_recommendations(self, top_indices: np.ndarray, similarities: np.ndarray) -> List[Dict]:
+        """
+        Builds recommendation dictionaries for the selected catalog rows.
+        
+        Args:
+            top_indices: Catalog row indices in ranking order
+            similarities: Similarity scores indexed by catalog row
+        
+        Returns:
+            List of recommendation dictionaries
+        """
         recommendations = []
         for idx in top_indices:
             recommendation = {
+                'content_id': int(idx),
                 'title': self.content_metadata.iloc[idx]['Title'],
                 'type': self.content_metadata.iloc[idx]['Type'],
                 'description': self.content_metadata.iloc[idx]['Description'],
@@ -454,12 +1457,7 @@ class FutureSelfEngine:
             }
             recommendations.append(recommendation)
         
-        return {
-            'user_goal': user_goal,
-            'goal_vector': goal_vector.tolist(),
-            'skill_dimensions': self.skill_dimensions,
-            'recommendations': recommendations
-        }
+        return recommendations
 
 
 # Example usage
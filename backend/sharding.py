@@ -0,0 +1,458 @@
+"""
+Sharded Catalog Serving for the Future-Self Recommendation Engine
+Splits the catalog into N contiguous row ranges, each scored by its own worker process
+(or an in-process stand-in), fans every query out to all shards in parallel and merges
+the per-shard top-k lists with a heap.
+
+Usage:
+    python sharding.py --items 1000000 --shards 1 2 4 --queries 256
+"""
+
+import argparse
+import heapq
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+SHARD_MODES = ('process', 'local')
+
+# Environment variables capping the BLAS pool of each worker process
+BLAS_THREAD_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def top_k_rows(scores: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Selects the k best positions of a score array without sorting all of it.
+
+    argpartition alone keeps arbitrary positions among those tied with the k-th
+    score. Every position above it is kept, then the tied ones with the highest
+    row, so the result is exactly the head of the engine's ranking.
+
+    Args:
+        scores: One-dimensional scores
+        k: Positions to keep
+        rows: Catalog row of each position, when scores are not in row order
+
+    Returns:
+        Up to k positions ordered by score, then by higher row
+    """
+    k = min(k, len(scores))
+    if k < 1:
+        return np.empty(0, dtype=np.intp)
+    kth_score = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth_score)
+    tied = np.flatnonzero(scores == kth_score)
+    if rows is not None:
+        tied = tied[np.argsort(rows[tied], kind='stable')]
+    candidates = np.concatenate([above, tied[::-1][:k - len(above)]])
+    keys = candidates if rows is None else rows[candidates]
+    return candidates[np.lexsort((-keys, -scores[candidates]))]
+
+
+class CatalogShard:
+    """
+    One contiguous slice of the catalog.
+
+    Holds only its own vectors and metadata and answers top-k queries with global
+    row IDs, so it can live in a separate process (or host) from the coordinator.
+    """
+
+    def __init__(self, vectors: np.ndarray, metadata: List[Tuple[str, str, str, str]],
+                 row_offset: int):
+        """
+        Args:
+            vectors: Array of shape (n_rows, n_dims) for this slice
+            metadata: (Title, Type, Description, URL) per row of the slice
+            row_offset: Global row ID of the slice's first row
+        """
+        self.vectors = vectors
+        self.metadata = metadata
+        self.row_offset = row_offset
+
+    def top_k(self, goal_matrix: np.ndarray, top_k: int,
+              excluded: Optional[List[np.ndarray]] = None) -> List[List[Tuple]]:
+        """
+        Scores goals against the slice and keeps the best rows per goal.
+
+        Args:
+            goal_matrix: Array of shape (n_goals, n_dims) of normalized goal vectors
+            top_k: Rows kept per goal
+            excluded: Optional global row IDs to skip, one array per goal
+
+        Returns:
+            Per goal, a list of (score, global row, title, type, description, url,
+            vector) tuples ordered by score, then by higher row
+        """
+        n_rows = len(self.vectors)
+        if not n_rows:
+            return [[] for _ in range(len(goal_matrix))]
+
+        similarities = cosine_similarity(goal_matrix, self.vectors)
+        results = []
+        for goal, row_scores in enumerate(similarities):
+            if excluded is not None and len(excluded[goal]):
+                local = np.asarray(excluded[goal], dtype=np.int64) - self.row_offset
+                local = local[(local >= 0) & (local < n_rows)]
+                row_scores = row_scores.copy()
+                row_scores[local] = -np.inf
+
+            hits = []
+            for row in top_k_rows(row_scores, top_k):
+                if row_scores[row] == -np.inf:
+                    break
+                hits.append((
+                    float(row_scores[row]), int(row) + self.row_offset,
+                    *self.metadata[row], self.vectors[row].tolist()
+                ))
+            results.append(hits)
+        return results
+
+
+def partition(engine, n_shards: int) -> List[CatalogShard]:
+    """
+    Cuts an engine's catalog into contiguous, near-equal shards.
+
+    Args:
+        engine: FutureSelfEngine whose catalog is split
+        n_shards: Number of shards
+
+    Returns:
+        List of CatalogShard, in row order
+    """
+    vectors = np.asarray(engine.content_vectors)
+    metadata = list(engine.content_metadata[['Title', 'Type', 'Description', 'URL']]
+                    .itertuples(index=False, name=None))
+    bounds = np.linspace(0, len(vectors), n_shards + 1).astype(np.int64)
+    return [
+        CatalogShard(np.array(vectors[start:end]), metadata[start:end], int(start))
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def _serve_shard(connection, shard: CatalogShard):
+    """Worker process loop: answers ('top_k', goals, k, excluded) until ('stop',)."""
+    while True:
+        message = connection.recv()
+        if message[0] == 'stop':
+            break
+        try:
+            connection.send(('ok', shard.top_k(*message[1:])))
+        except Exception as e:  # report instead of leaving the coordinator waiting
+            connection.send(('error', f"{type(e).__name__}: {e}"))
+    connection.close()
+
+
+class _ProcessShard:
+    """Coordinator-side handle of a shard running in its own process."""
+
+    def __init__(self, shard: CatalogShard, context, name: str):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve_shard, args=(child, shard), name=name, daemon=True)
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()
+
+    def submit(self, goal_matrix, top_k, excluded):
+        # Held until result() so concurrent callers cannot interleave on the pipe
+        self.lock.acquire()
+        try:
+            self.connection.send(('top_k', goal_matrix, top_k, excluded))
+        except (BrokenPipeError, OSError) as e:
+            self.lock.release()
+            raise RuntimeError(f"Shard {self.process.name} is not running") from e
+
+    def result(self) -> List[List[Tuple]]:
+        try:
+            status, payload = self.connection.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f"Shard {self.process.name} is not running") from e
+        finally:
+            self.lock.release()
+        if status != 'ok':
+            raise RuntimeError(f"Shard {self.process.name} failed: {payload}")
+        return payload
+
+    def close(self):
+        try:
+            self.connection.send(('stop',))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+
+class ShardedEngine:
+    """
+    Scatter-gather front end over a partitioned catalog.
+
+    Goal encoding and exclusions stay with the wrapped engine; scoring is fanned
+    out to every shard and the sorted per-shard lists are merged with a heap, which
+    reproduces the unsharded ranking (score, then higher row ID on ties).
+    """
+
+    def __init__(self, engine, n_shards: int = 2, mode: str = 'process',
+                 threads_per_shard: int = 1):
+        """
+        Args:
+            engine: FutureSelfEngine providing the catalog, goal encoding and exclusions
+            n_shards: Number of catalog partitions
+            mode: 'process' for one worker process per shard, or 'local' to score
+                shards on threads of this process (a stand-in for remote shards)
+            threads_per_shard: BLAS threads allowed in each worker process
+
+        Raises:
+            ValueError: If the mode is unknown or n_shards is not positive
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode '{mode}', expected one of {list(SHARD_MODES)}")
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+
+        self.engine = engine
+        self.mode = mode
+        self.n_shards = n_shards
+        shards = partition(engine, n_shards)
+
+        if mode == 'local':
+            self._shards = shards
+            self._pool = ThreadPoolExecutor(max_workers=n_shards, thread_name_prefix='shard')
+            return
+
+        # Workers inherit the environment at start, so cap their BLAS pools there
+        context = multiprocessing.get_context('spawn')
+        saved = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+        os.environ.update({name: str(threads_per_shard) for name in BLAS_THREAD_VARIABLES})
+        try:
+            self._shards = [
+                _ProcessShard(shard, context, f'shard-{i}') for i, shard in enumerate(shards)
+            ]
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def _scatter(self, goal_matrix: np.ndarray, top_k: int,
+                 excluded: Optional[List[np.ndarray]]) -> List[List[List[Tuple]]]:
+        """Sends a query to every shard in parallel and collects per-shard results."""
+        if self.mode == 'local':
+            futures = [
+                self._pool.submit(shard.top_k, goal_matrix, top_k, excluded)
+                for shard in self._shards
+            ]
+            return [future.result() for future in futures]
+        for shard in self._shards:
+            shard.submit(goal_matrix, top_k, excluded)
+        return [shard.result() for shard in self._shards]
+
+    @staticmethod
+    def _merge(shard_lists: List[List[Tuple]], top_k: int) -> List[Tuple]:
+        """
+        Merges sorted per-shard hit lists into the global top-k.
+
+        Args:
+            shard_lists: One list per shard, each ordered by (score desc, row desc)
+            top_k: Number of hits kept
+
+        Returns:
+            Best top_k hits across shards, in ranking order
+        """
+        merged = heapq.merge(*shard_lists, key=lambda hit: (-hit[0], -hit[1]))
+        return [hit for _, hit in zip(range(top_k), merged)]
+
+    def _to_recommendations(self, hits: List[Tuple]) -> List[Dict]:
+        """Builds recommendation dictionaries in FutureSelfEngine.recommend's format."""
+        return [
+            {
+                'content_id': row,
+                'title': title,
+                'type': content_type,
+                'description': description,
+                'url': url,
+                'match_score': score,
+                'content_vector': vector
+            }
+            for score, row, title, content_type, description, url, vector in hits
+        ]
+
+    def _excluded_rows(self, user_id: Optional[str]) -> Optional[np.ndarray]:
+        """Returns the global row IDs a user has consumed, if any."""
+        mask = self.engine.exclusion_store.mask(user_id, len(self.engine.content_vectors))
+        return None if mask is None else np.flatnonzero(mask)
+
+    def recommend(self, user_goal: str, top_k: int = 5, user_id: Optional[str] = None) -> Dict:
+        """
+        Generates recommendations by scatter-gather over all shards.
+
+        Args:
+            user_goal: User's goal statement
+            top_k: Number of recommendations to return
+            user_id: Optional user whose consumed content is excluded
+
+        Returns:
+            Result dictionary in the same format as FutureSelfEngine.recommend
+        """
+        goal_vector = self.engine.text_to_vector(user_goal)
+        excluded = self._excluded_rows(user_id)
+        shard_results = self._scatter(
+            goal_vector.reshape(1, -1), top_k, None if excluded is None else [excluded]
+        )
+        hits = self._merge([results[0] for results in shard_results], top_k)
+        return {
+            'user_goal': user_goal,
+            'goal_vector': goal_vector.tolist(),
+            'skill_dimensions': self.engine.skill_dimensions,
+            'recommendations': self._to_recommendations(hits)
+        }
+
+    def recommend_batch(self, user_goals: List[str], top_k: int = 5) -> List[Dict]:
+        """
+        Generates recommendations for many goals with one round trip per shard.
+
+        Args:
+            user_goals: List of goal statements
+            top_k: Number of recommendations per goal
+
+        Returns:
+            List of result dictionaries, one per goal, in input order
+        """
+        if not user_goals:
+            return []
+        goal_matrix = self.engine.texts_to_matrix(user_goals)
+        shard_results = self._scatter(goal_matrix, top_k, None)
+        return [
+            {
+                'user_goal': goal,
+                'goal_vector': goal_vector.tolist(),
+                'skill_dimensions': self.engine.skill_dimensions,
+                'recommendations': self._to_recommendations(
+                    self._merge([results[i] for results in shard_results], top_k)
+                )
+            }
+            for i, (goal, goal_vector) in enumerate(zip(user_goals, goal_matrix))
+        ]
+
+    def close(self):
+        """Stops the shard workers."""
+        if self.mode == 'local':
+            self._pool.shutdown(wait=True)
+            return
+        for shard in self._shards:
+            shard.close()
+
+    def __enter__(self) -> "ShardedEngine":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def check_parity(engine, sharded: ShardedEngine, user_goals: List[str], top_k: int = 10,
+                 tolerance: float = 1e-9) -> List[str]:
+    """
+    Compares sharded results with the unsharded engine.
+
+    Rankings must agree on scores at every position and on content IDs wherever the
+    score is not tied with a neighbour (tied rows may legitimately swap places).
+
+    Args:
+        engine: Unsharded FutureSelfEngine
+        sharded: ShardedEngine over the same catalog
+        user_goals: Goals to compare
+        top_k: Number of recommendations compared per goal
+        tolerance: Allowed absolute score difference
+
+    Returns:
+        Human-readable mismatch descriptions (empty when the engines agree)
+    """
+    problems = []
+    for goal in user_goals:
+        expected = engine.recommend(goal, top_k=top_k)['recommendations']
+        actual = sharded.recommend(goal, top_k=top_k)['recommendations']
+        if len(expected) != len(actual):
+            problems.append(f"{goal!r}: {len(actual)} results, expected {len(expected)}")
+            continue
+        scores = [rec['match_score'] for rec in expected]
+        for rank, (want, got) in enumerate(zip(expected, actual)):
+            if abs(want['match_score'] - got['match_score']) > tolerance:
+                problems.append(f"{goal!r} rank {rank + 1}: score {got['match_score']:.12f}, "
+                                f"expected {want['match_score']:.12f}")
+                break
+            tied = any(
+                abs(scores[other] - want['match_score']) <= tolerance
+                for other in (rank - 1, rank + 1) if 0 <= other < len(scores)
+            )
+            if want['content_id'] != got['content_id'] and not tied:
+                problems.append(f"{goal!r} rank {rank + 1}: content {got['content_id']}, "
+                                f"expected {want['content_id']}")
+                break
+    return problems
+
+
+def main():
+    """Checks parity with the unsharded engine and benchmarks shard counts"""
+    import pandas as pd
+    from recommender import DataLoader, FutureSelfEngine
+
+    parser = argparse.ArgumentParser(description="Benchmark sharded scatter-gather scoring")
+    parser.add_argument('--items', type=int, default=1_000_000, help="Synthetic catalog size")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4], help="Shard counts to run")
+    parser.add_argument('--queries', type=int, default=64, help="Single-goal queries per run")
+    parser.add_argument('--batch', type=int, default=256, help="Goals per batch query")
+    parser.add_argument('--top-k', type=int, default=10, help="Results per goal")
+    parser.add_argument('--mode', choices=SHARD_MODES, default='process', help="Shard mode")
+    args = parser.parse_args()
+
+    base = FutureSelfEngine()
+    rng = np.random.default_rng(42)
+    vectors = rng.random((args.items, len(base.skill_dimensions)))
+    ids = np.arange(args.items).astype(str)
+    metadata = pd.DataFrame({
+        'Title': np.char.add('Item ', ids),
+        'Type': rng.choice(['Book', 'Course', 'Video'], args.items),
+        'Description': '',
+        'URL': np.char.add('https://example.com/', ids),
+    })
+    engine = FutureSelfEngine(data_loader=DataLoader.from_arrays(base.skill_dimensions, vectors, metadata))
+
+    words = engine.taxonomy.keywords
+    goals = [' '.join(rng.choice(words, size=3)) for _ in range(max(args.queries, args.batch))]
+
+    # Baseline: the same partial top-k selection over the whole catalog in this process,
+    # so the speedup measures sharding rather than the engine's full sort
+    whole = partition(engine, 1)[0]
+    start = time.perf_counter()
+    for goal in goals[:args.queries]:
+        whole.top_k(engine.text_to_vector(goal).reshape(1, -1), args.top_k)
+    unsharded = (time.perf_counter() - start) / args.queries * 1000
+    print(f"Catalog: {args.items:,} items, top {args.top_k}, mode={args.mode}")
+    print(f"{'shards':>6} {'single ms':>10} {'speedup':>8} {'batch ms':>9} {'parity':>7}")
+    print(f"{'-':>6} {unsharded:>10.2f} {1.0:>8.2f} {'':>9} {'':>7}")
+
+    for n_shards in args.shards:
+        with ShardedEngine(engine, n_shards=n_shards, mode=args.mode) as sharded:
+            problems = check_parity(engine, sharded, goals[:20], top_k=args.top_k)
+            start = time.perf_counter()
+            for goal in goals[:args.queries]:
+                sharded.recommend(goal, top_k=args.top_k)
+            single = (time.perf_counter() - start) / args.queries * 1000
+            start = time.perf_counter()
+            sharded.recommend_batch(goals[:args.batch], top_k=args.top_k)
+            batch = (time.perf_counter() - start) * 1000
+        print(f"{n_shards:>6} {single:>10.2f} {unsharded / single:>8.2f} {batch:>9.1f} "
+              f"{'ok' if not problems else 'FAIL':>7}")
+        for problem in problems[:5]:
+            print(f"       {problem}")
+
+
+if __name__ == "__main__":
+    main()
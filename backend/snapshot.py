@@ -0,0 +1,381 @@
+"""
+Engine Snapshots for the Future-Self Recommendation Engine
+Saves everything a FutureSelfEngine needs to serve (scoring matrix, pre-normalized
+rows, metadata, keyword matcher, catalog version and the threshold and deadline
+indexes when they are attached) into one versioned, checksummed binary file whose
+array sections are aligned so they can be memory-mapped instead of rebuilt at startup.
+The answer table and neighbour lists keep their own files, each checked against the
+catalog version when loaded.
+
+File layout:
+    magic (8 bytes) | format version (uint32) | reserved (uint32) | header length (uint64)
+    | header SHA-256 (32 bytes) | JSON header | sections, each aligned to 64 bytes
+
+Section offsets in the header are relative to the first 64-byte boundary after it.
+
+Usage:
+    python snapshot.py --output engine.snapshot
+    python snapshot.py --output engine.snapshot --catalog-dir catalog_artifacts/
+    python snapshot.py --output engine.snapshot --threshold-max-dims 2 --deadline-scoring
+    python snapshot.py --verify engine.snapshot
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from anytime import AnytimeScorer
+from taxonomy import KeywordTaxonomy
+from threshold import SortedListIndex
+
+SNAPSHOT_MAGIC = b'FSENGSNP'
+SNAPSHOT_FORMAT_VERSION = 4
+SECTION_ALIGNMENT = 64
+METADATA_COLUMNS = ['Title', 'Type', 'Description', 'URL']
+
+_PREAMBLE = struct.Struct('<8sIIQ32s')
+
+
+def _align(offset: int) -> int:
+    """Rounds an offset up to the section alignment."""
+    return (offset + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def _encode_strings(values) -> bytes:
+    """
+    Packs a string column as NUL-separated UTF-8.
+
+    Raises:
+        ValueError: If a value contains a NUL character
+    """
+    values = [str(value) for value in values]
+    if any('\x00' in value for value in values):
+        raise ValueError("Metadata values must not contain NUL characters")
+    return '\x00'.join(values).encode('utf-8')
+
+
+def _decode_strings(data, n_items: int) -> List[str]:
+    """Reverses _encode_strings."""
+    if not n_items:
+        return []
+    return bytes(data).decode('utf-8').split('\x00')
+
+
+def save_snapshot(engine, path: str) -> Dict:
+    """
+    Writes an engine's serving state to a snapshot file.
+
+    The file is written next to the target and renamed into place, so readers
+    never observe a partially written snapshot.
+
+    Args:
+        engine: FutureSelfEngine to snapshot
+        path: Output file path
+
+    Returns:
+        The snapshot header
+
+    Raises:
+        ValueError: If metadata values contain NUL characters
+    """
+    # float32 catalogs (ingested artifacts) stay float32
+    vectors = np.asarray(engine.content_vectors)
+    vectors = vectors.astype('<f4' if vectors.dtype == np.float32 else '<f8', copy=False)
+    n_items = len(vectors)
+    # Keep the engine's memory order: BLAS sums in a layout-dependent order, and
+    # a different layout would change scores in the last bit and reorder ties
+    vectors_order = 'F' if vectors.flags.f_contiguous and not vectors.flags.c_contiguous else 'C'
+
+    # The compiled keyword automaton, so loading skips taxonomy compilation
+    taxonomy = engine.taxonomy
+    keywords = taxonomy.keywords
+    taxonomy_arrays = taxonomy.to_arrays()
+
+    payloads = {
+        'vectors': vectors.tobytes(order=vectors_order),
+        'keywords': _encode_strings(keywords),
+    }
+    for name, values in taxonomy_arrays.items():
+        payloads[f'taxonomy.{name}'] = values.tobytes()
+    for column in METADATA_COLUMNS:
+        payloads[f'metadata.{column}'] = _encode_strings(engine.content_metadata[column])
+
+    arrays = {
+        'vectors': (vectors.dtype.str, [n_items, len(engine.skill_dimensions)], vectors_order),
+    }
+    for name, values in taxonomy_arrays.items():
+        arrays[f'taxonomy.{name}'] = (values.dtype.str, list(values.shape), 'C')
+
+    # Derived arrays the engine scores with, so a loaded engine returns the same
+    # scores (to the last bit) as the one that was saved
+    indexes = {}
+    derived = {}
+    if engine.data_loader.unit_vectors is not None:
+        derived['normalized'] = engine.data_loader.unit_vectors
+    sorted_index = engine.sorted_index
+    if sorted_index is not None and sorted_index.catalog_version == engine.catalog_version:
+        indexes['threshold'] = {'max_dims': sorted_index.max_dims, 'max_fraction': sorted_index.max_fraction}
+        derived['threshold.unit_vectors'] = sorted_index.unit_vectors
+        derived['threshold.orders'] = sorted_index.orders
+    anytime_scorer = engine.anytime_scorer
+    if anytime_scorer is not None and anytime_scorer.catalog_version == engine.catalog_version:
+        indexes['anytime'] = {'block_size': anytime_scorer.block_size}
+        for name in ('unit_vectors', 'rows', 'offsets', 'centroids'):
+            derived[f'anytime.{name}'] = getattr(anytime_scorer, name)
+    for name, values in derived.items():
+        values = np.ascontiguousarray(values)
+        payloads[name] = values.tobytes()
+        arrays[name] = (values.dtype.str, list(values.shape), 'C')
+
+    header = {
+        'catalog_version': engine.catalog_version,
+        # Version of the ingested catalog the engine was loaded from (None for the
+        # built-in catalog), so a stale snapshot can be detected before loading it
+        'source_catalog_version': engine.data_loader.catalog_version,
+        'skill_dimensions': list(engine.skill_dimensions),
+        'n_items': n_items,
+        'n_keywords': len(keywords),
+        'taxonomy': {
+            'version': taxonomy.version,
+            'source': taxonomy.source,
+            'source_digest': taxonomy.source_digest,
+            'arrays': list(taxonomy_arrays)
+        },
+        'metadata_columns': METADATA_COLUMNS,
+        'normalized': 'normalized' in derived,
+        'indexes': indexes,
+        'created_at': time.time(),
+        'sections': {},
+    }
+
+    # Section offsets are relative to the data start, which is the first aligned
+    # position after the header
+    offset = 0
+    for name, data in payloads.items():
+        offset = _align(offset)
+        section = {
+            'offset': offset,
+            'nbytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+        if name in arrays:
+            section['dtype'], section['shape'], section['order'] = arrays[name]
+        header['sections'][name] = section
+        offset += len(data)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temporary name, so workers writing the same snapshot concurrently
+    # each rename a complete file into place
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=target.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(_PREAMBLE.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, 0, len(header_bytes),
+                hashlib.sha256(header_bytes).digest()
+            ))
+            fp.write(header_bytes)
+            for name, data in payloads.items():
+                fp.seek(data_start + header['sections'][name]['offset'])
+                fp.write(data)
+            fp.truncate()
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return header
+
+
+def read_header(path: str) -> Dict:
+    """
+    Reads and validates a snapshot header without touching the sections.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        The header dictionary, with 'data_start' set to the file offset that
+        section offsets are relative to
+
+    Raises:
+        ValueError: If the file is not a snapshot, uses another format version,
+            or its header checksum does not match
+    """
+    with open(path, 'rb') as fp:
+        preamble = fp.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise ValueError(f"{path} is not an engine snapshot")
+        magic, version, _, header_length, header_digest = _PREAMBLE.unpack(preamble)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an engine snapshot")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {version}")
+        header_bytes = fp.read(header_length)
+    if hashlib.sha256(header_bytes).digest() != header_digest:
+        raise ValueError(f"Snapshot header checksum mismatch in {path}")
+    header = json.loads(header_bytes)
+    header['data_start'] = _align(_PREAMBLE.size + header_length)
+    return header
+
+
+def load_snapshot(path: str, mmap: bool = True, verify: bool = True) -> Dict:
+    """
+    Opens a snapshot written by save_snapshot.
+
+    With mmap=True the scoring matrix stays on disk and is paged in on first use,
+    and the metadata strings are decoded on first use as well. Verification hashes
+    every section, so trusted snapshots open fastest with verify=False.
+
+    Args:
+        path: Snapshot file path
+        mmap: Memory-map array sections instead of reading them
+        verify: Check every section against its SHA-256
+
+    Returns:
+        Dictionary with 'header', 'catalog_version', 'skill_dimensions', 'vectors',
+        'unit_vectors' (pre-normalized float32 rows, or None), 'metadata' (function
+        returning the metadata DataFrame), 'taxonomy' (compiled KeywordTaxonomy),
+        'sorted_index' and 'anytime_scorer' (SortedListIndex and AnytimeScorer, or
+        None when the saved engine had none attached)
+
+    Raises:
+        ValueError: If the file is not a valid snapshot or a checksum does not match
+    """
+    header = read_header(path)
+    sections = header['sections']
+    buffer = np.memmap(path, dtype=np.uint8, mode='r') if mmap else np.fromfile(path, dtype=np.uint8)
+
+    def raw(name: str) -> np.ndarray:
+        section = sections[name]
+        start = header['data_start'] + section['offset']
+        data = buffer[start:start + section['nbytes']]
+        if len(data) != section['nbytes']:
+            raise ValueError(f"Snapshot section '{name}' is truncated")
+        if verify and hashlib.sha256(data).hexdigest() != section['sha256']:
+            raise ValueError(f"Snapshot section '{name}' checksum mismatch")
+        return data
+
+    def array(name: str) -> np.ndarray:
+        section = sections[name]
+        return raw(name).view(section['dtype']).reshape(section['shape'], order=section['order'])
+
+    n_items = header['n_items']
+    # Checked now when verifying, decoded only when the metadata is first needed
+    metadata_sections = {column: raw(f'metadata.{column}') for column in header['metadata_columns']}
+
+    def metadata() -> pd.DataFrame:
+        return pd.DataFrame({
+            column: _decode_strings(data, n_items) for column, data in metadata_sections.items()
+        })
+
+    dimensions = header['skill_dimensions']
+    taxonomy_info = header['taxonomy']
+    taxonomy = KeywordTaxonomy.from_arrays(
+        _decode_strings(raw('keywords'), header['n_keywords']),
+        dimensions,
+        {name: array(f'taxonomy.{name}') for name in taxonomy_info['arrays']},
+        source=taxonomy_info['source'],
+        source_digest=taxonomy_info['source_digest']
+    )
+    if taxonomy.version != taxonomy_info['version']:
+        raise ValueError("Snapshot keyword taxonomy does not match its recorded version")
+
+    catalog_version = header['catalog_version']
+    indexes = header['indexes']
+    sorted_index = None
+    if 'threshold' in indexes:
+        sorted_index = SortedListIndex(
+            array('threshold.unit_vectors'), array('threshold.orders'), catalog_version,
+            **indexes['threshold']
+        )
+    anytime_scorer = None
+    if 'anytime' in indexes:
+        anytime_scorer = AnytimeScorer(
+            array('anytime.unit_vectors'), array('anytime.rows'), array('anytime.offsets'),
+            array('anytime.centroids'), catalog_version, **indexes['anytime']
+        )
+
+    return {
+        'header': header,
+        'catalog_version': catalog_version,
+        'skill_dimensions': dimensions,
+        'vectors': array('vectors'),
+        'unit_vectors': array('normalized') if header['normalized'] else None,
+        'metadata': metadata,
+        'taxonomy': taxonomy,
+        'sorted_index': sorted_index,
+        'anytime_scorer': anytime_scorer
+    }
+
+
+def is_current(path: str, source_catalog_version: Optional[str]) -> bool:
+    """
+    Checks, from the header alone, whether a snapshot was built from a catalog.
+
+    Args:
+        path: Snapshot file path
+        source_catalog_version: Manifest catalog version of the ingested catalog
+            that should be served, or None for the built-in catalog
+
+    Returns:
+        True if the snapshot exists, is readable and records that source version
+    """
+    try:
+        header = read_header(path)
+    except (OSError, ValueError):
+        return False
+    return header.get('source_catalog_version') == source_catalog_version
+
+
+def main():
+    """Builds or verifies an engine snapshot"""
+    parser = argparse.ArgumentParser(description="Build or verify an engine snapshot")
+    parser.add_argument('--output', help="Snapshot file to write")
+    parser.add_argument('--catalog-dir', default=None,
+                        help="Ingested catalog artifacts (built-in catalog by default)")
+    parser.add_argument('--threshold-max-dims', type=int, default=0,
+                        help="Include per-dimension sorted lists for goals this sparse")
+    parser.add_argument('--deadline-scoring', action='store_true',
+                        help="Include the cluster-ordered layout used by deadline_ms requests")
+    parser.add_argument('--verify', metavar='PATH', help="Check a snapshot's checksums")
+    args = parser.parse_args()
+    if not args.output and not args.verify:
+        parser.error("one of --output or --verify is required")
+
+    if args.output:
+        from recommender import DataLoader, FutureSelfEngine
+
+        start = time.perf_counter()
+        loader = DataLoader.from_artifacts(args.catalog_dir) if args.catalog_dir else None
+        engine = FutureSelfEngine(data_loader=loader)
+        if args.threshold_max_dims:
+            engine.enable_threshold_index(max_dims=args.threshold_max_dims)
+        if args.deadline_scoring:
+            engine.enable_deadline_scoring()
+        header = save_snapshot(engine, args.output)
+        size = Path(args.output).stat().st_size
+        print(f"Wrote snapshot of {header['n_items']:,} items for catalog "
+              f"{header['catalog_version']} in {time.perf_counter() - start:.2f}s "
+              f"({size / 1024 / 1024:.1f} MB) -> {args.output}")
+
+    if args.verify:
+        start = time.perf_counter()
+        snapshot = load_snapshot(args.verify, verify=True)
+        print(f"Snapshot OK: {snapshot['header']['n_items']:,} items, catalog "
+              f"{snapshot['catalog_version']}, verified in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""
+Keyword Taxonomy for the Future-Self Recommendation Engine
+Loads the keyword-to-skill-dimension table from a JSON or CSV file and compiles it
+into an Aho-Corasick automaton, so a goal is matched against every keyword and
+multi-word phrase in one pass over its text, however large the taxonomy is.
+
+A keyword may contribute to several dimensions with its own weights. Like the
+original table, keywords match anywhere in the lowercased goal (as substrings) and
+each matched keyword counts once.
+
+File formats:
+    JSON: {"format_version": 1, "keywords": {"machine learning": {"Data Science": 1.0}, ...}}
+          (a plain dimension name stands for weight 1: {"code": "Coding"})
+    CSV:  keyword,dimension,weight rows; a keyword repeats on one row per dimension
+
+Usage:
+    python taxonomy.py keyword_taxonomy.json --goal "I want to become a CTO"
+    python taxonomy.py --synthetic 300000
+"""
+
+import argparse
+import copy
+import csv
+import hashlib
+import json
+import math
+import sys
+import time
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+TAXONOMY_FORMAT_VERSION = 1
+DEFAULT_TAXONOMY_PATH = Path(__file__).with_name('keyword_taxonomy.json')
+
+# Transitions live in one dict keyed by (state << 21) | code point: Unicode code
+# points fit in 21 bits, and one flat dict is far smaller than a dict per node
+_CODE_BITS = 21
+
+# Below this many keywords, one C-level substring test per keyword beats walking
+# the automaton in Python; both find exactly the same keywords
+SCAN_THRESHOLD = 256
+
+
+def read_entries(path: str) -> Iterator[Tuple[str, str, float]]:
+    """
+    Streams (keyword, dimension, weight) entries from a taxonomy file.
+
+    Args:
+        path: JSON file, or CSV file (by .csv extension)
+
+    Yields:
+        Entries in file order
+
+    Raises:
+        ValueError: If the file is malformed or uses an unsupported format version
+    """
+    if Path(path).suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as fp:
+            reader = csv.DictReader(fp)
+            missing = {'keyword', 'dimension'} - set(reader.fieldnames or [])
+            if missing:
+                raise ValueError(f"Taxonomy CSV is missing columns {sorted(missing)}")
+            for row in reader:
+                yield row['keyword'], row['dimension'], float(row.get('weight') or 1.0)
+        return
+
+    with open(path, encoding='utf-8') as fp:
+        document = json.load(fp)
+    if not isinstance(document, dict) or not isinstance(document.get('keywords'), dict):
+        raise ValueError("Taxonomy JSON must be an object with a 'keywords' object")
+    version = document.get('format_version', TAXONOMY_FORMAT_VERSION)
+    if version != TAXONOMY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported taxonomy format {version}")
+    for keyword, dimensions in document['keywords'].items():
+        if isinstance(dimensions, str):
+            yield keyword, dimensions, 1.0
+            continue
+        if not isinstance(dimensions, dict):
+            raise ValueError(f"Keyword '{keyword}' must map to a dimension name or a {{dimension: weight}} object")
+        for dimension, weight in dimensions.items():
+            yield keyword, dimension, float(weight)
+
+
+def _file_digest(path: str) -> str:
+    """Hashes a taxonomy file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class KeywordTaxonomy:
+    """
+    Compiled, immutable keyword matcher.
+
+    Engines hold a reference to one instance and replace it wholesale on reload, so a
+    request that already picked up the old matcher finishes with it consistently.
+    """
+
+    def __init__(self, keywords: List[str], weights: np.ndarray, dimensions: List[str],
+                 goto: Dict[int, int], fail: array, output: array, dict_link: array,
+                 source: Optional[str] = None, source_digest: Optional[str] = None):
+        """
+        Use compile(), load() or from_arrays() rather than calling this directly.
+
+        Args:
+            keywords: Keyword strings, indexed by keyword ID
+            weights: Array of shape (n_keywords, n_dims) with per-dimension weights
+            dimensions: Skill dimension names, in weight-column order
+            goto: Automaton transitions keyed by (state << 21) | code point
+            fail: Failure link of each state
+            output: Keyword ID ending at each state, or -1
+            dict_link: Nearest state on the failure chain with an output, or -1
+            source: File the taxonomy was loaded from
+            source_digest: SHA-256 of that file
+        """
+        self.keywords = keywords
+        self.weights = weights
+        self.dimensions = list(dimensions)
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        self._dict_link = dict_link
+        self.source = source
+        self.source_digest = source_digest
+        self.version = self._compute_version()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    @classmethod
+    def compile(cls, entries: Iterable[Tuple[str, str, float]], dimensions: List[str],
+                source: Optional[str] = None,
+                source_digest: Optional[str] = None) -> "KeywordTaxonomy":
+        """
+        Builds the automaton for a set of entries.
+
+        Args:
+            entries: (keyword, dimension, weight) tuples; keywords are lowercased
+            dimensions: Skill dimension names the weights refer to
+            source: Optional file the entries came from
+            source_digest: Optional SHA-256 of that file
+
+        Returns:
+            Compiled KeywordTaxonomy
+
+        Raises:
+            ValueError: If a keyword is empty, a dimension is unknown, a weight is not
+                finite, or a (keyword, dimension) pair repeats
+        """
+        columns = {dimension: i for i, dimension in enumerate(dimensions)}
+        keyword_ids: Dict[str, int] = {}
+        rows: List[np.ndarray] = []
+        for keyword, dimension, weight in entries:
+            keyword = str(keyword).strip().lower()
+            if not keyword:
+                raise ValueError("Taxonomy keywords must not be empty")
+            if dimension not in columns:
+                raise ValueError(f"Keyword '{keyword}' refers to unknown dimension '{dimension}'")
+            if not math.isfinite(weight):
+                raise ValueError(f"Keyword '{keyword}' has a non-finite weight for '{dimension}'")
+            keyword_id = keyword_ids.setdefault(keyword, len(keyword_ids))
+            if keyword_id == len(rows):
+                rows.append(np.zeros(len(dimensions)))
+            elif rows[keyword_id][columns[dimension]] != 0:
+                raise ValueError(f"Duplicate taxonomy entry for '{keyword}' / '{dimension}'")
+            rows[keyword_id][columns[dimension]] = weight
+
+        keywords = list(keyword_ids)
+        weights = np.array(rows) if rows else np.zeros((0, len(dimensions)))
+
+        # Trie of all keywords
+        goto: Dict[int, int] = {}
+        parent, code_of, depth = array('i', [0]), array('i', [0]), array('i', [0])
+        output = array('i', [-1])
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                key = (state << _CODE_BITS) | ord(char)
+                child = goto.get(key)
+                if child is None:
+                    child = len(parent)
+                    goto[key] = child
+                    parent.append(state)
+                    code_of.append(ord(char))
+                    depth.append(depth[state] + 1)
+                    output.append(-1)
+                state = child
+            output[state] = keyword_id
+
+        # Failure and dictionary links, shallowest states first
+        n_states = len(parent)
+        fail = array('i', bytes(4 * n_states))
+        dict_link = array('i', [-1]) * n_states
+        for state in sorted(range(1, n_states), key=depth.__getitem__):
+            if parent[state]:
+                code = code_of[state]
+                link = fail[parent[state]]
+                while link and ((link << _CODE_BITS) | code) not in goto:
+                    link = fail[link]
+                fail[state] = goto.get((link << _CODE_BITS) | code, 0)
+            link = fail[state]
+            dict_link[state] = link if output[link] >= 0 else dict_link[link]
+
+        return cls(keywords, weights, dimensions, goto, fail, output, dict_link,
+                   source=source, source_digest=source_digest)
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict, dimensions: List[str]) -> "KeywordTaxonomy":
+        """
+        Compiles an in-memory table.
+
+        Args:
+            mapping: {keyword: dimension} or {keyword: {dimension: weight}}
+            dimensions: Skill dimension names
+
+        Returns:
+            Compiled KeywordTaxonomy
+        """
+        def entries():
+            for keyword, value in mapping.items():
+                if isinstance(value, str):
+                    yield keyword, value, 1.0
+                else:
+                    for dimension, weight in value.items():
+                        yield keyword, dimension, float(weight)
+
+        return cls.compile(entries(), dimensions)
+
+    @classmethod
+    def load(cls, path: str, dimensions: List[str],
+             reuse: Optional["KeywordTaxonomy"] = None) -> "KeywordTaxonomy":
+        """
+        Loads and compiles a taxonomy file.
+
+        Args:
+            path: JSON or CSV taxonomy file
+            dimensions: Skill dimension names
+            reuse: Already compiled taxonomy returned as-is when it was built from
+                identical file contents (for example one read from a snapshot)
+
+        Returns:
+            Compiled KeywordTaxonomy
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is malformed
+        """
+        digest = _file_digest(path)
+        if (reuse is not None and reuse.source_digest == digest
+                and reuse.dimensions == list(dimensions)):
+            if reuse.source == str(path):
+                return reuse
+            # Same contents under another path: share the compiled arrays
+            moved = copy.copy(reuse)
+            moved.source = str(path)
+            return moved
+        return cls.compile(read_entries(path), dimensions, source=str(path), source_digest=digest)
+
+    def _compute_version(self) -> str:
+        """Derives a short identifier from the keywords and weights."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.dimensions).encode('utf-8'))
+        digest.update('\x00'.join(self.keywords).encode('utf-8'))
+        digest.update(np.ascontiguousarray(self.weights, dtype='<f8').tobytes())
+        return digest.hexdigest()[:16]
+
+    def match_ids(self, text: str) -> List[int]:
+        """
+        Finds every keyword occurring in a text.
+
+        Args:
+            text: Goal text (lowercased here)
+
+        Returns:
+            Sorted IDs of the distinct keywords found
+        """
+        text = text.lower()
+        if len(self.keywords) <= SCAN_THRESHOLD:
+            return [keyword_id for keyword_id, keyword in enumerate(self.keywords) if keyword in text]
+
+        goto, fail, output, dict_link = self._goto, self._fail, self._output, self._dict_link
+        found = set()
+        visited = set()
+        state = 0
+        for char in text:
+            code = ord(char)
+            while True:
+                child = goto.get((state << _CODE_BITS) | code)
+                if child is not None:
+                    state = child
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            # Walk the outputs on the suffix chain once per state
+            node = state if output[state] >= 0 else dict_link[state]
+            while node > 0 and node not in visited:
+                visited.add(node)
+                found.add(output[node])
+                node = dict_link[node]
+        return sorted(found)
+
+    def matches(self, text: str) -> List[str]:
+        """
+        Lists the keywords occurring in a text.
+
+        Args:
+            text: Goal text
+
+        Returns:
+            Matched keywords, in taxonomy order
+        """
+        return [self.keywords[keyword_id] for keyword_id in self.match_ids(text)]
+
+    def counts(self, text: str) -> np.ndarray:
+        """
+        Sums the weights of the keywords occurring in a text.
+
+        Args:
+            text: Goal text
+
+        Returns:
+            Numpy array of shape (n_dims,) with per-dimension weighted match counts
+        """
+        ids = self.match_ids(text)
+        if not ids:
+            return np.zeros(len(self.dimensions))
+        return self.weights[ids].sum(axis=0)
+
+    @property
+    def mapping(self) -> Dict[str, Dict[str, float]]:
+        """Keyword table as {keyword: {dimension: weight}}."""
+        return {
+            keyword: {
+                self.dimensions[column]: float(row[column])
+                for column in np.flatnonzero(row)
+            }
+            for keyword, row in zip(self.keywords, self.weights)
+        }
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Exports the compiled automaton as flat arrays (used by snapshots).
+
+        Returns:
+            Dictionary of arrays; from_arrays rebuilds the matcher from them without
+            recomputing failure links
+        """
+        keys = np.fromiter(self._goto.keys(), dtype='<i8', count=len(self._goto))
+        targets = np.fromiter(self._goto.values(), dtype='<i4', count=len(self._goto))
+        return {
+            'weights': np.ascontiguousarray(self.weights, dtype='<f8'),
+            'goto_keys': keys,
+            'goto_targets': targets,
+            'fail': np.frombuffer(self._fail, dtype=np.int32).astype('<i4'),
+            'output': np.frombuffer(self._output, dtype=np.int32).astype('<i4'),
+            'dict_link': np.frombuffer(self._dict_link, dtype=np.int32).astype('<i4'),
+        }
+
+    @classmethod
+    def from_arrays(cls, keywords: List[str], dimensions: List[str], arrays: Dict[str, np.ndarray],
+                    source: Optional[str] = None,
+                    source_digest: Optional[str] = None) -> "KeywordTaxonomy":
+        """
+        Reverses to_arrays.
+
+        Args:
+            keywords: Keyword strings, indexed by keyword ID
+            dimensions: Skill dimension names
+            arrays: Output of to_arrays
+            source: File the taxonomy was originally loaded from
+            source_digest: SHA-256 of that file
+
+        Returns:
+            KeywordTaxonomy equivalent to the exported one
+        """
+        goto = dict(zip(arrays['goto_keys'].tolist(), arrays['goto_targets'].tolist()))
+        return cls(
+            keywords, np.array(arrays['weights'], dtype=np.float64), dimensions, goto,
+            array('i', arrays['fail'].tolist()), array('i', arrays['output'].tolist()),
+            array('i', arrays['dict_link'].tolist()),
+            source=source, source_digest=source_digest
+        )
+
+    def stats(self) -> Dict:
+        """
+        Returns taxonomy statistics.
+
+        Returns:
+            Dictionary with keyword and state counts, version, source and an
+            approximate size in bytes
+        """
+        # Transition keys are large ints (28 bytes each); targets past 256 are too
+        goto_bytes = sys.getsizeof(self._goto) + 56 * len(self._goto)
+        link_bytes = sum(link.itemsize * len(link) for link in (self._fail, self._output, self._dict_link))
+        keyword_bytes = sum(sys.getsizeof(keyword) for keyword in self.keywords)
+        return {
+            'keywords': len(self.keywords),
+            'states': len(self._fail),
+            'version': self.version,
+            'source': self.source,
+            'bytes': int(goto_bytes + link_bytes + keyword_bytes + self.weights.nbytes)
+        }
+
+
+@lru_cache(maxsize=4)
+def default_taxonomy(dimensions: Tuple[str, ...]) -> KeywordTaxonomy:
+    """
+    Compiles the bundled taxonomy once per process.
+
+    Args:
+        dimensions: Skill dimension names
+
+    Returns:
+        Shared compiled KeywordTaxonomy (immutable, so safe to share across engines)
+    """
+    return KeywordTaxonomy.load(str(DEFAULT_TAXONOMY_PATH), list(dimensions))
+
+
+def main():
+    """Compiles a taxonomy file and reports its size and matching speed"""
+    from ingest import DEFAULT_SKILL_DIMENSIONS
+
+    parser = argparse.ArgumentParser(description="Compile and inspect a keyword taxonomy")
+    parser.add_argument('path', nargs='?', default=str(DEFAULT_TAXONOMY_PATH),
+                        help="JSON or CSV taxonomy file")
+    parser.add_argument('--goal', action='append', default=[], help="Goal text to match (repeatable)")
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="Benchmark a generated taxonomy with this many phrases instead")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.synthetic:
+        rng = np.random.default_rng(42)
+        codes = rng.integers(ord('a'), ord('z') + 1, size=(max(args.synthetic // 4, 1), 9))
+        words = [bytes(row[:length].tolist()).decode('ascii')
+                 for row, length in zip(codes, rng.integers(3, 10, size=len(codes)))]
+        picks = rng.integers(0, len(words), size=(args.synthetic, 3))
+        phrases = sorted({' '.join(words[i] for i in row[:length])
+                          for row, length in zip(picks, rng.integers(1, 4, size=args.synthetic))})
+        entries = [
+            (phrase, DEFAULT_SKILL_DIMENSIONS[i % len(DEFAULT_SKILL_DIMENSIONS)], weight)
+            for i, (phrase, weight) in enumerate(zip(phrases, rng.random(len(phrases)).tolist()))
+        ]
+        taxonomy = KeywordTaxonomy.compile(entries, DEFAULT_SKILL_DIMENSIONS)
+        goals = args.goal or [' '.join(words[i] for i in row) for row in rng.integers(0, len(words), size=(1000, 12))]
+    else:
+        taxonomy = KeywordTaxonomy.load(args.path, DEFAULT_SKILL_DIMENSIONS)
+        goals = args.goal or ["I want to become a CTO who still writes Python and runs marathons"]
+    stats = taxonomy.stats()
+    print(f"Compiled {stats['keywords']:,} keywords into {stats['states']:,} states in "
+          f"{time.perf_counter() - start:.2f}s (~{stats['bytes'] / 1024 / 1024:.1f} MB, "
+          f"version {stats['version']})")
+
+    start = time.perf_counter()
+    for goal in goals:
+        counts = taxonomy.counts(goal)
+    elapsed = (time.perf_counter() - start) / len(goals) * 1e6
+    print(f"Matching: {elapsed:.1f} us per goal ({len(goals)} goals)")
+    if args.goal:
+        for goal in args.goal:
+            print(f"\n{goal}\n  keywords: {taxonomy.matches(goal)}")
+            print(f"  counts:   {dict(zip(taxonomy.dimensions, taxonomy.counts(goal).round(3).tolist()))}")
+    else:
+        print(f"Last counts: {counts.round(3).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
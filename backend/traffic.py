@@ -0,0 +1,526 @@
+"""
+Traffic Capture and Replay for the Future-Self Recommendation API
+An ASGI middleware records a sample of recommend requests (request body, timing and a
+digest of the ranking returned) to a JSONL file, written off the request path. The
+replay command sends a recording to an engine, in-process or over HTTP, at the
+original pace or faster, and reports latency differences and ranking changes.
+
+Usage:
+    python traffic.py capture.jsonl --speed 4
+    python traffic.py capture.jsonl --url http://localhost:8000 --speed 0 --concurrency 8
+    python traffic.py capture.jsonl --catalog-dir catalog_artifacts/ --output report.json
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from analytics import AnalyticsSink
+from binary_encoding import MSGPACK_MEDIA_TYPE, decode_msgpack, msgpack_available
+
+# Endpoints whose requests are captured and can be replayed
+CAPTURED_PATHS = ('/recommend_content', '/recommend_content/batch')
+
+# Scores are compared at this precision, so BLAS rounding does not count as a change
+SCORE_DECIMALS = 6
+
+
+def ranking_of(content) -> List[Dict]:
+    """
+    Extracts the ranked items and scores from a recommend or batch response.
+
+    Args:
+        content: Parsed /recommend_content result or {'results': [...]} batch body
+
+    Returns:
+        One {'items': [...], 'scores': [...]} entry per goal, in request order
+    """
+    results = content['results'] if 'results' in content else [content]
+    return [
+        {
+            'items': [rec['content_id'] for rec in result['recommendations']],
+            'scores': [round(rec['match_score'], SCORE_DECIMALS) for rec in result['recommendations']]
+        }
+        for result in results
+    ]
+
+
+def ranking_digest(ranking: List[Dict]) -> str:
+    """
+    Hashes a ranking so that identical results compare equal across runs.
+
+    Cursors, vectors and explanations are left out: only the items, their order
+    and their scores (rounded to SCORE_DECIMALS) count.
+
+    Args:
+        ranking: Output of ranking_of()
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(json.dumps(ranking, separators=(',', ':')).encode('utf-8')).hexdigest()[:32]
+
+
+def _parse_body(body: bytes, content_type: str):
+    """Parses a JSON or MessagePack response body, or returns None."""
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+    if content_type.startswith(MSGPACK_MEDIA_TYPE) and msgpack_available():
+        return decode_msgpack(body, as_numpy=False)
+    return None
+
+
+class TrafficRecorder:
+    """
+    Samples requests and queues them for a background JSONL writer.
+
+    Records are written by an AnalyticsSink, so a slow disk drops records (counted
+    in stats()) instead of slowing requests down.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 0.1, max_queue: int = 10_000):
+        """
+        Args:
+            path: JSONL file receiving the records (appended to)
+            sample_rate: Fraction of requests recorded, in (0, 1]
+
+        Raises:
+            ValueError: If the sample rate is outside (0, 1]
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.sample_rate = sample_rate
+        self.sink = AnalyticsSink(path, backend='jsonl', max_queue=max_queue)
+
+    def sampled(self) -> bool:
+        """Decides whether the next request is recorded."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, path: str, request_body: bytes, status: int, content_type: str,
+               response_body: bytes, ts: float, latency_ms: float) -> bool:
+        """
+        Queues one captured exchange.
+
+        Only successful responses are kept: a replay compares rankings, which
+        errors and 304s do not carry.
+
+        Args:
+            path: Request path
+            request_body: Raw JSON request body
+            status: Response status
+            content_type: Response Content-Type
+            response_body: Raw response body
+            ts: Wall-clock time the request arrived
+            latency_ms: Time until the response was complete
+
+        Returns:
+            True if the record was queued
+        """
+        if status != 200:
+            return False
+        try:
+            request = json.loads(request_body)
+            content = _parse_body(response_body, content_type)
+        except ValueError:
+            return False
+        ranking = ranking_of(content) if content is not None else None
+        return self.sink.log({
+            'ts': ts,
+            'path': path,
+            'request': request,
+            'latency_ms': latency_ms,
+            'response_digest': ranking_digest(ranking) if ranking is not None else None,
+            'ranking': ranking
+        })
+
+    def stats(self) -> Dict:
+        """
+        Returns the sample rate and writer counters.
+
+        Returns:
+            Dictionary with the sample rate and the sink's queued/written/dropped counts
+        """
+        return {'sample_rate': self.sample_rate, **self.sink.stats()}
+
+    def close(self):
+        """Writes everything still queued."""
+        self.sink.close()
+
+
+class CaptureMiddleware:
+    """
+    ASGI middleware feeding sampled recommend requests to a TrafficRecorder.
+
+    Request and response bodies are passed through unchanged; only sampled requests
+    to CAPTURED_PATHS have their chunks collected on the way.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] != 'http' or scope['method'] != 'POST'
+                or scope['path'] not in CAPTURED_PATHS or not self.recorder.sampled()):
+            await self.app(scope, receive, send)
+            return
+
+        request_chunks: List[bytes] = []
+        response_chunks: List[bytes] = []
+        response_start: Dict = {}
+
+        async def capture_receive():
+            message = await receive()
+            if message['type'] == 'http.request':
+                request_chunks.append(message.get('body', b''))
+            return message
+
+        async def capture_send(message):
+            if message['type'] == 'http.response.start':
+                response_start.update(message)
+            elif message['type'] == 'http.response.body':
+                response_chunks.append(message.get('body', b''))
+            await send(message)
+
+        ts = time.time()
+        start = time.perf_counter()
+        await self.app(scope, capture_receive, capture_send)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        headers = dict(response_start.get('headers', []))
+        self.recorder.record(
+            scope['path'], b''.join(request_chunks), response_start.get('status', 0),
+            headers.get(b'content-type', b'').decode('latin-1'), b''.join(response_chunks),
+            ts, latency_ms
+        )
+
+
+def read_capture(path: str) -> Iterator[Dict]:
+    """
+    Streams the records of a capture file.
+
+    Args:
+        path: JSONL file written by TrafficRecorder
+
+    Yields:
+        Record dictionaries, in file order
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _call_engine(engine, path: str, request: Dict) -> Dict:
+    """Answers a recorded request with an in-process engine, like the API does."""
+    if path == '/recommend_content/batch':
+        goals = [goal.strip() for goal in request['goals']]
+        return {'results': engine.recommend_batch(goals, top_k=request.get('top_k', 5))}
+    return engine.recommend(
+        user_goal=request['goal'].strip(),
+        top_k=request.get('top_k', 5),
+        with_cursor=True,
+        user_id=request.get('user_id'),
+        explain=request.get('explain', False),
+        deadline_ms=request.get('deadline_ms')
+    )
+
+
+def _call_url(base_url: str, path: str, request: Dict, timeout: float) -> Dict:
+    """Sends a recorded request to a running API."""
+    http_request = urllib.request.Request(
+        f"{base_url.rstrip('/')}{path}",
+        data=json.dumps(request).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(http_request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def not_comparable_reason(record: Dict) -> Optional[str]:
+    """
+    Tells why a captured ranking cannot be reproduced by a replay, if it cannot.
+
+    A user's exclusions come from consumption events the replayed engine never saw,
+    cursors point at orderings held by the engine that issued them, and a result cut
+    off by a deadline depends on timing. Such requests are still replayed for
+    latency, but their rankings are not compared.
+
+    Args:
+        record: Capture record
+
+    Returns:
+        'user_id', 'cursor' or 'deadline_ms', or None if the ranking is comparable
+    """
+    request = record.get('request') or {}
+    for field in ('user_id', 'cursor', 'deadline_ms'):
+        if request.get(field) is not None:
+            return field
+    return None
+
+
+def compare_rankings(recorded: List[Dict], replayed: List[Dict]) -> Dict:
+    """
+    Compares the rankings of one recorded and replayed response.
+
+    Args:
+        recorded: ranking_of() output stored in the capture
+        replayed: ranking_of() output of the replay
+
+    Returns:
+        Dictionary with 'identical', 'top1_changed', 'overlap' (mean fraction of
+        recorded items still returned) and 'max_score_delta'
+    """
+    top1_changed = False
+    overlaps = []
+    max_score_delta = 0.0
+    for old, new in zip(recorded, replayed):
+        if old['items'][:1] != new['items'][:1]:
+            top1_changed = True
+        if old['items']:
+            overlaps.append(len(set(old['items']) & set(new['items'])) / len(old['items']))
+        new_scores = dict(zip(new['items'], new['scores']))
+        for item, score in zip(old['items'], old['scores']):
+            if item in new_scores:
+                max_score_delta = max(max_score_delta, abs(new_scores[item] - score))
+    return {
+        'identical': ranking_digest(recorded) == ranking_digest(replayed),
+        'top1_changed': top1_changed,
+        'overlap': float(np.mean(overlaps)) if overlaps else 1.0,
+        'max_score_delta': max_score_delta
+    }
+
+
+def replay(records: List[Dict], engine=None, url: Optional[str] = None, speed: float = 1.0,
+           concurrency: int = 1, timeout: float = 30.0) -> Tuple[Dict, List[Dict]]:
+    """
+    Replays captured requests and compares the outcome with the recording.
+
+    Arrivals are open-loop: each request is submitted at its recorded offset from
+    the first request (divided by speed), whether or not earlier ones finished, so
+    a slower build sees the same arrival pattern as production did. At most
+    ``concurrency`` requests run at once, though; when the workers fall behind,
+    requests wait for one, and that wait is reported as queueing delay (from the
+    scheduled arrival to the actual send) rather than hidden in the pace.
+
+    Args:
+        records: Capture records (from read_capture)
+        engine: FutureSelfEngine to call in-process
+        url: Base URL of a running API (used instead of engine)
+        speed: Time compression factor; 1 keeps the original pace, 0 sends as fast
+            as the workers allow
+        concurrency: Worker threads issuing requests (requests in flight at most)
+        timeout: HTTP timeout per request
+
+    Returns:
+        Tuple of (summary report, per-request rows)
+
+    Raises:
+        ValueError: If neither or both of engine and url are given
+    """
+    if (engine is None) == (url is None):
+        raise ValueError("Pass exactly one of engine or url")
+    records = [record for record in records if record.get('path') in CAPTURED_PATHS]
+    first_ts = records[0]['ts'] if records else 0.0
+
+    def run(record: Dict, scheduled: Optional[float]) -> Dict:
+        start = time.perf_counter()
+        # Time the request waited for a free worker after its scheduled arrival
+        queue_delay = {} if scheduled is None else {'queue_delay_ms': max(0.0, (start - scheduled) * 1000)}
+        try:
+            if engine is not None:
+                content = _call_engine(engine, record['path'], record['request'])
+            else:
+                content = _call_url(url, record['path'], record['request'], timeout)
+        except Exception as e:
+            return {'record': record, 'error': str(e), **queue_delay}
+        latency_ms = (time.perf_counter() - start) * 1000
+        row = {'record': record, 'latency_ms': latency_ms, **queue_delay}
+        reason = not_comparable_reason(record)
+        if reason is not None:
+            row['not_comparable'] = reason
+        elif record.get('ranking') is not None:
+            row.update(compare_rankings(record['ranking'], ranking_of(content)))
+        return row
+
+    started = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='replay') as pool:
+        for record in records:
+            # Without pacing every request arrives at once, so there is no schedule to lag
+            scheduled = None
+            if speed > 0:
+                scheduled = started + (record['ts'] - first_ts) / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(run, record, scheduled))
+    rows = [future.result() for future in futures]
+    return summarize(rows, time.perf_counter() - started), rows
+
+
+def _percentiles(values: List[float]) -> Dict:
+    """Mean and tail percentiles of a latency sample."""
+    if not values:
+        return {'mean': None, 'p50': None, 'p95': None, 'p99': None}
+    array = np.asarray(values)
+    return {
+        'mean': float(array.mean()),
+        'p50': float(np.percentile(array, 50)),
+        'p95': float(np.percentile(array, 95)),
+        'p99': float(np.percentile(array, 99))
+    }
+
+
+def summarize(rows: List[Dict], elapsed: float) -> Dict:
+    """
+    Aggregates replay rows into a report.
+
+    Args:
+        rows: Per-request rows from replay()
+        elapsed: Wall-clock seconds the replay took
+
+    Returns:
+        Dictionary with request counts, recorded and replayed latency percentiles
+        (replayed also with queueing delay added, when requests were paced),
+        ranking change counts (requests that cannot be reproduced are counted as
+        not comparable by reason) and the requests whose rankings changed the most
+    """
+    done = [row for row in rows if 'error' not in row]
+    not_comparable = {}
+    for row in done:
+        if 'not_comparable' in row:
+            not_comparable[row['not_comparable']] = not_comparable.get(row['not_comparable'], 0) + 1
+    compared = [row for row in done if 'identical' in row]
+    changed = sorted(
+        (row for row in compared if not row['identical']),
+        key=lambda row: (row['overlap'], -row['max_score_delta'])
+    )
+    paced = [row for row in done if 'queue_delay_ms' in row]
+    return {
+        'requests': len(rows),
+        'errors': len(rows) - len(done),
+        'elapsed_seconds': elapsed,
+        'latency_ms': {
+            'recorded': _percentiles([row['record']['latency_ms'] for row in done]),
+            'replayed': _percentiles([row['latency_ms'] for row in done]),
+            # What a client arriving on schedule would have waited in total
+            'replayed_with_queueing': _percentiles([row['latency_ms'] + row['queue_delay_ms'] for row in paced])
+        },
+        'queue_delay_ms': _percentiles([row['queue_delay_ms'] for row in paced]),
+        'rankings': {
+            'compared': len(compared),
+            'not_comparable': not_comparable,
+            'identical': sum(row['identical'] for row in compared),
+            'top1_changed': sum(row['top1_changed'] for row in compared),
+            'mean_overlap': float(np.mean([row['overlap'] for row in compared])) if compared else None,
+            'max_score_delta': max((row['max_score_delta'] for row in compared), default=0.0)
+        },
+        'largest_changes': [
+            {
+                'path': row['record']['path'],
+                'goal': row['record']['request'].get('goal', row['record']['request'].get('goals')),
+                'overlap': row['overlap'],
+                'top1_changed': row['top1_changed'],
+                'max_score_delta': row['max_score_delta']
+            }
+            for row in changed[:10]
+        ]
+    }
+
+
+def format_report(report: Dict) -> str:
+    """
+    Renders a replay report as text.
+
+    Args:
+        report: Output of summarize()
+
+    Returns:
+        Multi-line report
+    """
+    lines = [
+        f"Replayed {report['requests']} requests in {report['elapsed_seconds']:.1f}s "
+        f"({report['errors']} errors)",
+        f"{'latency ms':<10} {'recorded':>10} {'replayed':>10} {'delta':>10}"
+    ]
+    recorded, replayed = report['latency_ms']['recorded'], report['latency_ms']['replayed']
+    for name in ('mean', 'p50', 'p95', 'p99'):
+        if recorded[name] is None:
+            continue
+        lines.append(f"{name:<10} {recorded[name]:>10.2f} {replayed[name]:>10.2f} "
+                     f"{replayed[name] - recorded[name]:>+10.2f}")
+    queue_delay = report['queue_delay_ms']
+    if queue_delay['mean'] is not None:
+        with_queueing = report['latency_ms']['replayed_with_queueing']
+        lines.append(f"Queueing delay ms (workers behind schedule): mean {queue_delay['mean']:.2f}, "
+                     f"p99 {queue_delay['p99']:.2f}; replayed p99 with queueing {with_queueing['p99']:.2f}")
+    rankings = report['rankings']
+    if rankings['compared']:
+        lines.append(
+            f"Rankings: {rankings['identical']}/{rankings['compared']} identical, "
+            f"top-1 changed in {rankings['top1_changed']}, mean overlap {rankings['mean_overlap']:.3f}, "
+            f"max score delta {rankings['max_score_delta']:.6f}"
+        )
+    if rankings['not_comparable']:
+        reasons = ', '.join(f"{count} with {reason}" for reason, count in sorted(rankings['not_comparable'].items()))
+        lines.append(f"Not comparable (replayed for latency only): {reasons}")
+    for change in report['largest_changes']:
+        lines.append(f"  overlap {change['overlap']:.2f}  top-1 {'changed' if change['top1_changed'] else 'same':<7} "
+                     f"{change['path']}  {change['goal']}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Replays a capture file against an in-process engine or a running API"""
+    parser = argparse.ArgumentParser(description="Replay captured traffic and compare latency and rankings")
+    parser.add_argument('capture', help="JSONL capture written by the API (FUTURE_SELF_CAPTURE)")
+    parser.add_argument('--url', default=None, help="Replay against a running API instead of in-process")
+    parser.add_argument('--catalog-dir', default=None,
+                        help="Ingested catalog artifacts for the in-process engine (built-in catalog by default)")
+    parser.add_argument('--snapshot', default=None, help="Load the in-process engine from a snapshot")
+    parser.add_argument('--taxonomy', default=None, help="Keyword taxonomy file for the in-process engine")
+    parser.add_argument('--scoring-threads', type=int, default=0,
+                        help="Enable blocked scoring in the in-process engine with this many threads")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Pace relative to the recording (2 = twice as fast, 0 = no pauses)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="Requests in flight at most; arrivals beyond it wait and are "
+                             "reported as queueing delay")
+    parser.add_argument('--limit', type=int, default=None, help="Replay only the first N records")
+    parser.add_argument('--output', default=None, help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    records = list(read_capture(args.capture))[:args.limit]
+    engine = None
+    if args.url is None:
+        from recommender import DataLoader, FutureSelfEngine
+
+        if args.snapshot:
+            engine = FutureSelfEngine.from_snapshot(args.snapshot)
+        else:
+            loader = DataLoader.from_artifacts(args.catalog_dir) if args.catalog_dir else None
+            engine = FutureSelfEngine(data_loader=loader)
+        if args.taxonomy:
+            engine.reload_taxonomy(args.taxonomy)
+        if args.scoring_threads:
+            engine.enable_blocked_scoring(n_threads=args.scoring_threads)
+
+    report, _ = replay(records, engine=engine, url=args.url, speed=args.speed,
+                       concurrency=args.concurrency)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
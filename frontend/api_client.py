@@ -0,0 +1,219 @@
+"""
+HTTP Client for the Future-Self Recommendation API
+Pooled keep-alive session with bounded retries, a background-refreshed health status
+and client-side latency metrics.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class APIClient:
+    """
+    Long-lived client for the recommendation API.
+
+    One instance is meant to be shared by every session of a frontend process: the
+    underlying requests.Session keeps TCP connections alive across calls, and the
+    health status is refreshed by a daemon thread so page renders never wait on a
+    health probe after the first one.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, health_ttl: float = 10.0,
+                 retries: int = 2, backoff_factor: float = 0.2, pool_size: int = 10,
+                 metrics_window: int = 500):
+        """
+        Args:
+            base_url: API root URL (e.g. "http://localhost:8000")
+            timeout: Timeout in seconds for API calls
+            health_ttl: Seconds between background health refreshes
+            retries: Maximum retries for connection errors and 502/503/504 responses
+            backoff_factor: Exponential backoff factor between retries
+            pool_size: Maximum keep-alive connections kept per host
+            metrics_window: Number of recent latencies kept per endpoint
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.health_ttl = health_ttl
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._healthy: Optional[bool] = None
+        self._health_checked_at = 0.0
+        self._health_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._metrics_window = metrics_window
+        self._latencies: Dict[str, deque] = {}
+        self._errors: Dict[str, int] = {}
+
+    def _record(self, endpoint: str, elapsed_ms: float, failed: bool):
+        """Stores the latency and outcome of one call."""
+        with self._lock:
+            if endpoint not in self._latencies:
+                self._latencies[endpoint] = deque(maxlen=self._metrics_window)
+                self._errors[endpoint] = 0
+            self._latencies[endpoint].append(elapsed_ms)
+            if failed:
+                self._errors[endpoint] += 1
+
+    def _request(self, method: str, path: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session and records its latency.
+
+        Returns:
+            Response object
+
+        Raises:
+            requests.HTTPError: If the API answers with an error status
+            requests.RequestException: If the API cannot be reached
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}",
+                timeout=timeout if timeout is not None else self.timeout,
+                **kwargs
+            )
+            response.raise_for_status()
+            failed = False
+            return response
+        finally:
+            self._record(f"{method} {path}", (time.perf_counter() - start) * 1000, failed)
+
+    def _check_health(self) -> bool:
+        """
+        Probes the health endpoint once.
+
+        Returns:
+            True if the API answered 200, False otherwise
+        """
+        try:
+            self._request('GET', '/health', timeout=2)
+            healthy = True
+        except requests.RequestException:
+            healthy = False
+        with self._lock:
+            self._healthy = healthy
+            self._health_checked_at = time.monotonic()
+        return healthy
+
+    def _health_loop(self):
+        """Refreshes the health status every health_ttl seconds."""
+        while True:
+            time.sleep(self.health_ttl)
+            self._check_health()
+
+    def is_healthy(self) -> bool:
+        """
+        Returns the cached health status.
+
+        Only the very first call probes synchronously; afterwards a daemon thread keeps
+        the status fresh and this returns immediately.
+
+        Returns:
+            True if the API was reachable at the last probe
+        """
+        if self._healthy is None:
+            self._check_health()
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(
+                    target=self._health_loop, name='api-health', daemon=True
+                )
+                self._health_thread.start()
+        return bool(self._healthy)
+
+    def recommend(self, goal: str, top_k: int = 5, explain: bool = False) -> Dict:
+        """
+        Calls POST /recommend_content.
+
+        Args:
+            goal: User's goal statement
+            top_k: Number of recommendations to return
+            explain: Request per-dimension match explanations
+
+        Returns:
+            Parsed JSON response
+        """
+        return self._request(
+            'POST', '/recommend_content',
+            json={"goal": goal, "top_k": top_k, "explain": explain}
+        ).json()
+
+    def load_more(self, cursor: str, page_size: int = 5, explain: bool = False) -> Dict:
+        """
+        Calls POST /recommend_content/more.
+
+        Args:
+            cursor: Cursor from a previous response
+            page_size: Number of additional recommendations
+            explain: Request per-dimension match explanations
+
+        Returns:
+            Parsed JSON response
+        """
+        return self._request(
+            'POST', '/recommend_content/more',
+            json={"cursor": cursor, "page_size": page_size, "explain": explain}
+        ).json()
+
+    def recommend_batch(self, goals: List[str], top_k: int = 5) -> List[Dict]:
+        """
+        Calls POST /recommend_content/batch.
+
+        Args:
+            goals: Goal statements (at most 1000 per call)
+            top_k: Number of recommendations per goal
+
+        Returns:
+            List of result dictionaries, one per goal
+        """
+        return self._request(
+            'POST', '/recommend_content/batch',
+            json={"goals": goals, "top_k": top_k}
+        ).json()['results']
+
+    def metrics(self) -> Dict[str, Dict]:
+        """
+        Returns client-side latency metrics per endpoint.
+
+        Returns:
+            Dictionary mapping "METHOD /path" to count, errors, mean, p50 and p95 in ms
+        """
+        with self._lock:
+            snapshot = {endpoint: sorted(values) for endpoint, values in self._latencies.items()}
+            errors = dict(self._errors)
+        report = {}
+        for endpoint, values in snapshot.items():
+            if not values:
+                continue
+            report[endpoint] = {
+                'count': len(values),
+                'errors': errors.get(endpoint, 0),
+                'mean_ms': sum(values) / len(values),
+                'p50_ms': values[len(values) // 2],
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))]
+            }
+        return report
+
+    def close(self):
+        """Closes pooled connections."""
+        self.session.close()
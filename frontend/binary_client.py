@@ -0,0 +1,103 @@
+"""
+Binary Client for the Future-Self Recommendation API
+Minimal client for internal services: asks for MessagePack responses and returns the
+skill vectors as float32 numpy arrays, without the health checks and metrics of
+APIClient. Falls back to JSON transparently when the server answers with JSON.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import requests
+
+# Add backend directory to path to import the shared codec
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from binary_encoding import MSGPACK_MEDIA_TYPE, VECTOR_DTYPE, VECTOR_FIELDS, decode_msgpack, msgpack_available
+
+
+def _vectors_to_numpy(value):
+    """Converts JSON vector lists to float32 arrays so both encodings look alike."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in VECTOR_FIELDS and isinstance(item, list):
+                value[key] = np.asarray(item, dtype=VECTOR_DTYPE)
+            else:
+                _vectors_to_numpy(item)
+    elif isinstance(value, list):
+        for item in value:
+            _vectors_to_numpy(item)
+    return value
+
+
+class BinaryClient:
+    """
+    Keep-alive client that negotiates MessagePack for the recommend endpoints.
+
+    Results have the same shape as the JSON responses, except that goal_vector and
+    content_vector are read-only float32 arrays.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        """
+        Args:
+            base_url: API root URL (e.g. "http://localhost:8000")
+            timeout: Timeout in seconds for API calls
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Without msgpack installed locally, ask for JSON rather than a body we cannot read
+        self.session.headers['Accept'] = (
+            f'{MSGPACK_MEDIA_TYPE}, application/json;q=0.5' if msgpack_available() else 'application/json'
+        )
+
+    def _post(self, path: str, payload: Dict):
+        """
+        Sends a JSON request and decodes either response encoding.
+
+        Returns:
+            Decoded response content
+
+        Raises:
+            requests.HTTPError: If the API answers with an error status
+        """
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        if response.headers.get('Content-Type', '').startswith(MSGPACK_MEDIA_TYPE):
+            return decode_msgpack(response.content)
+        return _vectors_to_numpy(response.json())
+
+    def recommend(self, goal: str, top_k: int = 5, explain: bool = False) -> Dict:
+        """
+        Calls POST /recommend_content.
+
+        Args:
+            goal: User's goal statement
+            top_k: Number of recommendations to return
+            explain: Request per-dimension match explanations
+
+        Returns:
+            Result dictionary
+        """
+        return self._post('/recommend_content', {"goal": goal, "top_k": top_k, "explain": explain})
+
+    def recommend_batch(self, goals: List[str], top_k: int = 5) -> List[Dict]:
+        """
+        Calls POST /recommend_content/batch.
+
+        Args:
+            goals: Goal statements (at most 1000 per call)
+            top_k: Number of recommendations per goal
+
+        Returns:
+            List of result dictionaries, one per goal
+        """
+        return self._post('/recommend_content/batch', {"goals": goals, "top_k": top_k})['results']
+
+    def close(self):
+        """Closes pooled connections."""
+        self.session.close()
@@ -7,7 +7,10 @@ Works without external API - includes recommender engine directly.
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
-from typing import Dict, List
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
 import sys
 from pathlib import Path
 
@@ -16,6 +19,7 @@ backend_path = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_path))
 
 from recommender import FutureSelfEngine
+from exporters import EXPORT_EXTENSIONS, EXPORT_FORMATS, available_formats, export_bytes, write_export
 
 # Page configuration
 st.set_page_config(
@@ -82,7 +86,10 @@ st.markdown("""
 # Initialize recommendation engine (cached for performance)
 @st.cache_resource
 def load_engine():
-    """Load and cache the recommendation engine"""
+    """Load and cache the recommendation engine (from FUTURE_SELF_SNAPSHOT when set)"""
+    snapshot_path = os.environ.get("FUTURE_SELF_SNAPSHOT")
+    if snapshot_path and Path(snapshot_path).exists():
+        return FutureSelfEngine.from_snapshot(snapshot_path)
     return FutureSelfEngine()
 
 
@@ -146,6 +153,95 @@ def create_radar_chart(goal_vector: List[float], content_vector: List[float],
     return fig
 
 
+# Memoized builders: reruns with the same vectors reuse the stored figure/frame
+# instead of rebuilding it. Bounded in size and lifetime.
+RENDER_CACHE_ENTRIES = 256
+RENDER_CACHE_TTL = 3600
+
+
+def build_radar_chart(goal_vector: Tuple[float, ...], content_vector: Tuple[float, ...],
+                      skill_dimensions: Tuple[str, ...], content_title: str,
+                      height: int = 500) -> go.Figure:
+    """
+    Builds a radar chart from hashable inputs so it can be memoized.
+    
+    Args:
+        goal_vector: User's future-self goal vector
+        content_vector: Recommended content's skill vector
+        skill_dimensions: Skill dimension names
+        content_title: Title of the recommended content
+        height: Figure height in pixels
+    
+    Returns:
+        Plotly figure object
+    """
+    fig = create_radar_chart(list(goal_vector), list(content_vector),
+                             list(skill_dimensions), content_title)
+    if height != 500:
+        fig.update_layout(height=height)
+    return fig
+
+
+def build_goal_frame(skill_dimensions: Tuple[str, ...], goal_vector: Tuple[float, ...]) -> pd.DataFrame:
+    """
+    Builds the goal vector DataFrame used by the breakdown bar chart.
+    
+    Args:
+        skill_dimensions: Skill dimension names
+        goal_vector: User's future-self goal vector
+    
+    Returns:
+        DataFrame indexed by skill with a 'Strength' column
+    """
+    return pd.DataFrame({
+        'Skill': list(skill_dimensions),
+        'Strength': list(goal_vector)
+    }).set_index('Skill')
+
+
+cached_radar_chart = st.cache_data(
+    max_entries=RENDER_CACHE_ENTRIES, ttl=RENDER_CACHE_TTL, show_spinner=False
+)(build_radar_chart)
+cached_goal_frame = st.cache_data(
+    max_entries=RENDER_CACHE_ENTRIES, ttl=RENDER_CACHE_TTL, show_spinner=False
+)(build_goal_frame)
+
+
+def record_rerun_timing(elapsed_ms: float, cached: bool):
+    """
+    Stores the duration of this rerun for the sidebar timing report.
+    
+    Args:
+        elapsed_ms: Wall time of the rerun in milliseconds
+        cached: Whether render caches were enabled for this rerun
+    """
+    timings = st.session_state.setdefault('rerun_timings', {'cached': [], 'uncached': []})
+    bucket = timings['cached' if cached else 'uncached']
+    bucket.append(elapsed_ms)
+    del bucket[:-50]
+
+
+def render_timing_report(slot, elapsed_ms: float):
+    """
+    Fills the sidebar placeholder with the rerun timing report.
+    
+    Args:
+        slot: Sidebar placeholder created at the start of the rerun
+        elapsed_ms: Wall time of the current rerun in milliseconds
+    """
+    timings = st.session_state.get('rerun_timings', {'cached': [], 'uncached': []})
+    lines = [f"**This rerun:** {elapsed_ms:.1f} ms", ""]
+    for label, key in (("Cached", 'cached'), ("Uncached", 'uncached')):
+        values = sorted(timings.get(key, []))
+        if values:
+            median = values[len(values) // 2]
+            lines.append(f"- {label}: median {median:.1f} ms over {len(values)} reruns")
+        else:
+            lines.append(f"- {label}: no reruns yet")
+    with slot.container():
+        st.markdown("\n".join(lines))
+
+
 def display_recommendation_card(rec: Dict, index: int):
     """
     Displays a single recommendation as a styled card.
@@ -165,8 +261,109 @@ def display_recommendation_card(rec: Dict, index: int):
     """, unsafe_allow_html=True)
 
 
+def fetch_recommendations(_engine: FutureSelfEngine, catalog_version: str,
+                          user_goal: str, top_k: int) -> Dict:
+    """
+    Runs the local engine for a goal.
+    
+    Args:
+        _engine: Recommendation engine (excluded from the cache key)
+        catalog_version: Engine catalog version, so a catalog change invalidates entries
+        user_goal: User's goal statement
+        top_k: Number of recommendations to return
+    
+    Returns:
+        Recommendation result dictionary
+    """
+    return _engine.recommend(user_goal, top_k=top_k, with_cursor=True, explain=True)
+
+
+cached_fetch_recommendations = st.cache_data(
+    max_entries=512, ttl=600, show_spinner=False
+)(fetch_recommendations)
+
+
+# Bulk cohort scoring: goals are read and scored chunk by chunk and streamed to a
+# temporary file, so memory stays flat regardless of cohort size
+BULK_CHUNK_SIZE = 500
+
+
+def run_bulk_scoring(uploaded_file, goal_column: str, top_k: int,
+                     score_chunk: Callable[[List[str], int], List[Dict]],
+                     progress, export_format: str = 'csv') -> Tuple[str, int]:
+    """
+    Scores an uploaded cohort CSV in chunks and streams the results to a file.
+    
+    Args:
+        uploaded_file: Uploaded CSV file object
+        goal_column: Name of the column holding the goal statements
+        top_k: Number of recommendations per goal
+        score_chunk: Function scoring a list of goals in one batched call
+        progress: Streamlit progress bar updated after every chunk
+        export_format: Output format ('csv', 'json' or 'parquet')
+    
+    Returns:
+        Tuple of (path of the results file, number of goals scored)
+    
+    Raises:
+        ValueError: If the goal column is missing from the file
+    """
+    total_bytes = max(uploaded_file.size, 1)
+    n_goals = 0
+    
+    def scored_results():
+        nonlocal n_goals
+        for chunk in pd.read_csv(uploaded_file, usecols=[goal_column], dtype=str,
+                                 chunksize=BULK_CHUNK_SIZE):
+            goals = [goal for goal in chunk[goal_column].fillna('').str.strip() if goal]
+            if goals:
+                yield from score_chunk(goals, top_k)
+            n_goals += len(goals)
+            progress.progress(
+                min(uploaded_file.tell() / total_bytes, 1.0),
+                text=f"Scored {n_goals:,} goals..."
+            )
+    
+    suffix = f".{EXPORT_EXTENSIONS[export_format]}"
+    with tempfile.NamedTemporaryFile('wb', suffix=suffix, delete=False) as output:
+        write_export(scored_results(), export_format, output)
+    
+    progress.progress(1.0, text=f"Scored {n_goals:,} goals")
+    return output.name, n_goals
+
+
+def score_chunk_locally(goals: List[str], top_k: int) -> List[Dict]:
+    """Scores one chunk of goals with a single batched engine call"""
+    return load_engine().recommend_batch(goals, top_k=top_k)
+
+
+SCORE_CHUNK = score_chunk_locally
+
+
+def load_more_results():
+    """
+    Appends the next page for the stored result's cursor without rescoring.
+    Used as a button callback so the new items are rendered on the same rerun.
+    """
+    result = st.session_state.get('result')
+    if not result or not result.get('next_cursor'):
+        return
+    
+    try:
+        page = load_engine().recommend_more(
+            result['next_cursor'],
+            page_size=st.session_state.get('page_size', 5),
+            explain=True
+        )
+        result['recommendations'] = result['recommendations'] + page['recommendations']
+        result['next_cursor'] = page['next_cursor']
+    except Exception as e:
+        st.session_state['load_more_error'] = str(e)
+
+
 def main():
     """Main Streamlit application"""
+    rerun_start = time.perf_counter()
     
     # Header
     st.markdown('<div class="main-header">🎯 Future-Self Recommendation System</div>', 
@@ -202,6 +399,16 @@ def main():
         
         st.divider()
         st.success("✅ Engine Ready")
+
+        # Rerun timing report (filled in at the end of the rerun)
+        st.divider()
+        st.header("⏱️ Rerun Timing")
+        bypass_cache = st.checkbox(
+            "Bypass render caches",
+            value=False,
+            help="Rebuild charts and results on every rerun to compare against the cached path"
+        )
+        timing_slot = st.empty()
     
     # Load recommendation engine
     try:
@@ -244,10 +451,12 @@ def main():
             with st.spinner("🔍 Analyzing your future-self and finding perfect matches..."):
                 try:
                     # Generate recommendations using local engine
-                    result = engine.recommend(user_goal, top_k=top_k)
+                    fetch = fetch_recommendations if bypass_cache else cached_fetch_recommendations
+                    result = fetch(engine, engine.catalog_version, user_goal, int(top_k))
                     
                     # Store in session state
                     st.session_state['result'] = result
+                    st.session_state['page_size'] = top_k
                     st.success("✅ Recommendations generated successfully!")
                     
                 except Exception as e:
@@ -264,17 +473,18 @@ def main():
         goal_vector = result['goal_vector']
         skill_dimensions = result['skill_dimensions']
         
+        # Pick memoized or uncached builders for this rerun
+        radar_chart = build_radar_chart if bypass_cache else cached_radar_chart
+        goal_frame = build_goal_frame if bypass_cache else cached_goal_frame
+        
         # Create a bar chart for goal vector
-        goal_df = pd.DataFrame({
-            'Skill': skill_dimensions,
-            'Strength': goal_vector
-        })
+        goal_df = goal_frame(tuple(skill_dimensions), tuple(goal_vector))
         
         col1, col2 = st.columns([1, 1])
         
         with col1:
             st.subheader("Goal Vector Breakdown")
-            st.bar_chart(goal_df.set_index('Skill'), height=300)
+            st.bar_chart(goal_df, height=300)
         
         with col2:
             st.subheader("Vector Values")
@@ -297,6 +507,12 @@ def main():
                 # Display all recommendations as cards
                 for i, rec in enumerate(recommendations, 1):
                     display_recommendation_card(rec, i)
+                
+                # Next page is served from the stored ordering, not a rescoring call
+                if 'load_more_error' in st.session_state:
+                    st.error(f"❌ Could not load more: {st.session_state.pop('load_more_error')}")
+                if result.get('next_cursor'):
+                    st.button("➕ Show more", on_click=load_more_results, use_container_width=True)
             
             with tab2:
                 # Radar chart comparison
@@ -313,15 +529,24 @@ def main():
                 selected_rec = recommendations[selected_rec_index]
                 
                 # Create and display radar chart
-                radar_fig = create_radar_chart(
-                    goal_vector=goal_vector,
-                    content_vector=selected_rec['content_vector'],
-                    skill_dimensions=skill_dimensions,
+                radar_fig = radar_chart(
+                    goal_vector=tuple(goal_vector),
+                    content_vector=tuple(selected_rec['content_vector']),
+                    skill_dimensions=tuple(skill_dimensions),
                     content_title=selected_rec['title']
                 )
                 
                 st.plotly_chart(radar_fig, use_container_width=True)
                 
+                # Per-dimension contribution to the match score
+                if selected_rec.get('explanation'):
+                    st.subheader("Why This Matched")
+                    explanation_df = pd.DataFrame({
+                        'Skill': list(selected_rec['explanation'].keys()),
+                        'Contribution': list(selected_rec['explanation'].values())
+                    })
+                    st.bar_chart(explanation_df.set_index('Skill'), height=250)
+                
                 # Display match details
                 st.info(f"""
                 **Match Score:** {selected_rec['match_score']:.1%}
@@ -333,31 +558,81 @@ def main():
                 [🔗 View Content]({selected_rec['url']})
                 """)
                 
-                # Show all radar charts in a grid
+                # Show all radar charts in a grid (built only when requested)
                 st.divider()
                 st.subheader("All Recommendations - Skill Match")
                 
-                cols = st.columns(2)
-                for i, rec in enumerate(recommendations[:6]):  # Show max 6
-                    with cols[i % 2]:
-                        mini_radar = create_radar_chart(
-                            goal_vector=goal_vector,
-                            content_vector=rec['content_vector'],
-                            skill_dimensions=skill_dimensions,
-                            content_title=rec['title'][:30] + "..." if len(rec['title']) > 30 else rec['title']
-                        )
-                        mini_radar.update_layout(height=350)
-                        st.plotly_chart(mini_radar, use_container_width=True)
+                if st.checkbox("Show skill match charts for all recommendations", value=False):
+                    cols = st.columns(2)
+                    for i, rec in enumerate(recommendations[:6]):  # Show max 6
+                        with cols[i % 2]:
+                            mini_radar = radar_chart(
+                                goal_vector=tuple(goal_vector),
+                                content_vector=tuple(rec['content_vector']),
+                                skill_dimensions=tuple(skill_dimensions),
+                                content_title=rec['title'][:30] + "..." if len(rec['title']) > 30 else rec['title'],
+                                height=350
+                            )
+                            st.plotly_chart(mini_radar, use_container_width=True)
         
         # Download results
         st.divider()
-        if st.button("📥 Download Recommendations as JSON"):
-            st.download_button(
-                label="Download JSON",
-                data=str(result),
-                file_name="future_self_recommendations.json",
-                mime="application/json"
-            )
+        st.subheader("📥 Download Recommendations")
+        formats = available_formats()
+        download_cols = st.columns(len(formats))
+        for download_col, export_format in zip(download_cols, formats):
+            with download_col:
+                st.download_button(
+                    label=f"Download {export_format.upper()}",
+                    data=export_bytes(result, export_format),
+                    file_name=f"future_self_recommendations.{EXPORT_EXTENSIONS[export_format]}",
+                    mime=EXPORT_FORMATS[export_format],
+                    use_container_width=True
+                )
+    
+    # Bulk upload mode
+    st.divider()
+    with st.expander("📂 Bulk Goal Upload (CSV)"):
+        uploaded_file = st.file_uploader("Upload a CSV file with one goal per row", type=['csv'])
+        bulk_col1, bulk_col2, bulk_col3 = st.columns([2, 1, 1])
+        with bulk_col1:
+            goal_column = st.text_input("Goal column", value="goal")
+        with bulk_col2:
+            bulk_top_k = st.number_input("Per goal", min_value=1, max_value=20, value=5, key='bulk_top_k')
+        with bulk_col3:
+            bulk_format = st.selectbox("Format", available_formats(), key='bulk_format')
+        
+        if uploaded_file is not None and st.button("⚙️ Score Cohort", use_container_width=True):
+            progress = st.progress(0.0, text="Starting...")
+            try:
+                output_path, n_goals = run_bulk_scoring(
+                    uploaded_file, goal_column, int(bulk_top_k), SCORE_CHUNK, progress,
+                    export_format=bulk_format
+                )
+                previous = st.session_state.pop('bulk_output', None)
+                if previous and os.path.exists(previous[0]):
+                    os.remove(previous[0])
+                st.session_state['bulk_output'] = (output_path, n_goals, bulk_format)
+            except ValueError as e:
+                st.error(f"❌ Could not read column '{goal_column}': {str(e)}")
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+        
+        if 'bulk_output' in st.session_state:
+            output_path, n_goals, output_format = st.session_state['bulk_output']
+            st.success(f"✅ Scored {n_goals:,} goals")
+            with open(output_path, 'rb') as output_file:
+                st.download_button(
+                    label=f"📥 Download Cohort Recommendations ({output_format.upper()})",
+                    data=output_file,
+                    file_name=f"future_self_cohort_recommendations.{EXPORT_EXTENSIONS[output_format]}",
+                    mime=EXPORT_FORMATS[output_format]
+                )
+    
+    # Rerun timing report
+    elapsed_ms = (time.perf_counter() - rerun_start) * 1000
+    record_rerun_timing(elapsed_ms, cached=not bypass_cache)
+    render_timing_report(timing_slot, elapsed_ms)
 
 
 if __name__ == "__main__":
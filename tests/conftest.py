@@ -0,0 +1,68 @@
+"""
+Shared fixtures: a synthetic catalog with many exact score ties.
+
+Ties are where partial top-k selection goes wrong, so every fast path is checked
+against FutureSelfEngine.recommend() on this catalog rather than the built-in one.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend directory to path to import the engine
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from recommender import DataLoader, FutureSelfEngine
+
+GOALS = [
+    'learn python and machine learning',
+    'get fit and run a marathon',
+    'lead a team and start a business',
+    'meditate and reduce stress',
+    'public speaking',
+    'nothing that matches',
+]
+
+
+@pytest.fixture(scope='session')
+def tied_catalog():
+    """Skill dimensions, vectors and metadata of 997 rows drawn from 8 coarse vectors."""
+    skill_dimensions = DataLoader().skill_dimensions
+    rng = np.random.default_rng(7)
+    distinct = rng.integers(0, 5, size=(8, len(skill_dimensions))) / 4
+    distinct[0] = 0.0
+    vectors = distinct[rng.integers(0, len(distinct), size=997)]
+    ids = np.arange(len(vectors)).astype(str)
+    metadata = pd.DataFrame({
+        'Title': np.char.add('Item ', ids),
+        'Type': rng.choice(['Book', 'Course', 'Video'], len(vectors)),
+        'Description': '',
+        'URL': np.char.add('https://example.com/', ids),
+    })
+    return skill_dimensions, vectors, metadata
+
+
+@pytest.fixture
+def make_engine(tied_catalog):
+    """Builds a fresh engine over the tied catalog."""
+    def make(**kwargs):
+        return FutureSelfEngine(data_loader=DataLoader.from_arrays(*tied_catalog), **kwargs)
+    return make
+
+
+def ranking(result):
+    """Content IDs and scores of a result, in order."""
+    recommendations = result['recommendations']
+    return ([rec['content_id'] for rec in recommendations],
+            [rec['match_score'] for rec in recommendations])
+
+
+def assert_same(expected, actual, atol=1e-12):
+    """Asserts two results rank the same items in the same order with the same scores."""
+    expected_ids, expected_scores = ranking(expected)
+    actual_ids, actual_scores = ranking(actual)
+    assert actual_ids == expected_ids
+    np.testing.assert_allclose(actual_scores, expected_scores, rtol=0, atol=atol)
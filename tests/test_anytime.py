@@ -0,0 +1,67 @@
+"""
+Parity tests for deadline-aware scoring.
+
+A deadline_ms request that covers the whole catalog reports coverage 1.0, and must
+then return exactly what recommend() without a deadline returns, with cursor pages
+continuing that ranking.
+"""
+
+import time
+
+import pytest
+
+from conftest import GOALS, assert_same, ranking
+
+
+@pytest.fixture
+def engines(make_engine):
+    """A reference engine and one scoring in cluster order, in small blocks."""
+    anytime = make_engine()
+    anytime.enable_deadline_scoring(block_size=64)
+    return make_engine(), anytime
+
+
+@pytest.mark.parametrize('top_k', [1, 7, 50, 150])
+def test_full_coverage_matches_recommend(engines, top_k):
+    reference, anytime = engines
+    for goal in GOALS:
+        result = anytime.recommend(goal, top_k=top_k, deadline_ms=60_000)
+        assert result['coverage'] == 1.0
+        assert_same(reference.recommend(goal, top_k=top_k), result)
+
+
+def test_cursor_pages_continue_the_ranking(engines):
+    reference, anytime = engines
+    for goal in GOALS:
+        expected = ranking(reference.recommend(goal, top_k=60))[0]
+        page = anytime.recommend(goal, top_k=20, with_cursor=True, deadline_ms=60_000)
+        served = ranking(page)[0]
+        while len(served) < len(expected):
+            page = anytime.recommend_more(page['next_cursor'], page_size=20)
+            served += ranking(page)[0]
+        assert served == expected
+
+
+def test_exclusions_match_recommend(engines):
+    reference, anytime = engines
+    for engine in engines:
+        engine.record_consumption([('reader', content_id) for content_id in range(0, 997, 3)])
+    for goal in GOALS:
+        assert_same(reference.recommend(goal, top_k=25, user_id='reader'),
+                    anytime.recommend(goal, top_k=25, user_id='reader', deadline_ms=60_000))
+
+
+def test_lazy_build_is_not_charged_to_the_budget(make_engine, monkeypatch):
+    from anytime import AnytimeScorer
+
+    build = AnytimeScorer.build
+
+    def slow_build(*args, **kwargs):
+        time.sleep(0.2)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(AnytimeScorer, 'build', slow_build)
+    engine = make_engine()
+    result = engine.recommend(GOALS[0], top_k=5, deadline_ms=100)
+    assert engine.anytime_scorer is not None
+    assert result['coverage'] == 1.0
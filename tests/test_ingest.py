@@ -0,0 +1,76 @@
+"""
+Tests for catalog ingestion.
+
+Rows are validated and deduplicated across chunks, grouped by content type, and
+re-ingesting into a directory a server is reading leaves its files untouched until
+the new manifest is in place.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import SeenHashes, ingest, load_artifacts
+from recommender import DataLoader
+
+
+def write_catalog(path, n_rows, seed, duplicates=0):
+    """Writes a CSV dump of random rows, the last `duplicates` repeating earlier URLs."""
+    rng = np.random.default_rng(seed)
+    urls = [f'https://example.com/{seed}/{i}' for i in range(n_rows)]
+    urls[n_rows - duplicates:] = urls[:duplicates]
+    frame = pd.DataFrame({
+        'Title': [f'Item {i}' for i in range(n_rows)],
+        'Type': rng.choice(['Book', 'Course', 'Video'], n_rows),
+        'Description': '',
+        'URL': urls,
+    })
+    for dimension in DataLoader().skill_dimensions:
+        frame[dimension] = rng.random(n_rows)
+    frame.to_csv(path, index=False)
+    return frame
+
+
+def test_seen_hashes_across_merges():
+    rng = np.random.default_rng(0)
+    seen, reference = SeenHashes(merge_threshold=500), set()
+    for _ in range(20):
+        hashes = rng.integers(0, 5000, size=300).astype(np.uint64)
+        found = seen.contains(hashes)
+        assert found.tolist() == [value in reference for value in hashes.tolist()]
+        seen.add(hashes[~found])
+        reference.update(hashes[~found].tolist())
+    assert len(seen) == len(reference)
+
+
+def test_dedupes_across_chunks_and_groups_types(tmp_path):
+    frame = write_catalog(tmp_path / 'catalog.csv', 1000, seed=1, duplicates=50)
+    manifest = ingest(str(tmp_path / 'catalog.csv'), str(tmp_path / 'out'), chunk_size=128, progress=False)
+    assert manifest['report']['duplicates'] == 50
+    assert manifest['n_rows'] == 950
+
+    artifacts = load_artifacts(str(tmp_path / 'out'))
+    types = frame['Type'].to_numpy()[:950]
+    assert sum(len(rows) for rows in artifacts['type_rows'].values()) == 950
+    for content_type, rows in artifacts['type_rows'].items():
+        assert (types[rows] == content_type).all()
+        assert (np.diff(rows) > 0).all()
+
+
+def test_reingest_keeps_previous_files_readable(tmp_path):
+    write_catalog(tmp_path / 'first.csv', 300, seed=1)
+    write_catalog(tmp_path / 'second.csv', 400, seed=2)
+    ingest(str(tmp_path / 'first.csv'), str(tmp_path / 'out'), progress=False)
+    served = load_artifacts(str(tmp_path / 'out'))
+    before = np.array(served['vectors'])
+
+    second = ingest(str(tmp_path / 'second.csv'), str(tmp_path / 'out'), progress=False)
+    # The memory-mapped files of the first catalog still hold it
+    assert np.array_equal(served['vectors'], before)
+    assert load_artifacts(str(tmp_path / 'out'))['manifest']['catalog_version'] == second['catalog_version']
+
+    (tmp_path / 'bad.csv').write_text('Title,URL\nx,y\n')
+    with pytest.raises(ValueError):
+        ingest(str(tmp_path / 'bad.csv'), str(tmp_path / 'out'), progress=False)
+    assert load_artifacts(str(tmp_path / 'out'))['manifest']['catalog_version'] == second['catalog_version']
+    assert not list((tmp_path / 'out').glob('*.tmp'))
@@ -0,0 +1,37 @@
+"""
+Tests for the engine memory report.
+
+Measuring must not load anything: metadata a snapshot has not decoded yet is reported as unloaded.
+Buffer sharing between the loader's frame and the engine's extracted data is checked
+through public pandas and Arrow accessors, for numpy and Arrow backed columns alike.
+"""
+
+import pandas as pd
+
+from memory import _frames_share, engine_memory_report
+from recommender import FutureSelfEngine
+
+
+def metadata_entry(report):
+    return next(entry for entry in report['components'] if entry['component'] == 'content_metadata')
+
+
+def test_lazy_metadata_is_not_decoded(make_engine, tmp_path):
+    make_engine().save_snapshot(str(tmp_path / 'engine.snapshot'))
+    engine = FutureSelfEngine.from_snapshot(str(tmp_path / 'engine.snapshot'))
+
+    assert metadata_entry(engine_memory_report(engine))['kind'] == 'unloaded'
+    assert engine._content_metadata is None and callable(engine.data_loader._metadata)
+
+    engine.content_metadata
+    assert metadata_entry(engine_memory_report(engine))['rows'] == 997
+
+
+def test_sharing_is_told_apart_from_copies():
+    frame = pd.DataFrame({'Title': ['a', 'b', 'c'], 'Type': pd.Series(['x', 'y', 'z'], dtype=object),
+                          'Score': [1.0, 2.0, 3.0]})
+    assert _frames_share(frame, frame[['Title', 'Type', 'Score']])
+    assert not _frames_share(frame, frame[['Title', 'Type', 'Score']].copy(deep=True))
+
+    report = engine_memory_report(FutureSelfEngine())
+    assert all(overlap['shared'] for overlap in report['overlaps'])
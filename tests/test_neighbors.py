@@ -0,0 +1,58 @@
+"""
+Tests for item-to-item neighbour lists.
+
+Stored lists must be ranked by score and then by higher item on ties, stay equal
+to a full rebuild after incremental updates, and be written back when an engine
+changes a vector.
+"""
+
+import numpy as np
+
+from neighbors import NeighborIndex, _top_m, item_neighbors
+
+
+def test_selection_breaks_ties_by_higher_item():
+    rng = np.random.default_rng(3)
+    similarities = rng.integers(0, 4, size=(50, 300)).astype(np.float32)
+    similarities[np.arange(50), np.arange(50)] = -np.inf
+    indices, scores = _top_m(similarities, 12)
+    columns = np.arange(similarities.shape[1])
+    for row, row_scores in enumerate(similarities):
+        expected = np.lexsort((-columns, -row_scores))[:12]
+        np.testing.assert_array_equal(indices[row], expected)
+        np.testing.assert_array_equal(scores[row], row_scores[expected])
+
+
+def test_built_lists_are_ranked(tied_catalog):
+    _, vectors, _ = tied_catalog
+    index = NeighborIndex.build(vectors, 'v1', m=15, max_block_bytes=64 * 1024)
+    assert (np.diff(index.scores, axis=1) <= 0).all()
+    tied = np.diff(index.scores, axis=1) == 0
+    assert (np.diff(index.indices, axis=1)[tied] < 0).all()
+    assert not (index.indices == np.arange(len(vectors))[:, None]).any()
+    for content_id in range(0, len(vectors), 97):
+        rows, scores = item_neighbors(vectors, content_id, 15)
+        np.testing.assert_allclose(scores, index.scores[content_id], atol=1e-6)
+
+
+def test_update_matches_rebuild(tied_catalog):
+    _, vectors, _ = tied_catalog
+    index = NeighborIndex.build(vectors, 'v1', m=10)
+    changed = vectors.copy()
+    changed[[3, 500, 996]] = changed[[10, 11, 12]]
+    index.update(changed, [3, 500, 996], 'v2')
+    rebuilt = NeighborIndex.build(changed, 'v2', m=10)
+    np.testing.assert_array_equal(index.indices, rebuilt.indices)
+    np.testing.assert_array_equal(index.scores, rebuilt.scores)
+
+
+def test_engine_update_persists_lists(make_engine, tmp_path):
+    engine = make_engine()
+    path = str(tmp_path / 'neighbors.npz')
+    NeighborIndex.build(engine.content_vectors, engine.catalog_version, m=10).save(path)
+    assert engine.attach_neighbors(path, m=10) is not None
+
+    engine.update_content_vectors({5: [1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]})
+    saved = NeighborIndex.load(path)
+    assert saved.catalog_version == engine.catalog_version
+    np.testing.assert_array_equal(saved.indices, engine.neighbor_index.indices)
@@ -0,0 +1,61 @@
+"""
+Parity tests for sharded scatter-gather serving.
+
+A ShardedEngine must return exactly what the unsharded FutureSelfEngine returns:
+the same rows in the same order (score, then higher row on ties) with the same
+scores, for single goals, batches and users with consumed content excluded.
+"""
+
+import pytest
+
+from conftest import GOALS, assert_same, ranking
+from recommender import DataLoader, FutureSelfEngine
+from sharding import ShardedEngine
+
+
+@pytest.fixture(scope='module')
+def engine(tied_catalog):
+    """Engine over the synthetic catalog with ties, shared by the module's tests."""
+    return FutureSelfEngine(data_loader=DataLoader.from_arrays(*tied_catalog))
+
+
+@pytest.mark.parametrize('n_shards', [1, 2, 3, 7])
+@pytest.mark.parametrize('top_k', [1, 10, 50])
+def test_recommend_matches_unsharded(engine, n_shards, top_k):
+    with ShardedEngine(engine, n_shards=n_shards, mode='local') as sharded:
+        for goal in GOALS:
+            assert_same(engine.recommend(goal, top_k=top_k), sharded.recommend(goal, top_k=top_k))
+
+
+@pytest.mark.parametrize('n_shards', [2, 3])
+def test_recommend_batch_matches_unsharded(engine, n_shards):
+    with ShardedEngine(engine, n_shards=n_shards, mode='local') as sharded:
+        for goal, actual in zip(GOALS, sharded.recommend_batch(GOALS, top_k=20)):
+            assert_same(engine.recommend(goal, top_k=20), actual)
+
+
+def test_exclusions_match_unsharded(engine):
+    # Consume the head of every goal's ranking, plus rows spanning the shard bounds
+    consumed = {0, 331, 332, 333, 664, 665, 996}
+    for goal in GOALS:
+        consumed.update(ranking(engine.recommend(goal, top_k=15))[0])
+    engine.record_consumption([('reader', content_id) for content_id in sorted(consumed)])
+
+    with ShardedEngine(engine, n_shards=3, mode='local') as sharded:
+        for goal in GOALS:
+            expected = engine.recommend(goal, top_k=25, user_id='reader')
+            actual = sharded.recommend(goal, top_k=25, user_id='reader')
+            assert not consumed & set(ranking(actual)[0])
+            assert_same(expected, actual)
+
+
+def test_more_shards_than_results(engine):
+    with ShardedEngine(engine, n_shards=7, mode='local') as sharded:
+        result = sharded.recommend(GOALS[0], top_k=len(engine.content_vectors) + 5)
+    assert sorted(ranking(result)[0]) == list(range(len(engine.content_vectors)))
+
+
+def test_process_shards_match_unsharded(engine):
+    with ShardedEngine(engine, n_shards=2, mode='process') as sharded:
+        for goal in GOALS[:3]:
+            assert_same(engine.recommend(goal, top_k=10), sharded.recommend(goal, top_k=10))
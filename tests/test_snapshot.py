@@ -0,0 +1,72 @@
+"""
+Round-trip tests for engine snapshots.
+
+An engine loaded from a snapshot must serve exactly what the engine that wrote it
+serves: the same catalog version, the same rankings and scores to the last bit,
+whether it was built from the in-memory catalog or from ingested float32 artifacts,
+and with its threshold and deadline indexes restored rather than rebuilt.
+"""
+
+import pytest
+
+from conftest import GOALS, assert_same
+from recommender import DataLoader, FutureSelfEngine
+
+
+def assert_same_results(expected, actual, **kwargs):
+    for goal in GOALS:
+        for top_k in (1, 10, 60):
+            assert_same(expected.recommend(goal, top_k=top_k, **kwargs),
+                        actual.recommend(goal, top_k=top_k, **kwargs), atol=0)
+
+
+def test_round_trip_matches(make_engine, tmp_path):
+    engine = make_engine()
+    engine.save_snapshot(str(tmp_path / 'engine.snapshot'))
+    loaded = FutureSelfEngine.from_snapshot(str(tmp_path / 'engine.snapshot'))
+    assert loaded.catalog_version == engine.catalog_version
+    assert loaded.content_metadata.equals(engine.content_metadata)
+    assert_same_results(engine, loaded)
+
+
+def test_round_trip_of_artifacts_keeps_float32_scoring(tied_catalog, tmp_path):
+    from ingest import ingest
+
+    skill_dimensions, vectors, metadata = tied_catalog
+    frame = metadata.copy()
+    frame[skill_dimensions] = vectors
+    frame.to_csv(tmp_path / 'catalog.csv', index=False)
+    ingest(str(tmp_path / 'catalog.csv'), str(tmp_path / 'artifacts'), progress=False)
+
+    engine = FutureSelfEngine(data_loader=DataLoader.from_artifacts(str(tmp_path / 'artifacts')))
+    engine.save_snapshot(str(tmp_path / 'engine.snapshot'))
+    loaded = FutureSelfEngine.from_snapshot(str(tmp_path / 'engine.snapshot'))
+    assert loaded.data_loader.unit_vectors is not None
+    assert loaded.catalog_version == engine.catalog_version
+    assert_same_results(engine, loaded)
+
+
+def test_indexes_are_restored(make_engine, tmp_path):
+    engine = make_engine()
+    engine.enable_threshold_index(max_dims=2)
+    engine.enable_deadline_scoring(block_size=64)
+    engine.save_snapshot(str(tmp_path / 'engine.snapshot'))
+    loaded = FutureSelfEngine.from_snapshot(str(tmp_path / 'engine.snapshot'))
+
+    assert loaded.sorted_index.max_dims == 2
+    assert loaded.anytime_scorer.block_size == 64
+    # Enabling with the saved settings keeps the restored index instead of rebuilding
+    restored = loaded.sorted_index
+    assert loaded.enable_threshold_index(max_dims=2) is restored
+    assert_same_results(engine, loaded)
+    assert_same_results(engine, loaded, deadline_ms=60_000)
+
+
+def test_snapshot_is_rejected_when_corrupted(make_engine, tmp_path):
+    path = tmp_path / 'engine.snapshot'
+    make_engine().save_snapshot(str(path))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        FutureSelfEngine.from_snapshot(str(path), verify=True)